@@ -13,10 +13,36 @@ import os
 import sys
 import datetime
 import glob
+import json
+import mmap
+import stat
+import struct
 import subprocess
 import re
 import ast
+import atexit
+import signal
+import threading
+import time
 from ansible.module_utils.basic import AnsibleModule
+# Python 2
+try:
+    import Queue as queue
+# Python 3
+except ImportError:
+    import queue
+# Python 3
+try:
+    from shlex import quote as shell_quote
+# Python 2
+except ImportError:
+    from pipes import quote as shell_quote
+# the rpm bindings are only available to the system Python, the rpm command is used without them
+try:
+    import rpm
+    HAS_RPM_BINDINGS = True
+except ImportError:
+    HAS_RPM_BINDINGS = False
 
 ANSIBLE_METADATA = {
     'metadata_version': '1.0',
@@ -42,7 +68,36 @@ options:
     include_package_files:
         description: >
             Specifies whether the data returned should include a list of files installed by each package.
-            This option will greatly increase the size of the data being returned.
+            This option will greatly increase the size of the data being returned. Files are always included
+            by the deep *profile*.
+        default: false
+        required: false
+    profile:
+        description: >
+            The set of host details to collect. The quick profile collects only memory and service status and is
+            suited to frequent health checks. It does not query the rpm database, so a host is treated as having SAS
+            installed whenever the SAS install root exists. The standard profile also collects filesystems, the SAS install root,
+            installed packages, and package updates. The deep profile adds the files installed by each package and
+            the heap, garbage collection, and thread counters of running Java services, and verifies the files
+            installed by each package along with the disk space they use. The profile and the
+            collectors that ran are returned in *_collection_profile* and *_collectors*.
+        choices: [ quick, standard, deep ]
+        default: standard
+        required: false
+    include_package_footprint:
+        description: >
+            Specifies whether the disk space currently used by each SAS package should be calculated from the files
+            it installed, including files created since in the directories it installed, such as logs and caches.
+            The largest packages are returned in *largest_packages*. The files are always measured by the deep
+            *profile*.
+        default: false
+        required: false
+    verify_packages:
+        description: >
+            Specifies whether the files installed by each SAS package should be verified against the rpm database
+            to find files that were modified or deleted. Packages are verified in parallel once they have been
+            collected, which can take several minutes on hosts with many packages. Packages are always verified
+            by the deep *profile*.
         default: false
         required: false
     locale_encoding:
@@ -51,6 +106,61 @@ options:
             deployed software. The value must be an encoding supported by Python.
         default: None
         required: false
+    service_status_timeout:
+        description: >
+            The number of seconds to wait for the status command of each *-all-services script before it is
+            stopped and treated as failed.
+        default: 300
+        required: false
+    cpu_sample_interval:
+        description: >
+            The number of seconds between the two snapshots of /proc used to calculate the CPU usage and context
+            switch rate of each running SAS service. A value of 0 skips CPU sampling.
+        default: 1
+        required: false
+    collector_timeout:
+        description: >
+            The number of seconds to wait for each group of host details (filesystems, memory, SAS root, packages,
+            package updates, and services) to be collected. A group that fails or does not complete in time is
+            returned empty and its error is recorded in *_collector_errors*, without failing the module.
+        default: 600
+        required: false
+    cache_dir:
+        description: >
+            The directory on the host where data that is expensive to collect is cached between runs, such as the
+            index of directory sizes under the SAS install root and the installed SAS package details. The directory
+            is created if it does not exist. Cached package details are reused until the rpm database changes, and the
+            directory size index is rebuilt once it is a day old.
+        default: /var/cache/viya-ark
+        required: false
+    use_cache:
+        description: >
+            Specifies whether data cached in *cache_dir* should be read and written. When false, all data is
+            collected from scratch and nothing is written to the host. In check mode, cached data is read but
+            never written.
+        default: true
+        required: false
+    refresh_cache:
+        description: >
+            Specifies whether any data cached in *cache_dir* should be discarded and collected again. The new
+            results are cached for later runs.
+        default: false
+        required: false
+    package_update_mode:
+        description: >
+            Specifies how available package updates are determined. When online, the package manager may refresh
+            repository metadata over the network. When offline, only the repository metadata already cached on the
+            host is used.
+        choices: [ online, offline ]
+        default: online
+        required: false
+    package_update_ttl:
+        description: >
+            The number of seconds for which the results of the last successful package update check are reused
+            instead of running the package manager again. The results are cached in *cache_dir*. A value of 0
+            always runs the package manager.
+        default: 0
+        required: false
 '''
 
 EXAMPLES = '''
@@ -65,6 +175,12 @@ EXAMPLES = '''
     hostvars: "{{ hostvars[inventory_hostname] }}"
     include_package_files: true
 
+# Get only memory and service status for a frequent health check
+- name: Inspect SAS deployment
+  get_sas_host_details:
+    hostvars: "{{ hostvars[inventory_hostname] }}"
+    profile: quick
+
 # Get SAS deployment information with custom locale encoding
 - name: Inspect SAS deployment
   get_sas_host_details:
@@ -144,6 +260,122 @@ class _AnsibleFactsKeys(object):
         EXEC = 'executable'
 
 
+# =====
+# Class: _CgroupControllers(object)
+# =====
+class _CgroupControllers(object):
+    """
+    Internal class for static reference to the cgroup controllers used to account for the resources used by a
+    service's processes.
+
+    :cvar str CPUACCT: Value referencing the cgroup v1 CPU accounting controller.
+    :cvar str MEMORY:  Value referencing the cgroup v1 memory controller.
+    :cvar str UNIFIED: Value referencing the cgroup v2 (unified) hierarchy, which has no controller name.
+    :cvar str UNIT:    Value referencing the systemd unit's cgroup, regardless of the hierarchy it was found in.
+    """
+    CPUACCT = 'cpuacct'
+    MEMORY = 'memory'
+    UNIFIED = 'unified'
+    UNIT = 'unit'
+
+
+# =====
+# Class: _CollectionProfiles(object)
+# =====
+class _CollectionProfiles(object):
+    """
+    Internal class for static reference to the supported *profile* (str) values, each of which selects the collectors
+    that are run.
+
+    :cvar str QUICK:    Value referencing the collection of memory and service status only.
+    :cvar str STANDARD: Value referencing the collection of all host details.
+    :cvar str DEEP:     Value referencing the collection of all host details, including the files installed by each
+                        package, the verification and disk usage of those files, and the counters of running Java
+                        services.
+    """
+    QUICK = 'quick'
+    STANDARD = 'standard'
+    DEEP = 'deep'
+
+
+# =====
+# Class: _Collectors(object)
+# =====
+class _Collectors(object):
+    """
+    Internal class for static reference to the names of the independent collectors that gather the host details.
+    The names are used as keys in *_collector_errors* (dict) in *sas_host_details* (dict).
+
+    :cvar str FILESYSTEMS: Collects filesystem usage.
+    :cvar str FOOTPRINT:   Collects the disk space used by the files of each SAS package. Because it needs the
+                           collected packages, it runs after the other collectors.
+    :cvar str MEMORY:      Collects physical memory and swap usage.
+    :cvar str PACKAGES:    Collects the installed SAS packages.
+    :cvar str SAS_ROOT:    Collects the size of the SAS install root.
+    :cvar str SERVICES:    Collects the status of SAS services.
+    :cvar str UPDATES:     Collects the available SAS package updates.
+    :cvar str VERIFICATION: Verifies the files installed by the SAS packages. Because it needs the collected packages,
+                            it runs after the other collectors.
+    """
+    FILESYSTEMS = 'filesystems'
+    FOOTPRINT = 'footprint'
+    MEMORY = 'memory'
+    PACKAGES = 'packages'
+    SAS_ROOT = 'sas_root'
+    SERVICES = 'services'
+    UPDATES = 'updates'
+    VERIFICATION = 'verification'
+
+
+# =====
+# Class: _DirectoryIndexKeys(object)
+# =====
+class _DirectoryIndexKeys(object):
+    """
+    Internal class for static reference to key names in the directory size index that is cached between runs to
+    avoid walking the entire SAS install root each time.
+
+    The top level keys are:
+
+    .. code-block:: yaml
+
+        created: 0.0
+        directories:
+            <path>:
+                device: 0
+                inode: 0
+                links: {}
+                mtime: 0.0
+                size: 0
+                subdirs: []
+        format: 0
+        root: ''
+
+    :cvar str CREATED:     Key referencing *created* (float), the time the index was last fully rebuilt.
+    :cvar str DIRECTORIES: Key referencing *directories* (dict) of directory paths mapped to their entries.
+    :cvar str FORMAT:      Key referencing *format* (int), the *SAS_ROOT_INDEX_FORMAT* the index was written with.
+    :cvar str ROOT:        Key referencing *root* (str), the path the index was built for.
+    :cvar str DEVICE:      Key referencing *device* (int) of a directory entry.
+    :cvar str INODE:       Key referencing *inode* (int) of a directory entry.
+    :cvar str LINKS:       Key referencing *links* (dict) of hard-linked files ('<device>:<inode>' mapped to bytes)
+                           directly within a directory.
+    :cvar str MTIME:       Key referencing *mtime* (float) of a directory entry.
+    :cvar str SIZE:        Key referencing *size* (int), the bytes used by files directly within a directory that
+                           are not hard-linked.
+    :cvar str SUBDIRS:     Key referencing *subdirs* (list) of the names of directories directly within a directory.
+    """
+    CREATED = 'created'
+    DIRECTORIES = 'directories'
+    FORMAT = 'format'
+    ROOT = 'root'
+    DEVICE = 'device'
+    INODE = 'inode'
+    LINKS = 'links'
+    MTIME = 'mtime'
+    SIZE = 'size'
+    SUBDIRS = 'subdirs'
+
+
 # =====
 # Class: _HostDetailsKeys(object)
 # =====
@@ -159,9 +391,14 @@ class _HostDetailsKeys(object):
         sas_host_details:
             <hostname>
                 _id:
+                _collection_profile: ''
+                _collector_errors: {}
+                _collectors: []
+                _timings: {}
                 ansible_host_groups: []
                 ipv4: ''
                 os: {}
+                package_update_check: {}
                 resource_check: {}
                 required_software: {}
                 sas_packages: {}
@@ -174,6 +411,8 @@ class _HostDetailsKeys(object):
     +==============================+===============================+
     | os                           | OSKeys                        |
     +------------------------------+-------------------------------+
+    | package_update_check         | PackageUpdateCheckKeys        |
+    +------------------------------+-------------------------------+
     | resource_check               | ResourceCheckKeys             |
     +------------------------------+-------------------------------+
     | required_software            | RequiredSoftwareKeys          |
@@ -182,24 +421,44 @@ class _HostDetailsKeys(object):
     +------------------------------+-------------------------------+
     | sas_services                 | SASServicesKeys               |
     +------------------------------+-------------------------------+
+    | _timings                     | TimingsKeys                   |
+    +------------------------------+-------------------------------+
 
     :cvar str ID:                 Key referencing *_id* (str) in *sas_host_details* (dict).
     :cvar str IPV4:               Key referencing *ipv4* (str) in *sas_host_details* (dict).
     :cvar str HOST_GROUPS:        Key referencing *ansible_host_groups* (list) in *sas_host_details* (dict).
     :cvar str AVAIL_UPDATE_COUNT: Key referencing *available_package_updates* in the *sas_host_details* (dict).
+    :cvar str MODIFIED_PKG_COUNT: Key referencing *modified_packages* (int), the number of packages with modified or
+                                  missing files, in the *sas_host_details* (dict). Only set if packages were verified.
+    :cvar str UNVERIFIED_PKG_COUNT: Key referencing *unverified_packages* (int), the number of packages that could not
+                                  be verified because their shard failed, in the *sas_host_details* (dict). Only set
+                                  if packages were verified.
+    :cvar str LARGEST_PACKAGES:   Key referencing *largest_packages* (list) of the [name, disk usage] of the packages
+                                  using the most disk space, largest first, in the *sas_host_details* (dict). Only set
+                                  if the package footprint was collected.
     :cvar str OS:                 Key referencing *os* (dict) in *sas_host_details* (dict).
+    :cvar str PKG_UPDATE_CHECK:   Key referencing *package_update_check* (dict) in *sas_host_details* (dict).
     :cvar str RESOURCE_CHECK:     Key referencing *resource_check* (dict) in *sas_host_details* (dict).
     :cvar str SAS_PACKAGES:       Key referencing *sas_packages* (dict) in *sas_host_details* (dict).
     :cvar str SAS_SERVICES:       Key referencing *sas_services* (dict) in *sas_host_details* (dict).
     :cvar str UNREACHABLE:        Key referencing *_unreachable* (bool) in *sas_host_details* (dict).
     :cvar str FAILED:             Key referencing *_failed* (bool) in *sas_host_details* (dict).
     :cvar str SAS_INSTALLED       Key referencing *_sas_installed* (bool) in *sas_host_details (dict).
+    :cvar str COLLECTOR_ERRORS:   Key referencing *_collector_errors* (dict) in *sas_host_details* (dict).
+    :cvar str COLLECTION_PROFILE: Key referencing *_collection_profile* (str) in *sas_host_details* (dict).
+    :cvar str COLLECTORS:         Key referencing *_collectors* (list) of the collectors that ran in
+                                  *sas_host_details* (dict).
+    :cvar str TIMINGS:            Key referencing *_timings* (dict) in *sas_host_details* (dict).
     """
     ID = '_id'
     IPV4 = 'ipv4'
     HOST_GROUPS = 'ansible_host_groups'
     AVAIL_UPDATE_COUNT = 'available_package_updates'
+    MODIFIED_PKG_COUNT = 'modified_packages'
+    UNVERIFIED_PKG_COUNT = 'unverified_packages'
+    LARGEST_PACKAGES = 'largest_packages'
     OS = 'os'
+    PKG_UPDATE_CHECK = 'package_update_check'
     RESOURCE_CHECK = 'resource_check'
     REQUIRED_SOFTWARE = 'required_software'
     SAS_PACKAGES = 'sas_packages'
@@ -207,6 +466,10 @@ class _HostDetailsKeys(object):
     UNREACHABLE = '_unreachable'
     FAILED = '_failed'
     SAS_INSTALLED = '_sas_installed'
+    COLLECTOR_ERRORS = '_collector_errors'
+    COLLECTION_PROFILE = '_collection_profile'
+    COLLECTORS = '_collectors'
+    TIMINGS = '_timings'
 
     # =====
     # Class: OSKeys(object)
@@ -239,6 +502,36 @@ class _HostDetailsKeys(object):
         PACKAGE_MANAGER = 'package_manager'
         VERSION = 'version'
 
+    # =====
+    # Class: PackageUpdateCheckKeys(object)
+    # =====
+    class PackageUpdateCheckKeys(object):
+        """
+        Nested internal class for static reference to key names in *package_update_check* (dict), which
+        is returned as part of *sas_host_details* (dict).
+
+        The top level keys are:
+
+        .. code-block:: yaml
+
+            package_update_check:
+                age: 0
+                epoch: 0
+                mode: ''
+                timestamp: ''
+
+        :cvar str AGE:       Key referencing *age* (int), the number of seconds since the package update check ran, in
+                             *package_update_check* (dict).
+        :cvar str EPOCH:     Key referencing *epoch* (int), the time the check ran in seconds since the epoch, in
+                             *package_update_check* (dict).
+        :cvar str MODE:      Key referencing *mode* (str) in *package_update_check* (dict).
+        :cvar str TIMESTAMP: Key referencing *timestamp* (str) in *package_update_check* (dict).
+        """
+        AGE = 'age'
+        EPOCH = 'epoch'
+        MODE = 'mode'
+        TIMESTAMP = 'timestamp'
+
     # =====
     # Class: ResourcesKeys(object)
     # =====
@@ -259,16 +552,22 @@ class _HostDetailsKeys(object):
                     results: {}
                     results_timestamp: ''
                     results_unit: ''
+                    results_epoch: 0
+                    metrics: {}
                 memory:
                     results: {}
                     results_format: ''
                     results_timestamp: ''
                     results_unit: ''
+                    results_epoch: 0
+                    metrics: {}
                 sas_root:
                     results: {}
                     results_format: ''
                     results_timestamp: ''
                     results_unit: ''
+                    results_epoch: 0
+                    metrics: {}
 
         Nested classes are provided for referencing key names in nested dicts:
 
@@ -290,6 +589,10 @@ class _HostDetailsKeys(object):
         :cvar str RESULTS_TIMESTAMP: Key referencing *results_timestamp* (str) in *filesystems* (dict) and *memory*
                                      (dict).
         :cvar str RESULTS_UNIT:      Key referencing *results_unit* (str) in *filesystems* (dict) and *memory* (dict).
+        :cvar str RESULTS_EPOCH:     Key referencing *results_epoch* (int), the time the results were gathered in
+                                     seconds since the epoch.
+        :cvar str METRICS:           Key referencing *metrics* (dict), the sizes in *results* (dict) as a number of
+                                     bytes (int) under the same keys.
         """
         FILESYSTEMS = 'filesystems'
         MEMORY = 'memory'
@@ -298,6 +601,8 @@ class _HostDetailsKeys(object):
         RESULTS_FORMAT = 'results_format'
         RESULTS_TIMESTAMP = 'results_timestamp'
         RESULTS_UNIT = 'results_unit'
+        RESULTS_EPOCH = 'results_epoch'
+        METRICS = 'metrics'
 
         # =====
         # Class: FilesystemDetailsKeys(object)
@@ -427,6 +732,7 @@ class _HostDetailsKeys(object):
 
                 sas_root:
                     results:
+                        directories: {}
                         filesystem: ''
                         filesystem_size: ''
                         mount: ''
@@ -434,6 +740,8 @@ class _HostDetailsKeys(object):
                         size: ''
                         used_ratio: ''
 
+            :cvar str DIRECTORIES:      Key referencing *directories* (dict) of each top-level directory in the SAS
+                                        install root mapped to its size (str) in *sas_root* (dict).
             :cvar str FILESYSTEM:       Key referencing *filesystem* (str) in *sas_root* (dict).
             :cvar str FILESYSTEM_TOTAL: Key referencing *filesystem_total* (str) in *sas_root* (dict).
             :cvar str MOUNT:            Key referencing *mount* (str) in *sas_root* (dict).
@@ -441,6 +749,7 @@ class _HostDetailsKeys(object):
             :cvar str SIZE:             Key referencing *size* (str) in *sas_root* (dict).
             :cvar str USED_RATIO:       Key referencing *used_ration* (str) in *sas_root* (dict)
             """
+            DIRECTORIES = 'directories'
             FILESYSTEM = 'filesystem'
             FILESYSTEM_TOTAL = 'filesystem_total'
             MOUNT = 'mount'
@@ -516,8 +825,10 @@ class _HostDetailsKeys(object):
                 <package_name>:
                     attributes: {}
                     installed_files: []
+                    metrics: {}
                     provided_services: []
                     update_status: {}
+                    verification: {}
 
         A nested class is provided for referencing key names in nested dicts:
 
@@ -528,16 +839,25 @@ class _HostDetailsKeys(object):
         +-------------------------------+-------------------------------+
         | <package_name>.update_status  | PackageUpdateStatusKeys       |
         +-------------------------------+-------------------------------+
+        | <package_name>.verification   | PackageVerificationKeys       |
+        +-------------------------------+-------------------------------+
 
         :cvar str ATTRIBUTES:        Key referencing *attributes* (dict) in a SAS package dict.
         :cvar str INSTALLED_FILES:   Key referencing *installed_files* (list) in a SAS package dict.
+        :cvar str METRICS:           Key referencing *metrics* (dict) in a SAS package dict, holding the numeric
+                                     value of the *size* and *disk_usage* (bytes), *build_date* and *install_date*
+                                     (seconds since the epoch) attributes.
         :cvar str PROVIDED_SERVICES: Key referencing *provided_services* (list) in a SAS package dict.
         :cvar str UPDATE_STATUS:    Key referencing *update_status* (dict) in a SAS package dict.
+        :cvar str VERIFICATION:     Key referencing *verification* (dict) in a SAS package dict. Only set if packages
+                                    were verified.
         """
         ATTRIBUTES = 'attributes'
         INSTALLED_FILES = 'installed_files'
+        METRICS = 'metrics'
         PROVIDED_SERVICES = 'provided_services'
         UPDATE_STATUS = 'update_status'
+        VERIFICATION = 'verification'
 
         # =====
         # Class: PackageAttributesKeys(object)
@@ -555,6 +875,7 @@ class _HostDetailsKeys(object):
                     attributes:
                         arch: ''
                         build_date: ''
+                        disk_usage: ''
                         install_date: ''
                         size: ''
                         summary: ''
@@ -562,6 +883,9 @@ class _HostDetailsKeys(object):
 
             :cvar str ARCH:      Key referencing *arch* (str) in *attributes* (dict) for a package.
             :cvar str BUILD:     Key referencing *build_date* (str) in *attributes* (dict) for a package.
+            :cvar str DISK_USAGE: Key referencing *disk_usage* (str), the disk space currently used by the files of
+                                  the package, in *attributes* (dict) for a package. Only set if the package
+                                  footprint was collected.
             :cvar str INSTALL:   Key referencing *install_date* (str) in *attributes* (dict) for a package.
             :cvar str NAME:      Key referencing *name* (str) in *attributes* (dict) for a package.
             :cvar str SIZE:      Key referencing *size* (str) in *attributes* (dict) for a package.
@@ -570,6 +894,7 @@ class _HostDetailsKeys(object):
             """
             ARCH = 'arch'
             BUILD = 'build_date'
+            DISK_USAGE = 'disk_usage'
             INSTALL = 'install_date'
             NAME = 'name'
             SIZE = 'size'
@@ -599,6 +924,36 @@ class _HostDetailsKeys(object):
             FROM_REPO = 'from_repository'
             VERSION = 'version'
 
+        # =====
+        # Class: PackageVerificationKeys(object)
+        # =====
+        class PackageVerificationKeys(object):
+            """
+            Nested internal class for static reference to key names in *verification* (dict) returned for
+            each package in *sas_packages* (dict).
+
+            The top level keys are:
+
+            .. code-block:: yaml
+
+                <package_name>
+                    verification:
+                        files: []
+                        missing: 0
+                        modified: 0
+
+            :cvar str FILES:    Key referencing *files* (list) of the lines reported by 'rpm -V' for each file that
+                                does not match the rpm database, such as 'S.5....T.  c /etc/file', in *verification*
+                                (dict) for a package. At most *VERIFY_MAX_FILES* lines are kept.
+            :cvar str MISSING:  Key referencing *missing* (int), the number of files that were deleted, in
+                                *verification* (dict) for a package.
+            :cvar str MODIFIED: Key referencing *modified* (int), the number of files whose size, digest, mode,
+                                owner, or other attributes changed, in *verification* (dict) for a package.
+            """
+            FILES = 'files'
+            MISSING = 'missing'
+            MODIFIED = 'modified'
+
     # =====
     # Class: SASServicesKeys(object)
     # =====
@@ -613,6 +968,7 @@ class _HostDetailsKeys(object):
 
             sas_services:
                 installed: {}
+                metrics: {}
                 status: {}
 
         Nested classes are provided for referencing key names in nested dicts:
@@ -626,9 +982,13 @@ class _HostDetailsKeys(object):
         +-------------------+-------------------------------+
 
         :cvar str INSTALLED: Key referencing *installed* (dict) in *sas_services* (dict).
+        :cvar str METRICS:   Key referencing *metrics* (dict) in *sas_services* (dict), holding the numeric value of
+                             the *memory* (bytes), *cpu* (percent), *threads*, and *context_switches* (per second)
+                             totals in *status* (dict).
         :cvar str STATUS:    Key referencing *status* (dict) in *sas_services* (dict).
         """
         INSTALLED = 'installed'
+        METRICS = 'metrics'
         STATUS = 'status'
 
         # =====
@@ -646,6 +1006,7 @@ class _HostDetailsKeys(object):
                 <service_name>:
                     attributes: {}
                     installed_by: ''
+                    metrics: {}
 
             A nested class is provided for referencing key names in nested dicts:
 
@@ -657,9 +1018,13 @@ class _HostDetailsKeys(object):
 
             :cvar str ATTRIBUTES:   Key referencing *attributes* (dict) in the dict for each installed service.
             :cvar str INSTALLED_BY: Key referencing *installed_by* (str) in the dict for each installed service.
+            :cvar str METRICS:      Key referencing *metrics* (dict) in the dict for each installed service, holding
+                                    the numeric value of the service's sizes (bytes), times (seconds), and counts under
+                                    the same keys as in *attributes* (dict).
             """
             ATTRIBUTES = 'attributes'
             INSTALLED_BY = 'installed_by'
+            METRICS = 'metrics'
 
             # =====
             # Class: ServiceAttributesKeys(object)
@@ -679,15 +1044,97 @@ class _HostDetailsKeys(object):
                         status: ''
                         resident_memory: ''
 
-                :cvar str PORT:            Key referencing *port* (str) in *attributes* (dict).
-                :cvar str PID:             Key referencing *pid* (str) in *attributes* (dict).
-                :cvar str STATUS:          Key referencing *status* (str) in *attributes* (dict).
-                :cvar str RESIDENT_MEMORY: Key referencing *resident_memory* in *attributes* (dict).
+                The attributes below are only included for running services. *listening* is 'yes' if the
+                service's process is listening on its advertised port, otherwise 'no':
+
+                .. code-block:: yaml
+
+                    attributes:
+                        listening: ''
+                        listening_ports: ''
+
+                The attributes below are only included for running services when CPU sampling is enabled:
+
+                .. code-block:: yaml
+
+                    attributes:
+                        context_switches: ''
+                        cpu_usage: ''
+                        threads: ''
+
+                The attributes below are only included for running services that systemd started in their own
+                service unit. Memory and CPU time are accounted by the unit's control group, so they include every
+                process the service started. When several services share a unit, the unit's name notes the number of
+                services sharing it:
+
+                .. code-block:: yaml
+
+                    attributes:
+                        cgroup: ''
+                        cgroup_cpu_time: ''
+                        cgroup_memory: ''
+
+                The attributes below are only included for running Java services that publish performance data
+                (hsperfdata):
+
+                .. code-block:: yaml
+
+                    attributes:
+                        java_gc_count: ''
+                        java_gc_time: ''
+                        java_heap_committed: ''
+                        java_heap_used: ''
+                        java_old_gen_committed: ''
+                        java_old_gen_used: ''
+                        java_threads: ''
+                        java_young_gen_committed: ''
+                        java_young_gen_used: ''
+
+                :cvar str PORT:                     Key referencing *port* (str) in *attributes* (dict).
+                :cvar str PID:                      Key referencing *pid* (str) in *attributes* (dict).
+                :cvar str STATUS:                   Key referencing *status* (str) in *attributes* (dict).
+                :cvar str RESIDENT_MEMORY:          Key referencing *resident_memory* in *attributes* (dict).
+                :cvar str LISTENING:                Key referencing *listening* (str) in *attributes* (dict).
+                :cvar str LISTENING_PORTS:          Key referencing *listening_ports* (str) in *attributes* (dict).
+                :cvar str CONTEXT_SWITCHES:         Key referencing *context_switches* (str) in *attributes* (dict).
+                :cvar str CPU_USAGE:                Key referencing *cpu_usage* (str) in *attributes* (dict).
+                :cvar str THREADS:                  Key referencing *threads* (str) in *attributes* (dict).
+                :cvar str CGROUP:                   Key referencing *cgroup* (str) in *attributes* (dict).
+                :cvar str CGROUP_CPU_TIME:          Key referencing *cgroup_cpu_time* (str) in *attributes* (dict).
+                :cvar str CGROUP_MEMORY:            Key referencing *cgroup_memory* (str) in *attributes* (dict).
+                :cvar str JAVA_GC_COUNT:            Key referencing *java_gc_count* (str) in *attributes* (dict).
+                :cvar str JAVA_GC_TIME:             Key referencing *java_gc_time* (str) in *attributes* (dict).
+                :cvar str JAVA_HEAP_COMMITTED:      Key referencing *java_heap_committed* (str) in *attributes* (dict).
+                :cvar str JAVA_HEAP_USED:           Key referencing *java_heap_used* (str) in *attributes* (dict).
+                :cvar str JAVA_OLD_GEN_COMMITTED:   Key referencing *java_old_gen_committed* (str) in *attributes*
+                                                    (dict).
+                :cvar str JAVA_OLD_GEN_USED:        Key referencing *java_old_gen_used* (str) in *attributes* (dict).
+                :cvar str JAVA_THREADS:             Key referencing *java_threads* (str) in *attributes* (dict).
+                :cvar str JAVA_YOUNG_GEN_COMMITTED: Key referencing *java_young_gen_committed* (str) in *attributes*
+                                                    (dict).
+                :cvar str JAVA_YOUNG_GEN_USED:      Key referencing *java_young_gen_used* (str) in *attributes* (dict).
                 """
                 PORT = 'port'
                 PID = 'pid'
                 STATUS = 'status'
                 RESIDENT_MEMORY = 'resident_memory'
+                LISTENING = 'listening'
+                LISTENING_PORTS = 'listening_ports'
+                CONTEXT_SWITCHES = 'context_switches'
+                CPU_USAGE = 'cpu_usage'
+                THREADS = 'threads'
+                CGROUP = 'cgroup'
+                CGROUP_CPU_TIME = 'cgroup_cpu_time'
+                CGROUP_MEMORY = 'cgroup_memory'
+                JAVA_GC_COUNT = 'java_gc_count'
+                JAVA_GC_TIME = 'java_gc_time'
+                JAVA_HEAP_COMMITTED = 'java_heap_committed'
+                JAVA_HEAP_USED = 'java_heap_used'
+                JAVA_OLD_GEN_COMMITTED = 'java_old_gen_committed'
+                JAVA_OLD_GEN_USED = 'java_old_gen_used'
+                JAVA_THREADS = 'java_threads'
+                JAVA_YOUNG_GEN_COMMITTED = 'java_young_gen_committed'
+                JAVA_YOUNG_GEN_USED = 'java_young_gen_used'
 
         # =====
         # Class: ServicesStatusKeys(object)
@@ -706,18 +1153,86 @@ class _HostDetailsKeys(object):
                     other: ''
                     up: ''
                     memory: ''
+                    not_listening: ''
+                    context_switches: ''
+                    cpu: ''
+                    threads: ''
 
             :cvar str DOWN:  Key referencing *down* (str) in *status* (dict).
             :cvar str NOT_READY: Key referencing *not_ready* (str) in *status* (dict).
             :cvar str OTHER: Key referencing *other* (str) in *status* (dict).
             :cvar str UP:    Key referencing *up* (str) in *status* (dict).
             :cvar str MEMORY: Key referencing *memory* (str) in *status* (dict).
+            :cvar str NOT_LISTENING: Key referencing *not_listening* (int), the number of running services not
+                                     listening on their advertised port, in *status* (dict).
+            :cvar str CONTEXT_SWITCHES: Key referencing *context_switches* (str), the combined rate of all running
+                                        services, in *status* (dict).
+            :cvar str CPU: Key referencing *cpu* (str), the combined CPU usage of all running services, in *status*
+                           (dict).
+            :cvar str THREADS: Key referencing *threads* (str), the combined threads of all running services, in
+                               *status* (dict).
             """
             DOWN = 'down'
             NOT_READY = 'not_ready'
             OTHER = 'other'
             UP = 'up'
             MEMORY = 'memory'
+            NOT_LISTENING = 'not_listening'
+            CONTEXT_SWITCHES = 'context_switches'
+            CPU = 'cpu'
+            THREADS = 'threads'
+
+    # =====
+    # Class: TimingsKeys(object)
+    # =====
+    class TimingsKeys(object):
+        """
+        Nested internal class for static reference to key names in *_timings* (dict), which is returned as part of
+        *sas_host_details* (dict). Times are in seconds.
+
+        The top level keys are:
+
+        .. code-block:: yaml
+
+            _timings:
+                collectors:
+                    <collector_name>:
+                        commands: 0
+                        completed: true
+                        cpu_time: 0.0
+                        output_bytes: 0
+                        wall_time: 0.0
+                total:
+                    child_cpu_time: 0.0
+                    commands: 0
+                    cpu_time: 0.0
+                    output_bytes: 0
+                    wall_time: 0.0
+
+        :cvar str COLLECTORS:     Key referencing *collectors* (dict) of collector names mapped to their timings in
+                                  *_timings* (dict).
+        :cvar str TOTAL:          Key referencing *total* (dict), the timings of the whole module run, in *_timings*
+                                  (dict).
+        :cvar str CHILD_CPU_TIME: Key referencing *child_cpu_time* (float), the CPU time used by all commands run by
+                                  the module, in *total* (dict).
+        :cvar str COMMANDS:       Key referencing *commands* (int), the number of commands run by the collectors.
+        :cvar str COMPLETED:      Key referencing *completed* (bool), whether the collector completed in time, in
+                                  *collectors.<collector_name>* (dict).
+        :cvar str CPU_TIME:       Key referencing *cpu_time* (float), the CPU time used by the module itself. For a
+                                  collector, this is the CPU time of its threads, or None where the Python version
+                                  cannot measure the CPU time of a thread.
+        :cvar str OUTPUT_BYTES:   Key referencing *output_bytes* (int), the number of bytes output by the commands
+                                  run.
+        :cvar str WALL_TIME:      Key referencing *wall_time* (float), the elapsed time.
+        """
+        COLLECTORS = 'collectors'
+        TOTAL = 'total'
+        CHILD_CPU_TIME = 'child_cpu_time'
+        COMMANDS = 'commands'
+        COMPLETED = 'completed'
+        CPU_TIME = 'cpu_time'
+        OUTPUT_BYTES = 'output_bytes'
+        WALL_TIME = 'wall_time'
 
 
 # =====
@@ -761,12 +1276,35 @@ class _ModuleParamKeys(object):
     Internal class for static reference to keys in *params* (dict) which holds the
     input values defined for this module.
 
-    :cvar str HOSTVARS:       Key referencing *hostvars* (dict) in *params* (dict).
-    :cvar str INCL_PKG_FILES: Key referencing *include_package_files* (dict) in *params* (dict).
+    :cvar str HOSTVARS:               Key referencing *hostvars* (dict) in *params* (dict).
+    :cvar str INCL_PKG_FILES:         Key referencing *include_package_files* (dict) in *params* (dict).
+    :cvar str LOCALE_ENCODING:        Key referencing *locale_encoding* (str) in *params* (dict).
+    :cvar str SERVICE_STATUS_TIMEOUT: Key referencing *service_status_timeout* (int) in *params* (dict).
+    :cvar str COLLECTOR_TIMEOUT:      Key referencing *collector_timeout* (int) in *params* (dict).
+    :cvar str CPU_SAMPLE_INTERVAL:    Key referencing *cpu_sample_interval* (float) in *params* (dict).
+    :cvar str CACHE_DIR:              Key referencing *cache_dir* (str) in *params* (dict).
+    :cvar str USE_CACHE:              Key referencing *use_cache* (bool) in *params* (dict).
+    :cvar str REFRESH_CACHE:          Key referencing *refresh_cache* (bool) in *params* (dict).
+    :cvar str PKG_UPDATE_MODE:        Key referencing *package_update_mode* (str) in *params* (dict).
+    :cvar str PKG_UPDATE_TTL:         Key referencing *package_update_ttl* (int) in *params* (dict).
+    :cvar str PROFILE:                Key referencing *profile* (str) in *params* (dict).
+    :cvar str VERIFY_PKGS:            Key referencing *verify_packages* (bool) in *params* (dict).
+    :cvar str INCL_PKG_FOOTPRINT:     Key referencing *include_package_footprint* (bool) in *params* (dict).
     """
     HOSTVARS = 'hostvars'
     INCL_PKG_FILES = 'include_package_files'
     LOCALE_ENCODING = 'locale_encoding'
+    SERVICE_STATUS_TIMEOUT = 'service_status_timeout'
+    COLLECTOR_TIMEOUT = 'collector_timeout'
+    CPU_SAMPLE_INTERVAL = 'cpu_sample_interval'
+    CACHE_DIR = 'cache_dir'
+    USE_CACHE = 'use_cache'
+    REFRESH_CACHE = 'refresh_cache'
+    PKG_UPDATE_MODE = 'package_update_mode'
+    PKG_UPDATE_TTL = 'package_update_ttl'
+    PROFILE = 'profile'
+    VERIFY_PKGS = 'verify_packages'
+    INCL_PKG_FOOTPRINT = 'include_package_footprint'
 
 
 # =====
@@ -783,6 +1321,59 @@ class _OSFamilies(object):
     SUSE = 'Suse'
 
 
+# =====
+# Class: _PackageCacheKeys(object)
+# =====
+class _PackageCacheKeys(object):
+    """
+    Internal class for static reference to key names in the installed SAS package details that are cached between
+    runs for as long as the rpm database does not change.
+
+    :cvar str FINGERPRINT:    Key referencing *fingerprint* (list) of the rpm database files the details were read
+                              from.
+    :cvar str FORMAT:         Key referencing *format* (int), the *SAS_PACKAGES_CACHE_FORMAT* the details were
+                              written with.
+    :cvar str INCL_PKG_FILES: Key referencing *include_package_files* (bool), whether the details include installed
+                              files.
+    :cvar str PACKAGES:       Key referencing *packages* (dict), the installed SAS package details.
+    """
+    FINGERPRINT = 'fingerprint'
+    FORMAT = 'format'
+    INCL_PKG_FILES = 'include_package_files'
+    PACKAGES = 'packages'
+
+
+# =====
+# Class: _PackageUpdateCacheKeys(object)
+# =====
+class _PackageUpdateCacheKeys(object):
+    """
+    Internal class for static reference to key names in the results of a package update check, which are cached
+    between runs for up to *package_update_ttl* seconds.
+
+    :cvar str CHECKED: Key referencing *checked* (float), the time at which the check ran.
+    :cvar str MODE:    Key referencing *mode* (str), the package update mode the check ran in.
+    :cvar str UPDATES: Key referencing *updates* (dict) of package names mapped to their available update.
+    """
+    CHECKED = 'checked'
+    MODE = 'mode'
+    UPDATES = 'updates'
+
+
+# =====
+# Class: _PackageUpdateModes(object)
+# =====
+class _PackageUpdateModes(object):
+    """
+    Internal class for static reference to the supported ways of checking for package updates.
+
+    :cvar str ONLINE:  Value referencing a check that may refresh repository metadata.
+    :cvar str OFFLINE: Value referencing a check that only uses repository metadata cached on the host.
+    """
+    ONLINE = 'online'
+    OFFLINE = 'offline'
+
+
 # =====
 # Class: _PackageManagers(object)
 # =====
@@ -797,6 +1388,61 @@ class _PackageManagers(object):
     ZYPPER = 'zypper'
 
 
+# =====
+# Class: _PerfDataCounters(object)
+# =====
+class _PerfDataCounters(object):
+    """
+    Internal class for static reference to the names of the HotSpot performance counters read from the hsperfdata
+    file of a running JVM. Generation 0 is the young generation and generation 1 is the old generation; each
+    generation is made up of numbered spaces (i.e. eden and the survivor spaces).
+
+    :cvar str GC_INVOCATIONS:      Format of the name of the number of collections done by a collector.
+    :cvar str GC_TIME:             Format of the name of the time spent by a collector, in ticks.
+    :cvar str GENERATION_CAPACITY: Format of the name of the committed bytes of a generation.
+    :cvar str GENERATION_SPACES:   Format of the name of the number of spaces in a generation.
+    :cvar str SPACE_USED:          Format of the name of the used bytes of a space in a generation.
+    :cvar str TICK_FREQUENCY:      Name of the number of ticks per second.
+    :cvar str THREADS:             Name of the number of live threads.
+    """
+    GC_INVOCATIONS = 'sun.gc.collector.{0}.invocations'
+    GC_TIME = 'sun.gc.collector.{0}.time'
+    GENERATION_CAPACITY = 'sun.gc.generation.{0}.capacity'
+    GENERATION_SPACES = 'sun.gc.generation.{0}.spaces'
+    SPACE_USED = 'sun.gc.generation.{0}.space.{1}.used'
+    TICK_FREQUENCY = 'sun.os.hrt.frequency'
+    THREADS = 'java.threads.live'
+
+
+# =====
+# Class: _ProcessTableKeys(object)
+# =====
+class _ProcessTableKeys(object):
+    """
+    Internal class for static reference to key names in the dict of attributes captured for each
+    process in the snapshot returned by *_get_process_table()*.
+
+    The top level keys are:
+
+    .. code-block:: yaml
+
+        <pid>:
+            cmdline: []
+            resident_memory: 0
+            status: {}
+            virtual_memory: 0
+
+    :cvar str CMDLINE:         Key referencing *cmdline* (list) of arguments read from /proc/<pid>/cmdline.
+    :cvar str RESIDENT_MEMORY: Key referencing *resident_memory* (int) in bytes, read from /proc/<pid>/statm.
+    :cvar str STATUS:          Key referencing *status* (dict) of the fields read from /proc/<pid>/status.
+    :cvar str VIRTUAL_MEMORY:  Key referencing *virtual_memory* (int) in bytes, read from /proc/<pid>/statm.
+    """
+    CMDLINE = 'cmdline'
+    RESIDENT_MEMORY = 'resident_memory'
+    STATUS = 'status'
+    VIRTUAL_MEMORY = 'virtual_memory'
+
+
 # =====
 # Class: _ResourceFormats(object)
 # =====
@@ -897,6 +1543,76 @@ class _ZypperInfoKeys(object):
 MODULE_RETURN_KEY = 'results'
 # Root directory path for SAS install
 SAS_ROOT_PATH = '/opt/sas'
+# Mount point of the proc filesystem
+PROC_PATH = '/proc'
+# Files listing the TCP sockets of the host, by IP version
+PROC_NET_TCP_FILES = ['/proc/net/tcp', '/proc/net/tcp6']
+# Prefix of the keys in rpm query output holding the numeric value of a package attribute
+METRIC_PREFIX = 'metric.'
+# Mount point of the cgroup filesystems
+CGROUP_PATH = '/sys/fs/cgroup'
+# Directories holding the performance data files JVMs publish for each running process, named by PID
+HSPERFDATA_GLOB = '/tmp/hsperfdata_*'
+# Maximum number of threads used to run independent commands concurrently
+MAX_WORKER_THREADS = 8
+# Maximum number of commands run at the same time by a single collector, or by all code running outside collectors
+MAX_CONCURRENT_COMMANDS = 8
+# Maximum number of bytes of output kept from a single command; a command producing more is stopped and treated as
+# failed (output that is streamed line by line is not held in memory and is not limited)
+MAX_COMMAND_OUTPUT = 64 * 1024 * 1024
+# Collectors run for each collection profile
+PROFILE_COLLECTORS = {
+    _CollectionProfiles.QUICK: [_Collectors.MEMORY, _Collectors.SERVICES],
+    _CollectionProfiles.STANDARD: [_Collectors.FILESYSTEMS, _Collectors.MEMORY, _Collectors.PACKAGES,
+                                   _Collectors.SAS_ROOT, _Collectors.SERVICES, _Collectors.UPDATES],
+    _CollectionProfiles.DEEP: [_Collectors.FILESYSTEMS, _Collectors.MEMORY, _Collectors.PACKAGES,
+                               _Collectors.SAS_ROOT, _Collectors.SERVICES, _Collectors.UPDATES,
+                               _Collectors.VERIFICATION, _Collectors.FOOTPRINT]
+}
+# Number of packages verified by each 'rpm -V' command, so the work can be spread evenly across worker threads
+VERIFY_SHARD_SIZE = 20
+# Maximum number of mismatched files listed for each verified package
+VERIFY_MAX_FILES = 100
+# Number of packages listed in the largest packages of each host
+LARGEST_PACKAGES_COUNT = 10
+# Locations of installed service scripts
+SERVICE_SCRIPT_GLOB = '/etc/init.d/*'
+SERVICE_SCRIPT_RC_GLOB = '/etc/rc.d/init.d/*'
+# Name of the cached directory size index for the SAS install root
+SAS_ROOT_INDEX_CACHE = 'sas_root_index.json'
+# Name of the cached installed SAS package details
+SAS_PACKAGES_CACHE = 'sas_packages.json'
+# Name of the cached results of the last package update check
+SAS_PACKAGE_UPDATES_CACHE = 'sas_package_updates.json'
+# Directories that may hold the rpm database, depending on the distribution and rpm version
+RPMDB_PATHS = ['/var/lib/rpm', '/usr/lib/sysimage/rpm']
+# Number of seconds to wait for the usage of a single mounted filesystem before it is skipped (i.e. a hung NFS mount)
+MOUNT_STAT_TIMEOUT = 5
+# Format of the cached directory size index, changed whenever the shape of its entries changes
+SAS_ROOT_INDEX_FORMAT = 3
+# Number of seconds after which the SAS install root index is rebuilt from scratch, so that files which changed size
+# without changing their directory are eventually counted correctly
+SAS_ROOT_INDEX_MAX_AGE = 24 * 60 * 60
+# Format of the cached installed SAS package details, changed whenever the shape of a package entry changes
+SAS_PACKAGES_CACHE_FORMAT = 2
+# Paths whose statvfs call did not return within MOUNT_STAT_TIMEOUT, which are not stat'ed again
+_unresponsive_paths = set()
+# Guards the set of unresponsive paths, which is shared by the collectors
+_unresponsive_paths_lock = threading.Lock()
+# Timings of the collector running on the current thread, shared with any worker threads the collector starts
+_thread_timings = threading.local()
+# Guards updates to timings that are shared between threads
+_timings_lock = threading.Lock()
+# Limits the number of commands running at the same time for the collector running on the current thread, shared
+# with any worker threads the collector starts, so a collector never waits for the commands of another one
+_thread_command_slots = threading.local()
+# Limits the number of commands running at the same time outside of any collector
+_default_command_slots = threading.BoundedSemaphore(MAX_CONCURRENT_COMMANDS)
+# Commands that have been started but not finished, including those of collectors abandoned after their deadline
+_running_commands = set()
+# Guards the set of running commands, and the flag set once they are stopped as the module exits
+_running_commands_lock = threading.Lock()
+_running_commands_stopped = [False]
 
 
 # =====
@@ -914,14 +1630,59 @@ def main():
     module = AnsibleModule(
         argument_spec={_ModuleParamKeys.HOSTVARS: dict(type='raw', required=True),
                        _ModuleParamKeys.INCL_PKG_FILES: dict(type=bool, default=False, required=False),
-                       _ModuleParamKeys.LOCALE_ENCODING: dict(type='str', default=None, required=False)},
+                       _ModuleParamKeys.LOCALE_ENCODING: dict(type='str', default=None, required=False),
+                       _ModuleParamKeys.SERVICE_STATUS_TIMEOUT: dict(type='int', default=300, required=False),
+                       _ModuleParamKeys.COLLECTOR_TIMEOUT: dict(type='int', default=600, required=False),
+                       _ModuleParamKeys.CPU_SAMPLE_INTERVAL: dict(type='float', default=1, required=False),
+                       _ModuleParamKeys.CACHE_DIR: dict(type='str', default='/var/cache/viya-ark', required=False),
+                       _ModuleParamKeys.USE_CACHE: dict(type='bool', default=True, required=False),
+                       _ModuleParamKeys.REFRESH_CACHE: dict(type='bool', default=False, required=False),
+                       _ModuleParamKeys.PKG_UPDATE_MODE: dict(type='str', default=_PackageUpdateModes.ONLINE,
+                                                              choices=[_PackageUpdateModes.ONLINE,
+                                                                       _PackageUpdateModes.OFFLINE],
+                                                              required=False),
+                       _ModuleParamKeys.PKG_UPDATE_TTL: dict(type='int', default=0, required=False),
+                       _ModuleParamKeys.PROFILE: dict(type='str', default=_CollectionProfiles.STANDARD,
+                                                      choices=[_CollectionProfiles.QUICK,
+                                                               _CollectionProfiles.STANDARD,
+                                                               _CollectionProfiles.DEEP],
+                                                      required=False),
+                       _ModuleParamKeys.VERIFY_PKGS: dict(type='bool', default=False, required=False),
+                       _ModuleParamKeys.INCL_PKG_FOOTPRINT: dict(type='bool', default=False, required=False)},
         supports_check_mode=True
     )
 
+    # the time and resources used by the module are reported with its results
+    module_start_time = time.time()
+    module_start_times = os.times()
+
     # get module parameters
     hostvars = module.params[_ModuleParamKeys.HOSTVARS]
     include_package_files = module.params[_ModuleParamKeys.INCL_PKG_FILES]
     locale_encoding = module.params[_ModuleParamKeys.LOCALE_ENCODING]
+    service_status_timeout = module.params[_ModuleParamKeys.SERVICE_STATUS_TIMEOUT]
+    collector_timeout = module.params[_ModuleParamKeys.COLLECTOR_TIMEOUT]
+    cpu_sample_interval = module.params[_ModuleParamKeys.CPU_SAMPLE_INTERVAL]
+    refresh_cache = module.params[_ModuleParamKeys.REFRESH_CACHE]
+    package_update_mode = module.params[_ModuleParamKeys.PKG_UPDATE_MODE]
+    package_update_ttl = module.params[_ModuleParamKeys.PKG_UPDATE_TTL]
+    profile = module.params[_ModuleParamKeys.PROFILE]
+
+    # the deep profile always includes installed files and the counters of running Java services
+    include_jvm_info = profile == _CollectionProfiles.DEEP
+    if include_jvm_info:
+        include_package_files = True
+
+    profile_collectors = list(PROFILE_COLLECTORS[profile])
+    if module.params[_ModuleParamKeys.VERIFY_PKGS] and _Collectors.VERIFICATION not in profile_collectors:
+        profile_collectors.append(_Collectors.VERIFICATION)
+    if module.params[_ModuleParamKeys.INCL_PKG_FOOTPRINT] and _Collectors.FOOTPRINT not in profile_collectors:
+        profile_collectors.append(_Collectors.FOOTPRINT)
+
+    # caching is disabled by not providing a cache directory to the collectors
+    cache_dir = None
+    if module.params[_ModuleParamKeys.USE_CACHE]:
+        cache_dir = module.params[_ModuleParamKeys.CACHE_DIR]
 
     # Starting in Ansible 2.8.1, there is the potential for hostvars
     # to be passed as a byte string, if the dict is too large
@@ -1008,18 +1769,23 @@ def main():
         # exit with the current information
         module.exit_json(changed=False, sas_host_details=results)
 
-    # as a fall back, make sure packages were installed before continuing
-    proc = subprocess.Popen('rpm -qg SAS', shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, bufsize=-1)
+    # reuse the installed SAS package details from the last run if the rpm database has not changed since
+    rpmdb_fingerprint = _get_rpmdb_fingerprint()
+    cached_packages = None
+    if cache_dir is not None and not refresh_cache and _Collectors.PACKAGES in profile_collectors:
+        cached_packages = _load_package_cache(cache_dir, rpmdb_fingerprint, include_package_files)
 
-    try:
-        proc.communicate()
-    except OSError:
-        proc.kill()
-        stdout, stderr = proc.communicate()
-        message = "Command {0} failed.".format('rpm -qg SAS')
-        module.fail_json(msg=message, command_stderr=stderr)
+    # as a fall back, make sure packages were installed before continuing
+    # profiles without the packages collector, such as the quick profile, skip the rpm query and rely on the install
+    # root alone, since they are meant to be run often
+    if cached_packages is not None:
+        sas_packages_installed = len(cached_packages) > 0
+    elif _Collectors.PACKAGES in profile_collectors:
+        sas_packages_installed = _is_sas_package_installed(module, collector_timeout)
+    else:
+        sas_packages_installed = True
 
-    if proc.returncode == 1:
+    if not sas_packages_installed:
         # set failed to false, nothing was installed so we can't report on this host
         # but that isn't a failure
         host_details[_HostDetailsKeys.FAILED] = False
@@ -1034,18 +1800,130 @@ def main():
         # exit with the current information
         module.exit_json(changed=False, sas_host_details=results)
 
+    # run the collectors selected by the profile concurrently
+    # a collector that fails or does not complete in time leaves its own section empty instead of failing the host
+    collector_args = {
+        _Collectors.FILESYSTEMS: (_get_filesystems_info, (module, collector_timeout)),
+        _Collectors.MEMORY: (_get_memory_info, (module, collector_timeout)),
+        _Collectors.SAS_ROOT: (_get_sas_root_info, (module, collector_timeout, cache_dir, refresh_cache)),
+        _Collectors.UPDATES: (_get_sas_package_update_info,
+                              (module, package_manager, locale_encoding, collector_timeout, package_update_mode,
+                               cache_dir, package_update_ttl, refresh_cache)),
+        _Collectors.SERVICES: (_get_sas_service_info,
+                               (module, service_status_timeout, cpu_sample_interval, include_jvm_info)),
+        _Collectors.PACKAGES: (_get_installed_package_info,
+                               (module, include_package_files, locale_encoding, collector_timeout))
+    }
+
+    collectors = list()
+    for collector in profile_collectors:
+        if collector == _Collectors.PACKAGES and cached_packages is not None:
+            continue
+
+        # collectors that need the packages run once the packages are known
+        if collector not in collector_args:
+            continue
+
+        function, args = collector_args[collector]
+        collectors.append((collector, function, args, collector_timeout))
+
+    collected, collector_errors, collector_timings = _run_collectors(collectors)
+
+    # collectors not selected by the profile return the same empty structure as a collector that did not complete
+    for collector in collector_args:
+        if collector not in profile_collectors:
+            collected[collector] = _get_default_collector_results(collector)
+
+    if cached_packages is not None:
+        collected[_Collectors.PACKAGES] = cached_packages
+    elif cache_dir is not None and not module.check_mode and _Collectors.PACKAGES in profile_collectors and \
+            _Collectors.PACKAGES not in collector_errors:
+        # cache the package details before update information is merged into them
+        # the packages are only cached when they were collected, never the empty default of a profile without them
+        _save_cache(cache_dir, SAS_PACKAGES_CACHE, {
+            _PackageCacheKeys.FINGERPRINT: rpmdb_fingerprint,
+            _PackageCacheKeys.FORMAT: SAS_PACKAGES_CACHE_FORMAT,
+            _PackageCacheKeys.INCL_PKG_FILES: include_package_files,
+            _PackageCacheKeys.PACKAGES: collected[_Collectors.PACKAGES]
+        })
+
+    # run the collectors that need the collected packages concurrently, in the same way as any other collector
+    package_collector_args = {
+        _Collectors.VERIFICATION: (_get_package_verification_info,
+                                   (sorted(collected[_Collectors.PACKAGES]), collector_timeout)),
+        _Collectors.FOOTPRINT: (_get_package_footprint_info,
+                                (module, collected[_Collectors.PACKAGES], include_package_files, locale_encoding,
+                                 collector_timeout))
+    }
+
+    package_collectors = list()
+    for collector in profile_collectors:
+        if collector in package_collector_args:
+            function, args = package_collector_args[collector]
+            package_collectors.append((collector, function, args, collector_timeout))
+
+    if package_collectors:
+        package_collected, package_collector_errors, package_collector_timings = _run_collectors(package_collectors)
+        collected.update(package_collected)
+        collector_errors.update(package_collector_errors)
+        collector_timings.update(package_collector_timings)
+
+    host_details[_HostDetailsKeys.COLLECTOR_ERRORS] = collector_errors
+    host_details[_HostDetailsKeys.COLLECTION_PROFILE] = profile
+    host_details[_HostDetailsKeys.COLLECTORS] = sorted(profile_collectors)
+
     # set host resource_check info
     host_details[_HostDetailsKeys.RESOURCE_CHECK] = {
-        _HostDetailsKeys.ResourceCheckKeys.FILESYSTEMS: _get_filesystems_info(module),
-        _HostDetailsKeys.ResourceCheckKeys.MEMORY: _get_memory_info(module),
-        _HostDetailsKeys.ResourceCheckKeys.SAS_ROOT: _get_sas_root_info(module)
+        _HostDetailsKeys.ResourceCheckKeys.FILESYSTEMS: collected[_Collectors.FILESYSTEMS],
+        _HostDetailsKeys.ResourceCheckKeys.MEMORY: collected[_Collectors.MEMORY],
+        _HostDetailsKeys.ResourceCheckKeys.SAS_ROOT: collected[_Collectors.SAS_ROOT]
     }
 
     # set host sas deployment info
-    packages, available_update_count = _get_sas_package_info(module, package_manager, include_package_files)
-    host_details[_HostDetailsKeys.AVAIL_UPDATE_COUNT] = available_update_count
+    packages = collected[_Collectors.PACKAGES]
+    update_check = collected[_Collectors.UPDATES]
+    update_results = update_check[_PackageUpdateCacheKeys.UPDATES]
+    for package_name, update_info in update_results.items():
+        if package_name in packages:
+            packages[package_name][_HostDetailsKeys.SASPackageKeys.UPDATE_STATUS] = update_info
+
+    host_details[_HostDetailsKeys.AVAIL_UPDATE_COUNT] = len(update_results)
+
+    # the counts are only set when the packages were verified, since the empty results of a verification that failed
+    # or timed out would otherwise report every package as unmodified
+    if _Collectors.VERIFICATION in collected and _Collectors.VERIFICATION not in collector_errors:
+        verification_results = collected[_Collectors.VERIFICATION]
+        modified_package_count = 0
+        for package_name, verification in verification_results.items():
+            if package_name in packages:
+                packages[package_name][_HostDetailsKeys.SASPackageKeys.VERIFICATION] = verification
+                if verification[_HostDetailsKeys.SASPackageKeys.PackageVerificationKeys.FILES]:
+                    modified_package_count += 1
+
+        # packages in a shard that failed have no verification summary
+        host_details[_HostDetailsKeys.MODIFIED_PKG_COUNT] = modified_package_count
+        host_details[_HostDetailsKeys.UNVERIFIED_PKG_COUNT] = len(
+            [package_name for package_name in packages if package_name not in verification_results])
+
+    if _Collectors.FOOTPRINT in collected:
+        footprint_results = collected[_Collectors.FOOTPRINT]
+        for package_name, disk_usage in footprint_results.items():
+            if package_name in packages:
+                package = packages[package_name]
+                package[_HostDetailsKeys.SASPackageKeys.ATTRIBUTES][
+                    _HostDetailsKeys.SASPackageKeys.PackageAttributesKeys.DISK_USAGE] = _bytesHumanReadable(disk_usage)
+                package.setdefault(_HostDetailsKeys.SASPackageKeys.METRICS, dict())[
+                    _HostDetailsKeys.SASPackageKeys.PackageAttributesKeys.DISK_USAGE] = disk_usage
+
+        largest_packages = sorted(footprint_results.items(), key=lambda item: (-item[1], item[0]))
+        host_details[_HostDetailsKeys.LARGEST_PACKAGES] = [
+            [package_name, _bytesHumanReadable(disk_usage)]
+            for package_name, disk_usage in largest_packages[:LARGEST_PACKAGES_COUNT]
+        ]
+
+    host_details[_HostDetailsKeys.PKG_UPDATE_CHECK] = _get_package_update_check_info(update_check)
     host_details[_HostDetailsKeys.SAS_PACKAGES] = packages
-    host_details[_HostDetailsKeys.SAS_SERVICES] = _get_sas_service_info(module)
+    host_details[_HostDetailsKeys.SAS_SERVICES] = collected[_Collectors.SERVICES]
 
     # map packages to any services they installed
     for package_name, package_data in host_details[_HostDetailsKeys.SAS_PACKAGES].items():
@@ -1055,6 +1933,10 @@ def main():
                 services[service_name][_HostDetailsKeys.SASServicesKeys.InstalledServiceKeys.INSTALLED_BY] = \
                     package_name
 
+    # record where the time went, so slow hosts and collectors can be found across the deployment
+    host_details[_HostDetailsKeys.TIMINGS] = _get_timings_info(module_start_time, module_start_times,
+                                                               collector_timings)
+
     # data gathering is done, set failed state to False
     host_details[_HostDetailsKeys.FAILED] = False
 
@@ -1065,182 +1947,522 @@ def main():
     # in the event of a successful module execution, you will want to
     # simple AnsibleModule.exit_json(), passing the key/value results
     #
-    # changed will always be 'False' since we'll never alter state on a host
+    # changed will always be 'False' since we'll never alter the configuration or software of a host
+    # the only files written are the ones cached in cache_dir, which can be disabled with use_cache
     module.exit_json(changed=False, sas_host_details=results)
 
 
 # =====
-# _get_filesystem_info(AnsibleModule)
+# _get_filesystem_info(AnsibleModule, int)
 # =====
-def _get_filesystems_info(module):
+def _get_filesystems_info(module, timeout=None):
     """
-    Retrieves file system information (via the **df** command) for the current host and returns the data as a dict.
+    Retrieves file system information for the current host and returns the data as a dict.
+
+    The mounted filesystems are read from /proc/self/mountinfo and their usage from statvfs. If that information
+    isn't available, the **df** command is used instead.
 
     :param AnsibleModule module: The AnsibleModule object representing the current module.
+    :param int timeout: The number of seconds after which any command run is stopped.
     :returns: A dict of filesystem indexes mapped to the filesystem attributes.
     :rtype dict:
     """
 
     # get a timestamp for when this information is being gathered (this can be used for reporting)
-    filesystem_timestamp = datetime.datetime.now().strftime("%A, %B %d, %Y %I:%M%p")
+    filesystem_time = datetime.datetime.now()
+    filesystem_timestamp = filesystem_time.strftime("%A, %B %d, %Y %I:%M%p")
 
     # initialize dict with results to be returned
     results = {
         _HostDetailsKeys.ResourceCheckKeys.RESULTS: dict(),
         _HostDetailsKeys.ResourceCheckKeys.RESULTS_FORMAT: _ResourceFormats.CURRENT,
         _HostDetailsKeys.ResourceCheckKeys.RESULTS_TIMESTAMP: filesystem_timestamp,
-        _HostDetailsKeys.ResourceCheckKeys.RESULTS_UNIT: _ResourceUnits.MB
+        _HostDetailsKeys.ResourceCheckKeys.RESULTS_UNIT: _ResourceUnits.MB,
+        _HostDetailsKeys.ResourceCheckKeys.RESULTS_EPOCH: _to_epoch(filesystem_time),
+        _HostDetailsKeys.ResourceCheckKeys.METRICS: dict()
     }
 
-    # execute the command to retrieve filesystem information
-    cmd_stdout = _execute_command("df -P --print-type", module, additional_rc=1)
+    try:
+        all_filesystems = _get_filesystems_usage(_get_mounts())
+    except (IOError, OSError):
+        all_filesystems = None
 
-    # split stdout by each line
-    all_filesystems = cmd_stdout.split('\n')[1:]
+    if all_filesystems is None:
+        # execute the command to retrieve filesystem information
+        cmd_stdout = _run_command("df -P --print-type", additional_rc=1, timeout=timeout)
+        all_filesystems = _parse_df_output(cmd_stdout)
 
     # an index will be used at the key for each filesystem since there is no
     # predictably unique attributes
     filesystem_index = 1
-    for filesystem in all_filesystems:
-
-        # split space-delineated information
-        filesystem_info = filesystem.split()
+    for filesystem_info in all_filesystems:
 
         # add the current filesystem to the dict at the current index.
-        if len(filesystem_info) == 7:
-            results[_HostDetailsKeys.ResourceCheckKeys.RESULTS][filesystem_index] = {
-                _HostDetailsKeys.ResourceCheckKeys.FilesystemAttributesKeys.FILESYSTEM: filesystem_info[0],
-                _HostDetailsKeys.ResourceCheckKeys.FilesystemAttributesKeys.TYPE: filesystem_info[1],
-                _HostDetailsKeys.ResourceCheckKeys.FilesystemAttributesKeys.SIZE:
-                    _bytesHumanReadable(int(filesystem_info[2]) * 1024),
-                _HostDetailsKeys.ResourceCheckKeys.FilesystemAttributesKeys.USED:
-                    _bytesHumanReadable(int(filesystem_info[3]) * 1024),
-                _HostDetailsKeys.ResourceCheckKeys.FilesystemAttributesKeys.AVAILABLE:
-                    _bytesHumanReadable(int(filesystem_info[4]) * 1024),
-                _HostDetailsKeys.ResourceCheckKeys.FilesystemAttributesKeys.USED_RATIO: filesystem_info[5],
-                _HostDetailsKeys.ResourceCheckKeys.FilesystemAttributesKeys.MOUNTED_ON: filesystem_info[6]
-            }
+        results[_HostDetailsKeys.ResourceCheckKeys.RESULTS][filesystem_index] = {
+            _HostDetailsKeys.ResourceCheckKeys.FilesystemAttributesKeys.FILESYSTEM: filesystem_info[0],
+            _HostDetailsKeys.ResourceCheckKeys.FilesystemAttributesKeys.TYPE: filesystem_info[1],
+            _HostDetailsKeys.ResourceCheckKeys.FilesystemAttributesKeys.SIZE: _bytesHumanReadable(filesystem_info[2]),
+            _HostDetailsKeys.ResourceCheckKeys.FilesystemAttributesKeys.USED: _bytesHumanReadable(filesystem_info[3]),
+            _HostDetailsKeys.ResourceCheckKeys.FilesystemAttributesKeys.AVAILABLE:
+                _bytesHumanReadable(filesystem_info[4]),
+            _HostDetailsKeys.ResourceCheckKeys.FilesystemAttributesKeys.USED_RATIO: filesystem_info[5],
+            _HostDetailsKeys.ResourceCheckKeys.FilesystemAttributesKeys.MOUNTED_ON: filesystem_info[6]
+        }
+
+        results[_HostDetailsKeys.ResourceCheckKeys.METRICS][filesystem_index] = {
+            _HostDetailsKeys.ResourceCheckKeys.FilesystemAttributesKeys.SIZE: filesystem_info[2],
+            _HostDetailsKeys.ResourceCheckKeys.FilesystemAttributesKeys.USED: filesystem_info[3],
+            _HostDetailsKeys.ResourceCheckKeys.FilesystemAttributesKeys.AVAILABLE: filesystem_info[4]
+        }
 
-            # increment index
-            filesystem_index += 1
+        # increment index
+        filesystem_index += 1
 
     # return the filesystem information
     return results
 
 
 # =====
-# _get_memory_info(AnsibleModule)
+# _get_mounts()
 # =====
-def _get_memory_info(module):
+def _get_mounts():
     """
-    Retrieves memory information (via the 'free' command) for the current host and returns the data as a dict.
+    Reads the mounted filesystems from /proc/self/mountinfo. Escaped characters in paths (i.e. spaces, which the
+    kernel writes as \\040) are decoded, so mount points with any name are returned intact.
 
-    :param AnsibleModule module: The AnsibleModule object representing the current module.
-    :returns: A dict of memory types mapped to that type's attributes.
-    :rtype dict:
+    :return: A list of (source, type, mount point, device) tuples in the order they were mounted.
+    :rtype list:
+    :raises IOError: If /proc/self/mountinfo cannot be read.
     """
 
-    # get a timestamp for when this information is being gathered (this can be used for reporting)
-    memory_timestamp = datetime.datetime.now().strftime("%A, %B %d, %Y %I:%M%p")
+    mounts = list()
 
-    # initialize dict with results to be returned
-    results = {
-        _HostDetailsKeys.ResourceCheckKeys.RESULTS: dict(),
-        _HostDetailsKeys.ResourceCheckKeys.RESULTS_FORMAT: '',
-        _HostDetailsKeys.ResourceCheckKeys.RESULTS_TIMESTAMP: memory_timestamp,
-        _HostDetailsKeys.ResourceCheckKeys.RESULTS_UNIT: _ResourceUnits.MB
-    }
-    mem_results = results[_HostDetailsKeys.ResourceCheckKeys.RESULTS]
+    for line in _read_proc_file(os.path.join(PROC_PATH, 'self', 'mountinfo')).split('\n'):
+        fields = line.split()
 
-    # execute the command to retrieve memory information
-    cmd_stdout = _execute_command("free -b", module)
+        # the optional fields end with a single '-' which is followed by the type and source
+        try:
+            separator_index = fields.index('-', 6)
+        except ValueError:
+            continue
 
-    # split the stdout by new line (each mem type should be on its own line)
-    all_mem = cmd_stdout.split('\n')[1:]
-    mem = all_mem[0].split()
-    swap = all_mem[1].split()
+        if len(fields) < separator_index + 3:
+            continue
 
-    # check for '-/+ buffer/cache' line that is in older versions for free
-    # this output was removed in free-3.3.10
-    free_format = _ResourceFormats.CURRENT
-    if swap[0] == '-/+':
-        swap = all_mem[2].split()
-        free_format = _ResourceFormats.OLD
+        mounts.append((_unescape_mount_field(fields[separator_index + 2]),
+                       fields[separator_index + 1],
+                       _unescape_mount_field(fields[4]),
+                       fields[2]))
 
-    # add format type to results
-    results[_HostDetailsKeys.ResourceCheckKeys.RESULTS_FORMAT] = free_format
+    return mounts
 
-    # get attributes of physical memory
-    physical_results = dict()
-    if len(mem) == 7:
-        physical_results[_HostDetailsKeys.ResourceCheckKeys.MemoryResultsKeys.MemoryAttributesKeys.TOTAL] = _bytesHumanReadable(mem[1])
-        physical_results[_HostDetailsKeys.ResourceCheckKeys.MemoryResultsKeys.MemoryAttributesKeys.USED] = _bytesHumanReadable(mem[2])
-        physical_results[_HostDetailsKeys.ResourceCheckKeys.MemoryResultsKeys.MemoryAttributesKeys.FREE] = _bytesHumanReadable(mem[3])
-        physical_results[_HostDetailsKeys.ResourceCheckKeys.MemoryResultsKeys.MemoryAttributesKeys.SHARED] = _bytesHumanReadable(mem[4])
 
-        if free_format == _ResourceFormats.CURRENT:
-            # current format
-            physical_results[_HostDetailsKeys.ResourceCheckKeys.MemoryResultsKeys.MemoryAttributesKeys.BUFF_CACHE] = \
-                _bytesHumanReadable(mem[5])
-            physical_results[_HostDetailsKeys.ResourceCheckKeys.MemoryResultsKeys.MemoryAttributesKeys.AVAILABLE] = \
-                _bytesHumanReadable(mem[6])
-            # old format
-            physical_results[_HostDetailsKeys.ResourceCheckKeys.MemoryResultsKeys.MemoryAttributesKeys.BUFFERS] = ''
-            physical_results[_HostDetailsKeys.ResourceCheckKeys.MemoryResultsKeys.MemoryAttributesKeys.CACHED] = ''
-        else:
-            # current format
-            physical_results[_HostDetailsKeys.ResourceCheckKeys.MemoryResultsKeys.MemoryAttributesKeys.BUFF_CACHE] = ''
-            physical_results[_HostDetailsKeys.ResourceCheckKeys.MemoryResultsKeys.MemoryAttributesKeys.AVAILABLE] = ''
-            # old format
-            physical_results[_HostDetailsKeys.ResourceCheckKeys.MemoryResultsKeys.MemoryAttributesKeys.BUFFERS] = _bytesHumanReadable(mem[5])
-            physical_results[_HostDetailsKeys.ResourceCheckKeys.MemoryResultsKeys.MemoryAttributesKeys.CACHED] = _bytesHumanReadable(mem[6])
+# =====
+# _unescape_mount_field(str)
+# =====
+def _unescape_mount_field(value):
+    """
+    Decodes the octal escape sequences the kernel uses for whitespace and backslashes in mount paths.
 
-        mem_results[_HostDetailsKeys.ResourceCheckKeys.MemoryResultsKeys.PHYSICAL] = physical_results
+    :param str value: The field as written in /proc/self/mountinfo.
+    :return: The decoded field.
+    :rtype str:
+    """
 
-    # get attributes of swap space
-    swap_results = dict()
-    if len(swap) == 4:
-        swap_results[_HostDetailsKeys.ResourceCheckKeys.MemoryResultsKeys.MemoryAttributesKeys.TOTAL] = swap[1]
-        swap_results[_HostDetailsKeys.ResourceCheckKeys.MemoryResultsKeys.MemoryAttributesKeys.USED] = swap[2]
-        swap_results[_HostDetailsKeys.ResourceCheckKeys.MemoryResultsKeys.MemoryAttributesKeys.FREE] = swap[3]
-        swap_results[_HostDetailsKeys.ResourceCheckKeys.MemoryResultsKeys.MemoryAttributesKeys.SHARED] = ''
-        # current format
-        swap_results[_HostDetailsKeys.ResourceCheckKeys.MemoryResultsKeys.MemoryAttributesKeys.BUFF_CACHE] = ''
-        swap_results[_HostDetailsKeys.ResourceCheckKeys.MemoryResultsKeys.MemoryAttributesKeys.AVAILABLE] = ''
-        # old format
-        swap_results[_HostDetailsKeys.ResourceCheckKeys.MemoryResultsKeys.MemoryAttributesKeys.BUFFERS] = ''
-        swap_results[_HostDetailsKeys.ResourceCheckKeys.MemoryResultsKeys.MemoryAttributesKeys.CACHED] = ''
+    return re.sub(r'\\([0-7]{3})', lambda match: chr(int(match.group(1), 8)), value)
 
-        mem_results[_HostDetailsKeys.ResourceCheckKeys.MemoryResultsKeys.SWAP] = swap_results
 
-    # return the memory information
+# =====
+# _get_filesystems_usage(list)
+# =====
+def _get_filesystems_usage(mounts):
+    """
+    Returns the usage of each mounted filesystem, following the same rules as **df**: filesystems with no blocks
+    (i.e. proc or sysfs) and filesystems hidden by a later mount at the same mount point are left out and, when a
+    device is mounted more than once, only the shortest mount point is kept.
+
+    The usage of every mount is read concurrently with statvfs, each on a separate thread, and all of them are waited
+    for until a single deadline MOUNT_STAT_TIMEOUT seconds away. A mount that does not respond by then, such as a hung
+    NFS mount, is skipped so that it cannot block the module, however many mounts are hung.
+
+    :param list mounts: A list of mounts returned by *_get_mounts()*.
+    :return: A list of (filesystem, type, size, used, available, used ratio, mounted on) tuples, with sizes in bytes.
+    :rtype list:
+    """
+
+    # only the last filesystem mounted at a mount point is visible
+    visible_mounts = dict()
+    for mount in mounts:
+        visible_mounts[mount[2]] = mount
+    mounts = [mount for mount in mounts if visible_mounts[mount[2]] is mount]
+
+    # keep the shortest mount point for each device, in mount order
+    device_mounts = dict()
+    for mount in mounts:
+        device = mount[3]
+        if device not in device_mounts or len(mount[2]) < len(device_mounts[device][2]):
+            device_mounts[device] = mount
+
+    mounts = [mount for mount in mounts if device_mounts[mount[3]] is mount]
+    filesystem_stats = _statvfs([mount[2] for mount in mounts], MOUNT_STAT_TIMEOUT)
+
+    results = list()
+    for mount in mounts:
+        filesystem_usage = _calculate_filesystem_usage(mount, filesystem_stats.get(mount[2]))
+        if filesystem_usage is not None and filesystem_usage[2] > 0:
+            results.append(filesystem_usage)
+
     return results
 
 
 # =====
-# _get_sas_root_info(AnsibleModule)
+# _get_filesystem_usage(tuple)
 # =====
-def _get_sas_root_info(module):
+def _get_filesystem_usage(mount):
     """
-    Retrieves resource information about the SAS install root and returns a dict of attributes.
+    Returns the usage of a single mounted filesystem, calculated the same way as by **df**.
 
-    :param AnsibleModule module: The AnsibleModule object representing the current module.
-    :return: A dict of attributes for the SAS install root.
-    :rtype dict:
+    :param tuple mount: A mount returned by *_get_mounts()*.
+    :return: A (filesystem, type, size, used, available, used ratio, mounted on) tuple with sizes in bytes, or None if
+             the usage could not be read within MOUNT_STAT_TIMEOUT seconds.
+    :rtype tuple:
     """
 
-    # get a timestamp for when this information is being gathered (this can be used for reporting)
-    sas_root_timestamp = datetime.datetime.now().strftime("%A, %B %d, %Y %I:%M%p")
+    return _calculate_filesystem_usage(mount, _statvfs([mount[2]], MOUNT_STAT_TIMEOUT).get(mount[2]))
+
+
+# =====
+# _calculate_filesystem_usage(tuple, os.statvfs_result)
+# =====
+def _calculate_filesystem_usage(mount, filesystem_stat):
+    """
+    Returns the usage of a single mounted filesystem from the result of statvfs, calculated the same way as by **df**.
+
+    :param tuple mount: A mount returned by *_get_mounts()*.
+    :param os.statvfs_result filesystem_stat: The result of statvfs for the mount point, or None if it was not read.
+    :return: A (filesystem, type, size, used, available, used ratio, mounted on) tuple with sizes in bytes, or None if
+             no result was given.
+    :rtype tuple:
+    """
+
+    if filesystem_stat is None:
+        return None
+
+    source, filesystem_type, mount_point = mount[0], mount[1], mount[2]
+
+    size = filesystem_stat.f_blocks * filesystem_stat.f_frsize
+    used = (filesystem_stat.f_blocks - filesystem_stat.f_bfree) * filesystem_stat.f_frsize
+    available = filesystem_stat.f_bavail * filesystem_stat.f_frsize
+
+    # df rounds the used percentage up
+    if used + available > 0:
+        used_ratio = "{0}%".format(-(-used * 100 // (used + available)))
+    else:
+        used_ratio = '-'
+
+    return source, filesystem_type, size, used, available, used_ratio, mount_point
+
+
+# =====
+# _statvfs(list, int)
+# =====
+def _statvfs(paths, timeout):
+    """
+    Calls statvfs for each of the given paths, each on a separate thread, and waits for all of them until a single
+    deadline the given timeout away.
+
+    A path that did not return in time is remembered and not stat'ed again by later calls, so a hung filesystem only
+    ever blocks one thread.
+
+    :param list paths: The paths to stat.
+    :param int timeout: The number of seconds to wait for all of the paths.
+    :return: A dict of paths mapped to the result of statvfs. Paths that failed or did not return in time are left
+             out.
+    :rtype dict:
+    """
+
+    results = dict()
+
+    def _stat(path):
+        try:
+            results[path] = os.statvfs(path)
+        except OSError:
+            pass  # the filesystem is not accessible
+
+    # the threads are daemons so that a call blocked on an unresponsive filesystem does not keep the module running
+    threads = list()
+    with _unresponsive_paths_lock:
+        for path in paths:
+            if path in _unresponsive_paths:
+                continue
+
+            thread = threading.Thread(target=_stat, args=(path,))
+            thread.daemon = True
+            thread.start()
+            threads.append((path, thread))
+
+    deadline = time.time() + timeout
+    for path, thread in threads:
+        thread.join(max(0, deadline - time.time()))
+
+    with _unresponsive_paths_lock:
+        for path, thread in threads:
+            if thread.is_alive():
+                _unresponsive_paths.add(path)
+
+    # copied so a thread that returns late does not change the results
+    return dict(results)
+
+
+# =====
+# _parse_df_output(str)
+# =====
+def _parse_df_output(df_stdout):
+    """
+    Parses the output of **df -P --print-type**.
+
+    :param str df_stdout: The output of the command.
+    :return: A list of (filesystem, type, size, used, available, used ratio, mounted on) tuples, with sizes in bytes.
+    :rtype list:
+    """
+
+    results = list()
+
+    # split stdout by each line, skipping the header
+    for filesystem in df_stdout.split('\n')[1:]:
+
+        # split space-delineated information
+        filesystem_info = filesystem.split()
+
+        if len(filesystem_info) == 7:
+            results.append((filesystem_info[0], filesystem_info[1], int(filesystem_info[2]) * 1024,
+                            int(filesystem_info[3]) * 1024, int(filesystem_info[4]) * 1024, filesystem_info[5],
+                            filesystem_info[6]))
+
+    return results
+
+
+# =====
+# _get_memory_info(AnsibleModule, int)
+# =====
+def _get_memory_info(module, timeout=None):
+    """
+    Retrieves memory information for the current host and returns the data as a dict.
+
+    The values are read from /proc/meminfo and calculated the same way as by the current version of **free**. If
+    /proc/meminfo isn't available, the 'free' command is used instead.
+
+    :param AnsibleModule module: The AnsibleModule object representing the current module.
+    :param int timeout: The number of seconds after which any command run is stopped.
+    :returns: A dict of memory types mapped to that type's attributes.
+    :rtype dict:
+    """
+
+    # get a timestamp for when this information is being gathered (this can be used for reporting)
+    memory_time = datetime.datetime.now()
+    memory_timestamp = memory_time.strftime("%A, %B %d, %Y %I:%M%p")
+
+    # initialize dict with results to be returned
+    results = {
+        _HostDetailsKeys.ResourceCheckKeys.RESULTS: dict(),
+        _HostDetailsKeys.ResourceCheckKeys.RESULTS_FORMAT: '',
+        _HostDetailsKeys.ResourceCheckKeys.RESULTS_TIMESTAMP: memory_timestamp,
+        _HostDetailsKeys.ResourceCheckKeys.RESULTS_UNIT: _ResourceUnits.MB,
+        _HostDetailsKeys.ResourceCheckKeys.RESULTS_EPOCH: _to_epoch(memory_time),
+        _HostDetailsKeys.ResourceCheckKeys.METRICS: dict()
+    }
+    mem_results = results[_HostDetailsKeys.ResourceCheckKeys.RESULTS]
+    mem_metrics = results[_HostDetailsKeys.ResourceCheckKeys.METRICS]
+
+    try:
+        mem, swap = _get_meminfo_usage()
+        free_format = _ResourceFormats.CURRENT
+    except (IOError, OSError):
+        # execute the command to retrieve memory information
+        cmd_stdout = _run_command("free -b", timeout=timeout)
+
+        # split the stdout by new line (each mem type should be on its own line)
+        all_mem = cmd_stdout.split('\n')[1:]
+        mem = all_mem[0].split()
+        swap = all_mem[1].split()
+
+        # check for '-/+ buffer/cache' line that is in older versions for free
+        # this output was removed in free-3.3.10
+        free_format = _ResourceFormats.CURRENT
+        if swap[0] == '-/+':
+            swap = all_mem[2].split()
+            free_format = _ResourceFormats.OLD
+
+    # add format type to results
+    results[_HostDetailsKeys.ResourceCheckKeys.RESULTS_FORMAT] = free_format
+
+    # get attributes of physical memory
+    physical_results = dict()
+    if len(mem) == 7:
+        physical_results[_HostDetailsKeys.ResourceCheckKeys.MemoryResultsKeys.MemoryAttributesKeys.TOTAL] = _bytesHumanReadable(mem[1])
+        physical_results[_HostDetailsKeys.ResourceCheckKeys.MemoryResultsKeys.MemoryAttributesKeys.USED] = _bytesHumanReadable(mem[2])
+        physical_results[_HostDetailsKeys.ResourceCheckKeys.MemoryResultsKeys.MemoryAttributesKeys.FREE] = _bytesHumanReadable(mem[3])
+        physical_results[_HostDetailsKeys.ResourceCheckKeys.MemoryResultsKeys.MemoryAttributesKeys.SHARED] = _bytesHumanReadable(mem[4])
+
+        if free_format == _ResourceFormats.CURRENT:
+            # current format
+            physical_results[_HostDetailsKeys.ResourceCheckKeys.MemoryResultsKeys.MemoryAttributesKeys.BUFF_CACHE] = \
+                _bytesHumanReadable(mem[5])
+            physical_results[_HostDetailsKeys.ResourceCheckKeys.MemoryResultsKeys.MemoryAttributesKeys.AVAILABLE] = \
+                _bytesHumanReadable(mem[6])
+            # old format
+            physical_results[_HostDetailsKeys.ResourceCheckKeys.MemoryResultsKeys.MemoryAttributesKeys.BUFFERS] = ''
+            physical_results[_HostDetailsKeys.ResourceCheckKeys.MemoryResultsKeys.MemoryAttributesKeys.CACHED] = ''
+        else:
+            # current format
+            physical_results[_HostDetailsKeys.ResourceCheckKeys.MemoryResultsKeys.MemoryAttributesKeys.BUFF_CACHE] = ''
+            physical_results[_HostDetailsKeys.ResourceCheckKeys.MemoryResultsKeys.MemoryAttributesKeys.AVAILABLE] = ''
+            # old format
+            physical_results[_HostDetailsKeys.ResourceCheckKeys.MemoryResultsKeys.MemoryAttributesKeys.BUFFERS] = _bytesHumanReadable(mem[5])
+            physical_results[_HostDetailsKeys.ResourceCheckKeys.MemoryResultsKeys.MemoryAttributesKeys.CACHED] = _bytesHumanReadable(mem[6])
+
+        mem_results[_HostDetailsKeys.ResourceCheckKeys.MemoryResultsKeys.PHYSICAL] = physical_results
+
+        # the numeric value of each size that is set
+        mem_metrics[_HostDetailsKeys.ResourceCheckKeys.MemoryResultsKeys.PHYSICAL] = \
+            _get_memory_metrics(mem, physical_results)
+
+    # get attributes of swap space
+    swap_results = dict()
+    if len(swap) == 4:
+        swap_results[_HostDetailsKeys.ResourceCheckKeys.MemoryResultsKeys.MemoryAttributesKeys.TOTAL] = \
+            _bytesHumanReadable(swap[1])
+        swap_results[_HostDetailsKeys.ResourceCheckKeys.MemoryResultsKeys.MemoryAttributesKeys.USED] = \
+            _bytesHumanReadable(swap[2])
+        swap_results[_HostDetailsKeys.ResourceCheckKeys.MemoryResultsKeys.MemoryAttributesKeys.FREE] = \
+            _bytesHumanReadable(swap[3])
+        swap_results[_HostDetailsKeys.ResourceCheckKeys.MemoryResultsKeys.MemoryAttributesKeys.SHARED] = ''
+        # current format
+        swap_results[_HostDetailsKeys.ResourceCheckKeys.MemoryResultsKeys.MemoryAttributesKeys.BUFF_CACHE] = ''
+        swap_results[_HostDetailsKeys.ResourceCheckKeys.MemoryResultsKeys.MemoryAttributesKeys.AVAILABLE] = ''
+        # old format
+        swap_results[_HostDetailsKeys.ResourceCheckKeys.MemoryResultsKeys.MemoryAttributesKeys.BUFFERS] = ''
+        swap_results[_HostDetailsKeys.ResourceCheckKeys.MemoryResultsKeys.MemoryAttributesKeys.CACHED] = ''
+
+        mem_results[_HostDetailsKeys.ResourceCheckKeys.MemoryResultsKeys.SWAP] = swap_results
+        mem_metrics[_HostDetailsKeys.ResourceCheckKeys.MemoryResultsKeys.SWAP] = _get_memory_metrics(swap, swap_results)
+
+    # return the memory information
+    return results
+
+
+# =====
+# _get_memory_metrics(list, dict)
+# =====
+def _get_memory_metrics(values, memory_results):
+    """
+    Returns the number of bytes of each size set in the results for a memory type. The values are the columns of
+    the type's line of **free -b** output, in the order of the attributes below.
+
+    :param list values: The 'Mem:' or 'Swap:' line of **free -b** output, split into columns.
+    :param dict memory_results: The results for the memory type, used to find which sizes are set.
+    :return: A dict of memory attribute names mapped to a number of bytes (int).
+    :rtype dict:
+    """
+
+    memory_keys = _HostDetailsKeys.ResourceCheckKeys.MemoryResultsKeys.MemoryAttributesKeys
+
+    # the last two columns are either buff/cache and available, or buffers and cached, depending on the format
+    if memory_results.get(memory_keys.BUFFERS):
+        columns = [memory_keys.TOTAL, memory_keys.USED, memory_keys.FREE, memory_keys.SHARED, memory_keys.BUFFERS,
+                   memory_keys.CACHED]
+    else:
+        columns = [memory_keys.TOTAL, memory_keys.USED, memory_keys.FREE, memory_keys.SHARED, memory_keys.BUFF_CACHE,
+                   memory_keys.AVAILABLE]
+
+    metrics = dict()
+    for column, value in zip(columns, values[1:]):
+        try:
+            metrics[column] = int(value)
+        except ValueError:
+            pass  # not a number
+
+    return metrics
+
+
+# =====
+# _get_meminfo_usage()
+# =====
+def _get_meminfo_usage():
+    """
+    Reads /proc/meminfo and returns memory and swap usage as the columns of the 'Mem:' and 'Swap:' lines of
+    **free -b** (free-3.3.10 or later).
+
+    :return: A tuple of the list of memory columns (total, used, free, shared, buff/cache, available) and the list
+             of swap columns (total, used, free), each prefixed with its label and with values in bytes.
+    :rtype tuple:
+    :raises IOError: If /proc/meminfo cannot be read.
+    """
+
+    # values in /proc/meminfo are reported in kB
+    meminfo = dict()
+    for line in _read_proc_file(os.path.join(PROC_PATH, 'meminfo')).split('\n'):
+        key, sep, value = line.partition(':')
+        value = value.split()
+        if sep and value and value[0].isdigit():
+            meminfo[key] = int(value[0]) * 1024
+
+    total = meminfo.get('MemTotal', 0)
+    free = meminfo.get('MemFree', 0)
+    buff_cache = meminfo.get('Buffers', 0) + meminfo.get('Cached', 0) + meminfo.get('SReclaimable', 0)
+
+    used = total - free - buff_cache
+    if used < 0:
+        used = total - free
+
+    mem = ['Mem:', total, used, free, meminfo.get('Shmem', 0), buff_cache, meminfo.get('MemAvailable', free)]
+
+    swap_total = meminfo.get('SwapTotal', 0)
+    swap_free = meminfo.get('SwapFree', 0)
+    swap = ['Swap:', swap_total, swap_total - swap_free, swap_free]
+
+    return [str(value) for value in mem], [str(value) for value in swap]
+
+
+# =====
+# _get_sas_root_info(AnsibleModule, int, str, bool)
+# =====
+def _get_sas_root_info(module, timeout=None, cache_dir=None, refresh_cache=False):
+    """
+    Retrieves resource information about the SAS install root and returns a dict of attributes.
+
+    When a cache directory is given, the size of the install root is calculated from an index of directory sizes
+    that is kept in the cache, so only directories that changed since the last run are read again. Otherwise, the
+    **du** command is used. Files that grow in place are only counted once the index is rebuilt, which happens when
+    it is older than *SAS_ROOT_INDEX_MAX_AGE* or when *refresh_cache* is set.
+
+    :param AnsibleModule module: The AnsibleModule object representing the current module.
+    :param int timeout: The number of seconds after which any command run is stopped.
+    :param str cache_dir: The directory holding cached data, or None if caching is disabled.
+    :param bool refresh_cache: Whether the cached index should be discarded and rebuilt.
+    :return: A dict of attributes for the SAS install root.
+    :rtype dict:
+    """
+
+    # get a timestamp for when this information is being gathered (this can be used for reporting)
+    sas_root_time = datetime.datetime.now()
+    sas_root_timestamp = sas_root_time.strftime("%A, %B %d, %Y %I:%M%p")
 
     # initialize dict with results to be returned
     results = {
         _HostDetailsKeys.ResourceCheckKeys.RESULTS: dict(),
         _HostDetailsKeys.ResourceCheckKeys.RESULTS_FORMAT: '',
         _HostDetailsKeys.ResourceCheckKeys.RESULTS_TIMESTAMP: sas_root_timestamp,
-        _HostDetailsKeys.ResourceCheckKeys.RESULTS_UNIT: _ResourceUnits.MB
+        _HostDetailsKeys.ResourceCheckKeys.RESULTS_UNIT: _ResourceUnits.MB,
+        _HostDetailsKeys.ResourceCheckKeys.RESULTS_EPOCH: _to_epoch(sas_root_time),
+        _HostDetailsKeys.ResourceCheckKeys.METRICS: {
+            _HostDetailsKeys.ResourceCheckKeys.SASRootResultsKeys.DIRECTORIES: dict()
+        }
     }
+    root_metrics = results[_HostDetailsKeys.ResourceCheckKeys.METRICS]
 
     root_results = {
+        _HostDetailsKeys.ResourceCheckKeys.SASRootResultsKeys.DIRECTORIES: dict(),
         _HostDetailsKeys.ResourceCheckKeys.SASRootResultsKeys.FILESYSTEM: '',
         _HostDetailsKeys.ResourceCheckKeys.SASRootResultsKeys.FILESYSTEM_TOTAL: '',
         _HostDetailsKeys.ResourceCheckKeys.SASRootResultsKeys.MOUNT: '',
@@ -1249,34 +2471,63 @@ def _get_sas_root_info(module):
         _HostDetailsKeys.ResourceCheckKeys.SASRootResultsKeys.USED_RATIO: '',
     }
 
-    root_du_stdout = _execute_command("du --summarize " + SAS_ROOT_PATH, module, additional_rc=1)
-    root_du = root_du_stdout.split()
-
     root_size = ''
-    if len(root_du) == 2:
-        root_size = int(root_du[0]) * 1024
+    if cache_dir is not None:
+        # load the index from the last run, unless it should be rebuilt
+        previous_index = None
+        if not refresh_cache:
+            previous_index = _load_cache(cache_dir, SAS_ROOT_INDEX_CACHE)
+
+        index = _update_directory_index(SAS_ROOT_PATH, previous_index)
+        if not module.check_mode:
+            _save_cache(cache_dir, SAS_ROOT_INDEX_CACHE, index)
+
+        root_size, directory_sizes = _get_directory_index_sizes(index)
         root_results[_HostDetailsKeys.ResourceCheckKeys.SASRootResultsKeys.SIZE] = _bytesHumanReadable(root_size)
-        root_results[_HostDetailsKeys.ResourceCheckKeys.SASRootResultsKeys.PATH] = root_du[1]
+        root_results[_HostDetailsKeys.ResourceCheckKeys.SASRootResultsKeys.PATH] = SAS_ROOT_PATH
+        for directory_name, directory_size in directory_sizes.items():
+            root_results[_HostDetailsKeys.ResourceCheckKeys.SASRootResultsKeys.DIRECTORIES][directory_name] = \
+                _bytesHumanReadable(directory_size)
+            root_metrics[_HostDetailsKeys.ResourceCheckKeys.SASRootResultsKeys.DIRECTORIES][directory_name] = \
+                directory_size
+    else:
+        root_du_stdout = _run_command("du --summarize " + SAS_ROOT_PATH, additional_rc=1, timeout=timeout)
+        root_du = root_du_stdout.split()
 
-    root_df_stdout = _execute_command("df -P --print-type " + SAS_ROOT_PATH, module, additional_rc=1)
-    root_df = root_df_stdout.split("\n")[1:]
+        if len(root_du) == 2:
+            root_size = int(root_du[0]) * 1024
+            root_results[_HostDetailsKeys.ResourceCheckKeys.SASRootResultsKeys.SIZE] = _bytesHumanReadable(root_size)
+            root_results[_HostDetailsKeys.ResourceCheckKeys.SASRootResultsKeys.PATH] = root_du[1]
 
-    fs_size = ''
-    if len(root_df) > 0:
+    # find the filesystem holding the install root, which is mounted at the longest mount point containing it
+    try:
+        root_real_path = os.path.realpath(SAS_ROOT_PATH)
+        root_mounts = [mount for mount in _get_mounts()
+                       if root_real_path == mount[2] or root_real_path.startswith(mount[2].rstrip('/') + '/')]
+        root_df = [_get_filesystem_usage(max(root_mounts, key=lambda mount: len(mount[2])))]
+    except (IOError, OSError, ValueError):
+        root_df_stdout = _run_command("df -P --print-type " + SAS_ROOT_PATH, additional_rc=1, timeout=timeout)
+        root_df = _parse_df_output(root_df_stdout)
 
-        root_fs = root_df[0].split()
+    fs_size = ''
+    if len(root_df) > 0 and root_df[0] is not None:
 
-        if len(root_fs) == 7:
-            fs_size = int(root_fs[2]) * 1024
-            root_results[_HostDetailsKeys.ResourceCheckKeys.SASRootResultsKeys.FILESYSTEM] = root_fs[0]
-            root_results[_HostDetailsKeys.ResourceCheckKeys.SASRootResultsKeys.FILESYSTEM_TOTAL] = _bytesHumanReadable(fs_size)
-            root_results[_HostDetailsKeys.ResourceCheckKeys.SASRootResultsKeys.MOUNT] = root_fs[6]
+        root_fs = root_df[0]
+        fs_size = root_fs[2]
+        root_results[_HostDetailsKeys.ResourceCheckKeys.SASRootResultsKeys.FILESYSTEM] = root_fs[0]
+        root_results[_HostDetailsKeys.ResourceCheckKeys.SASRootResultsKeys.FILESYSTEM_TOTAL] = _bytesHumanReadable(fs_size)
+        root_results[_HostDetailsKeys.ResourceCheckKeys.SASRootResultsKeys.MOUNT] = root_fs[6]
 
     # if root_size.endswith(_ResourceUnits.MB) and fs_size.endswith(_ResourceUnits.MB):
     #     used_ratio = float(root_size[:-2]) / float(fs_size[:-2])
     #     root_results[_HostDetailsKeys.ResourceCheckKeys.SASRootResultsKeys.USED_RATIO] = \
     #         str(int(round(used_ratio * 100))) + '%'
 
+    if root_size != '':
+        root_metrics[_HostDetailsKeys.ResourceCheckKeys.SASRootResultsKeys.SIZE] = root_size
+    if fs_size != '':
+        root_metrics[_HostDetailsKeys.ResourceCheckKeys.SASRootResultsKeys.FILESYSTEM_TOTAL] = fs_size
+
     used_ratio = float(root_size) / float(fs_size)
     root_results[_HostDetailsKeys.ResourceCheckKeys.SASRootResultsKeys.USED_RATIO] = \
         str(int(round(used_ratio * 100))) + '%'
@@ -1286,14 +2537,181 @@ def _get_sas_root_info(module):
 
 
 # =====
-# _get_sas_service_info(AnsibleModule)
+# _update_directory_index(str, dict)
+# =====
+def _update_directory_index(root_path, previous_index=None):
+    """
+    Builds an index of the disk space used by the files in each directory under the given root path.
+
+    Every directory is checked with a single stat call. If a directory's device, inode, and modification time match
+    its entry in the previous index, its files were neither added, removed, nor renamed, so the entry is reused
+    without reading the directory again. Only changed directories are listed and have their files examined.
+
+    A file that grows or shrinks in place does not change the modification time of its directory, so its size is
+    only picked up when the directory changes or the index is rebuilt. The previous index is discarded once it is
+    older than *SAS_ROOT_INDEX_MAX_AGE*, which bounds how stale the reused sizes can be.
+
+    Like **du**, sizes are the allocated blocks of each file, symbolic links are not followed, and files with more
+    than one hard link are counted once.
+
+    :param str root_path: The path of the directory to index.
+    :param dict previous_index: The index returned by a previous call, or None to build the index from scratch.
+    :return: The directory index for the root path.
+    :rtype dict:
+    """
+
+    # reuse entries only from a recent index of the same root written in the current format
+    previous_directories = dict()
+    created = time.time()
+    if previous_index is not None and previous_index.get(_DirectoryIndexKeys.ROOT) == root_path and \
+            previous_index.get(_DirectoryIndexKeys.FORMAT) == SAS_ROOT_INDEX_FORMAT and \
+            0 <= created - previous_index.get(_DirectoryIndexKeys.CREATED, 0) < SAS_ROOT_INDEX_MAX_AGE:
+        previous_directories = previous_index.get(_DirectoryIndexKeys.DIRECTORIES, dict())
+        created = previous_index[_DirectoryIndexKeys.CREATED]
+
+    directories = dict()
+    pending = [root_path]
+
+    while pending:
+        directory_path = pending.pop()
+
+        try:
+            directory_stat = os.lstat(directory_path)
+        except OSError:
+            # the directory was removed after its parent was read
+            continue
+
+        previous_entry = previous_directories.get(directory_path)
+        if previous_entry is not None and \
+                previous_entry[_DirectoryIndexKeys.DEVICE] == directory_stat.st_dev and \
+                previous_entry[_DirectoryIndexKeys.INODE] == directory_stat.st_ino and \
+                previous_entry[_DirectoryIndexKeys.MTIME] == directory_stat.st_mtime:
+            entry = previous_entry
+        else:
+            entry = _read_directory_index_entry(directory_path, directory_stat)
+
+        directories[directory_path] = entry
+        for subdir_name in entry[_DirectoryIndexKeys.SUBDIRS]:
+            pending.append(os.path.join(directory_path, subdir_name))
+
+    return {
+        _DirectoryIndexKeys.CREATED: created,
+        _DirectoryIndexKeys.DIRECTORIES: directories,
+        _DirectoryIndexKeys.FORMAT: SAS_ROOT_INDEX_FORMAT,
+        _DirectoryIndexKeys.ROOT: root_path
+    }
+
+
+# =====
+# _read_directory_index_entry(str, os.stat_result)
+# =====
+def _read_directory_index_entry(directory_path, directory_stat):
+    """
+    Reads the contents of a directory and returns its entry for the directory index.
+
+    :param str directory_path: The path of the directory to read.
+    :param os.stat_result directory_stat: The result of calling lstat on the directory.
+    :return: The index entry for the directory.
+    :rtype dict:
+    """
+
+    # the blocks allocated to the directory itself are counted with its files
+    size = directory_stat.st_blocks * 512
+    links = dict()
+    subdirs = list()
+
+    try:
+        names = os.listdir(directory_path)
+    except OSError:
+        names = list()
+
+    for name in names:
+        try:
+            file_stat = os.lstat(os.path.join(directory_path, name))
+        except OSError:
+            continue
+
+        if stat.S_ISDIR(file_stat.st_mode):
+            subdirs.append(name)
+        elif file_stat.st_nlink > 1:
+            links["{0}:{1}".format(file_stat.st_dev, file_stat.st_ino)] = file_stat.st_blocks * 512
+        else:
+            size += file_stat.st_blocks * 512
+
+    return {
+        _DirectoryIndexKeys.DEVICE: directory_stat.st_dev,
+        _DirectoryIndexKeys.INODE: directory_stat.st_ino,
+        _DirectoryIndexKeys.LINKS: links,
+        _DirectoryIndexKeys.MTIME: directory_stat.st_mtime,
+        _DirectoryIndexKeys.SIZE: size,
+        _DirectoryIndexKeys.SUBDIRS: subdirs
+    }
+
+
+# =====
+# _get_directory_index_sizes(dict)
+# =====
+def _get_directory_index_sizes(index):
+    """
+    Totals the sizes in a directory index for the root path and each of its top-level directories.
+
+    :param dict index: A directory index returned by *_update_directory_index()*.
+    :return: A tuple of the total size of the root path in bytes and a dict of each top-level directory name mapped
+             to its size in bytes.
+    :rtype tuple:
+    """
+
+    root_path = index[_DirectoryIndexKeys.ROOT]
+    directories = index[_DirectoryIndexKeys.DIRECTORIES]
+
+    def _get_tree_size(tree_path, counted_links):
+        tree_size = 0
+        pending = [tree_path]
+        while pending:
+            directory_path = pending.pop()
+            entry = directories.get(directory_path)
+            if entry is None:
+                continue
+
+            tree_size += entry[_DirectoryIndexKeys.SIZE]
+
+            # hard-linked files are only counted the first time they are found
+            for link, link_size in entry[_DirectoryIndexKeys.LINKS].items():
+                if link not in counted_links:
+                    counted_links.add(link)
+                    tree_size += link_size
+
+            for subdir_name in entry[_DirectoryIndexKeys.SUBDIRS]:
+                pending.append(os.path.join(directory_path, subdir_name))
+
+        return tree_size
+
+    directory_sizes = dict()
+    root_entry = directories.get(root_path)
+    if root_entry is not None:
+        for subdir_name in root_entry[_DirectoryIndexKeys.SUBDIRS]:
+            directory_sizes[subdir_name] = _get_tree_size(os.path.join(root_path, subdir_name), set())
+
+    return _get_tree_size(root_path, set()), directory_sizes
+
+
+# =====
+# _get_sas_service_info(AnsibleModule, int, float)
 # =====
-def _get_sas_service_info(module):
+def _get_sas_service_info(module, status_timeout=None, cpu_sample_interval=0, include_jvm_info=True):
     """
     Retrieves information on SAS services (using the *-all-services' service) for the current host and returns the data
     as a dict.
 
+    The status command of each *-all-services script is run concurrently, so the time taken is close to that of the
+    slowest script rather than the sum of all of them.
+
     :param AnsibleModule module: The AnsibleModule object representing the current module.
+    :param int status_timeout: The number of seconds to wait for each status command before it is stopped.
+    :param float cpu_sample_interval: The number of seconds over which the CPU usage of running services is
+                                      sampled, or 0 to skip sampling.
+    :param bool include_jvm_info: Whether to read the heap, garbage collection, and thread counters of running
+                                  Java services.
     :returns: A dict of SAS services mapped to their attributes.
     :rtype dict:
     """
@@ -1310,9 +2728,31 @@ def _get_sas_service_info(module):
     total_other = 0
     total_memory = 0
 
-    # find all 'all-services' executables
-    for service in glob.glob("/etc/init.d/*-all-services"):
-        cmd_stdout = _execute_command("{0} status".format(service), module)
+    # run the status command of all 'all-services' executables
+    status_commands = [("{0} status".format(service),) for service in sorted(glob.glob("/etc/init.d/*-all-services"))]
+    all_status_output, all_status_errors = _run_concurrently(
+        lambda command: _run_command(command, timeout=status_timeout), status_commands)
+
+    # the status of all services is required, so the collector fails if any status command did not complete
+    for error in all_status_errors:
+        if error is not None:
+            raise error
+
+    # take a single snapshot of the process table to look up the memory used by each running service
+    process_table = _get_process_table()
+
+    # find the performance data files of all running JVMs
+    hsperfdata_paths = dict()
+    if include_jvm_info:
+        hsperfdata_paths = _get_hsperfdata_paths()
+
+    # control groups of the running services, used to find services sharing a systemd unit
+    service_cgroups = dict()
+
+    # PIDs of the running services, used to sample CPU usage once all services are known
+    service_pids = dict()
+
+    for cmd_stdout in all_status_output:
 
         # remove user-friendly output
         status_list = cmd_stdout.split('\n')[2:-3]
@@ -1350,7 +2790,7 @@ def _get_sas_service_info(module):
 
                 # If the service is up and running then get the memory size.
                 if status == _ServiceStatus.UP:
-                    java_memory = _get_process_memory_info(pid, module)
+                    java_memory = _get_process_memory_info(pid, process_table)
                 else:
                     java_memory = dict()
                     java_memory['RESIDENT_MEMORY'] = "Service not running"
@@ -1374,6 +2814,29 @@ def _get_sas_service_info(module):
                     _HostDetailsKeys.SASServicesKeys.InstalledServiceKeys.ServiceAttributesKeys.RESIDENT_MEMORY: h_read_memory
                 }
 
+                service_metrics = dict()
+                if h_read_memory != "-":
+                    service_metrics[
+                        _HostDetailsKeys.SASServicesKeys.InstalledServiceKeys.ServiceAttributesKeys.RESIDENT_MEMORY] = \
+                        java_memory['RESIDENT_MEMORY']
+
+                # add live heap, garbage collection, and thread counters for running Java services
+                if status == _ServiceStatus.UP and pid in hsperfdata_paths:
+                    jvm_attributes, jvm_metrics = _get_jvm_info(hsperfdata_paths[pid])
+                    service_attributes.update(jvm_attributes)
+                    service_metrics.update(jvm_metrics)
+
+                # add the memory and CPU time of the service's whole process tree, if it runs in its own unit
+                if status == _ServiceStatus.UP:
+                    service_pids[name] = pid
+
+                    cgroups = _get_service_cgroups(pid)
+                    if cgroups is not None:
+                        service_cgroups[name] = cgroups
+                        cgroup_attributes, cgroup_metrics = _get_cgroup_info(cgroups)
+                        service_attributes.update(cgroup_attributes)
+                        service_metrics.update(cgroup_metrics)
+
                 # Add up service status totals
                 if status == _ServiceStatus.UP:
                     total_up += 1
@@ -1385,9 +2848,83 @@ def _get_sas_service_info(module):
                     total_other += 1
 
                 results[_HostDetailsKeys.SASServicesKeys.INSTALLED][name] = {
-                    _HostDetailsKeys.SASServicesKeys.InstalledServiceKeys.ATTRIBUTES: service_attributes
+                    _HostDetailsKeys.SASServicesKeys.InstalledServiceKeys.ATTRIBUTES: service_attributes,
+                    _HostDetailsKeys.SASServicesKeys.InstalledServiceKeys.METRICS: service_metrics
                 }
 
+    # the accounting of a unit shared by several services covers all of them, make note of that
+    unit_services = dict()
+    for name, cgroups in service_cgroups.items():
+        unit_services.setdefault(cgroups[_CgroupControllers.UNIT], list()).append(name)
+
+    for unit, names in unit_services.items():
+        if len(names) > 1:
+            for name in names:
+                service = results[_HostDetailsKeys.SASServicesKeys.INSTALLED][name]
+                service_attributes = service[_HostDetailsKeys.SASServicesKeys.InstalledServiceKeys.ATTRIBUTES]
+                service_attributes[_HostDetailsKeys.SASServicesKeys.InstalledServiceKeys.ServiceAttributesKeys.CGROUP] \
+                    = "{0} (shared by {1} services)".format(os.path.basename(unit), len(names))
+
+    attribute_keys = _HostDetailsKeys.SASServicesKeys.InstalledServiceKeys.ServiceAttributesKeys
+
+    # verify that each running service listens on the port it advertises
+    # the listening socket may belong to any process the service started, so the service's whole process tree is
+    # checked, along with the processes of its own unit (which includes children that were re-parented)
+    service_processes = dict()
+    for name, pid in service_pids.items():
+        processes = set(_get_process_tree(pid, process_table))
+        if name in service_cgroups and len(unit_services[service_cgroups[name][_CgroupControllers.UNIT]]) == 1:
+            processes.update(_get_cgroup_pids(service_cgroups[name][_CgroupControllers.UNIT]))
+        service_processes[name] = sorted(processes)
+
+    total_not_listening = 0
+    listening_ports = _get_listening_ports(service_processes)
+    for name, pid in service_pids.items():
+        service = results[_HostDetailsKeys.SASServicesKeys.INSTALLED][name]
+        service_attributes = service[_HostDetailsKeys.SASServicesKeys.InstalledServiceKeys.ATTRIBUTES]
+
+        ports, all_read = listening_ports[name]
+        port = service_attributes[attribute_keys.PORT]
+        if port.isdigit():
+            listening = int(port) in ports
+            if listening:
+                service_attributes[attribute_keys.LISTENING] = 'yes'
+            elif not all_read:
+                # the sockets of some of the service's processes could not be read, so the port may still be served
+                service_attributes[attribute_keys.LISTENING] = 'unknown'
+            else:
+                service_attributes[attribute_keys.LISTENING] = 'no'
+                total_not_listening += 1
+
+        service_attributes[attribute_keys.LISTENING_PORTS] = ", ".join([str(listening_port) for listening_port in ports])
+
+    # sample the CPU usage of all running services at once
+    cpu_usage = dict()
+    if cpu_sample_interval > 0 and service_pids:
+        cpu_usage = _sample_process_cpu_usage(list(service_pids.values()), cpu_sample_interval)
+
+    total_cpu = 0.0
+    total_context_switches = 0.0
+    total_threads = 0
+    for name, pid in service_pids.items():
+        if pid in cpu_usage:
+            cpu_percent, context_switches, threads = cpu_usage[pid]
+            service = results[_HostDetailsKeys.SASServicesKeys.INSTALLED][name]
+            service[_HostDetailsKeys.SASServicesKeys.InstalledServiceKeys.ATTRIBUTES].update({
+                attribute_keys.CPU_USAGE: "{0:.1f}%".format(cpu_percent),
+                attribute_keys.CONTEXT_SWITCHES: "{0:.0f}/s".format(context_switches),
+                attribute_keys.THREADS: str(threads)
+            })
+            service[_HostDetailsKeys.SASServicesKeys.InstalledServiceKeys.METRICS].update({
+                attribute_keys.CPU_USAGE: cpu_percent,
+                attribute_keys.CONTEXT_SWITCHES: context_switches,
+                attribute_keys.THREADS: threads
+            })
+
+            total_cpu += cpu_percent
+            total_context_switches += context_switches
+            total_threads += threads
+
     # Make total memory human reaable
     h_total_memory = _bytesHumanReadable(total_memory)
 
@@ -1397,74 +2934,123 @@ def _get_sas_service_info(module):
         _HostDetailsKeys.SASServicesKeys.ServicesStatusKeys.DOWN: total_down,
         _HostDetailsKeys.SASServicesKeys.ServicesStatusKeys.NOT_READY: total_not_ready,
         _HostDetailsKeys.SASServicesKeys.ServicesStatusKeys.OTHER: total_other,
-        _HostDetailsKeys.SASServicesKeys.ServicesStatusKeys.MEMORY: h_total_memory
+        _HostDetailsKeys.SASServicesKeys.ServicesStatusKeys.MEMORY: h_total_memory,
+        _HostDetailsKeys.SASServicesKeys.ServicesStatusKeys.NOT_LISTENING: total_not_listening,
+        _HostDetailsKeys.SASServicesKeys.ServicesStatusKeys.CONTEXT_SWITCHES: '',
+        _HostDetailsKeys.SASServicesKeys.ServicesStatusKeys.CPU: '',
+        _HostDetailsKeys.SASServicesKeys.ServicesStatusKeys.THREADS: ''
     }
 
+    results[_HostDetailsKeys.SASServicesKeys.METRICS] = {
+        _HostDetailsKeys.SASServicesKeys.ServicesStatusKeys.MEMORY: total_memory
+    }
+
+    if cpu_usage:
+        results[_HostDetailsKeys.SASServicesKeys.METRICS].update({
+            _HostDetailsKeys.SASServicesKeys.ServicesStatusKeys.CONTEXT_SWITCHES: total_context_switches,
+            _HostDetailsKeys.SASServicesKeys.ServicesStatusKeys.CPU: total_cpu,
+            _HostDetailsKeys.SASServicesKeys.ServicesStatusKeys.THREADS: total_threads
+        })
+
+        results[_HostDetailsKeys.SASServicesKeys.STATUS].update({
+            _HostDetailsKeys.SASServicesKeys.ServicesStatusKeys.CONTEXT_SWITCHES:
+                "{0:.0f}/s".format(total_context_switches),
+            _HostDetailsKeys.SASServicesKeys.ServicesStatusKeys.CPU: "{0:.1f}%".format(total_cpu),
+            _HostDetailsKeys.SASServicesKeys.ServicesStatusKeys.THREADS: str(total_threads)
+        })
+
     # return SAS service information
     return results
 
 
 # =====
-# _get_process_memory_info(pid, AnsibleModule)
+# _get_process_table()
 # =====
-def _get_process_memory_info(pid, module):
+def _get_process_table():
     """
-    Calculates the amount of memory the micorservice is currently using.
-
-    :param  str pid: The Pid number of the running service
-    :param AnsibleModule module: The AnsibleModule object representing the current module.
+    Reads the statm, status, and cmdline files of every process in /proc once and returns the values as a dict
+    indexed by PID, so that the attributes of any number of processes can be looked up without running a command
+    for each one.
 
-    :return: A human reaable string with the memory size for the service.
+    :return: A dict of PIDs (str) mapped to a dict of process attributes.
     :rtype dict:
     """
 
-    # initialize the main dictionary
-    proc = {}
+    results = dict()
+
+    # statm values are reported in pages
+    page_size = os.sysconf('SC_PAGE_SIZE')
 
-    process_output = _execute_command("ps -auxww | grep " + pid, module)
-    processes = process_output.split('\n')
+    try:
+        all_pids = [entry for entry in os.listdir(PROC_PATH) if entry.isdigit()]
+    except OSError:
+        return results
 
-    for row in processes:
-        # skip blank lines
-        if not row:
+    for pid in all_pids:
+        process_path = os.path.join(PROC_PATH, pid)
+
+        try:
+            statm = _read_proc_file(os.path.join(process_path, 'statm')).split()
+            status = _read_proc_file(os.path.join(process_path, 'status'))
+            cmdline = _read_proc_file(os.path.join(process_path, 'cmdline'))
+        except (IOError, OSError):
+            # the process exited after /proc was listed or is not accessible, skip it
             continue
 
-        nfields = len(row.split()) - 1
-        ps_line = row.split(None, nfields)
-
-        # Making sure we have the parent Pid
-        if pid == ps_line[1]:
-            total_mem = int(ps_line[4]) * 1024
-            res_mem   = int(ps_line[5]) * 1024
-
-            proc['VIRTUAL_MEMORY'] = total_mem
-            proc['RESIDENT_MEMORY'] = res_mem
-
-            # Here for future use if needed
-            if (row.find("java") != -1):
-                command = ps_line[len(ps_line) - 1].split()
-                for arg in command:
-                    if "-Xmx" in arg:
-                        max_java_pool = re.sub('-Xmx', '', arg)
-                        if 'm' in max_java_pool or 'M' in max_java_pool:
-                            max_num = int(re.sub('[Mm]', '', max_java_pool))
-                            max_num_bytes = (max_num * (1024 ** 2))
-                        if 'g' in max_java_pool or 'G' in max_java_pool:
-                            max_num = int(re.sub('g', '', max_java_pool))
-                            max_num_bytes = (max_num * (1024 ** 3))
+        # map each 'Name:   value' line in status to a dict entry
+        status_fields = dict()
+        for line in status.split('\n'):
+            key, sep, value = line.partition(':')
+            if sep:
+                status_fields[key] = value.strip()
+
+        results[pid] = {
+            _ProcessTableKeys.CMDLINE: [arg for arg in cmdline.split('\0') if arg],
+            _ProcessTableKeys.RESIDENT_MEMORY: int(statm[1]) * page_size if len(statm) > 1 else 0,
+            _ProcessTableKeys.STATUS: status_fields,
+            _ProcessTableKeys.VIRTUAL_MEMORY: int(statm[0]) * page_size if len(statm) > 0 else 0
+        }
 
-                        proc['JAVA_HEAP'] = _bytesHumanReadable(max_num_bytes)
+    return results
 
-                    if "-Xms" in arg:
-                        initial_java_pool = re.sub('-Xms', '', arg)
-                        if 'm' in initial_java_pool or 'M' in initial_java_pool:
-                            init_num = int(re.sub('[Mm]', '', initial_java_pool))
-                            init_num_bytes = (init_num * (1024 ** 2))
-                        if 'g' in initial_java_pool or 'G' in initial_java_pool:
-                            init_num = int(re.sub('[Gg]', '', initial_java_pool))
-                            init_num_bytes = (init_num * (1024 ** 3))
 
-                        proc['INITIAL_JAVA_HEAP'] = _bytesHumanReadable(init_num_bytes)
+# =====
+# _get_process_memory_info(pid, dict)
+# =====
+def _get_process_memory_info(pid, process_table):
+    """
+    Calculates the amount of memory the micorservice is currently using.
+
+    :param str pid: The Pid number of the running service
+    :param dict process_table: The process snapshot returned by *_get_process_table()*.
+
+    :return: A human reaable string with the memory size for the service.
+    :rtype dict:
+    """
+
+    # initialize the main dictionary
+    proc = {}
+
+    process = process_table.get(pid)
+
+    if process is not None:
+        proc['VIRTUAL_MEMORY'] = process[_ProcessTableKeys.VIRTUAL_MEMORY]
+        proc['RESIDENT_MEMORY'] = process[_ProcessTableKeys.RESIDENT_MEMORY]
+
+        # Here for future use if needed
+        command = process[_ProcessTableKeys.CMDLINE]
+        if any("java" in arg for arg in command):
+            for arg in command:
+                if arg.startswith("-Xmx"):
+                    max_num_bytes = _java_memory_arg_to_bytes(arg[len("-Xmx"):])
+                    if max_num_bytes is not None:
+                        proc['JAVA_HEAP'] = _bytesHumanReadable(max_num_bytes)
+
+                if arg.startswith("-Xms"):
+                    init_num_bytes = _java_memory_arg_to_bytes(arg[len("-Xms"):])
+                    if init_num_bytes is not None:
+                        proc['INITIAL_JAVA_HEAP'] = _bytesHumanReadable(init_num_bytes)
+
     if not proc:
         proc['RESIDENT_MEMORY'] = "-"
         proc['VIRTUAL_MEMORY'] = "-"
@@ -1475,41 +3061,713 @@ def _get_process_memory_info(pid, module):
 
 
 # =====
-# _get_sas_package_info(AnsibleModule, bool)
+# _get_process_tree(str, dict)
 # =====
-def _get_sas_package_info(module, package_manager, include_installed_files=False, locale_encoding=False):
+def _get_process_tree(pid, process_table):
     """
-    Retrieves package information for all installed SAS packages and returns the values as a dict.
+    Returns the given process and all of its descendants, as found by the parent PIDs in the process table.
 
-    :param AnsibleModule module: The AnsibleModule object representing the current module.
-    :param bool include_installed_files: Toggles whether information about the package's installed files should be
-                                       included.
-    :param locale_encoding: A custom locale encoding that should be used to decode potentially localized text.
-    :return: A dict of package names mapped to a dict containing package attribute names and their values.
+    :param str pid: The PID of the process at the top of the tree.
+    :param dict process_table: The process snapshot returned by *_get_process_table()*.
+    :return: A list of the PIDs (str) in the process tree.
+    :rtype list:
+    """
+
+    children = dict()
+    for child_pid, process in process_table.items():
+        parent_pid = process[_ProcessTableKeys.STATUS].get('PPid')
+        if parent_pid is not None:
+            children.setdefault(parent_pid, list()).append(child_pid)
+
+    results = list()
+    pending = [pid]
+    while pending:
+        current_pid = pending.pop()
+        if current_pid in results:
+            continue
+
+        results.append(current_pid)
+        pending.extend(children.get(current_pid, list()))
+
+    return results
+
+
+# =====
+# _get_cgroup_pids(str)
+# =====
+def _get_cgroup_pids(unit_path):
+    """
+    Returns the processes in a systemd service unit's control group, including those in any of its child groups.
+    Both the cgroup v2 hierarchy and systemd's own cgroup v1 hierarchy are searched.
+
+    :param str unit_path: The path of the unit's cgroup, as returned by *_get_service_cgroups()*.
+    :return: A set of the PIDs (str) in the unit, which is empty if the unit's cgroup could not be read.
+    :rtype set:
+    """
+
+    results = set()
+    for hierarchy in ('', 'unified', 'systemd'):
+        unit_cgroup_path = os.path.join(CGROUP_PATH, hierarchy, unit_path.lstrip('/'))
+        if not os.path.isdir(unit_cgroup_path):
+            continue
+
+        for cgroup_path, cgroup_dirs, cgroup_files in os.walk(unit_cgroup_path):
+            try:
+                results.update(_read_proc_file(os.path.join(cgroup_path, 'cgroup.procs')).split())
+            except (IOError, OSError):
+                continue
+
+        if results:
+            break
+
+    return results
+
+
+# =====
+# _get_listening_ports(dict)
+# =====
+def _get_listening_ports(process_groups):
+    """
+    Returns the TCP ports each of the given groups of processes is listening on. The listening sockets of the host
+    are read from /proc/net/tcp and /proc/net/tcp6 once and matched to processes by the socket inodes in
+    /proc/<pid>/fd, so no command is run.
+
+    :param dict process_groups: A dict of names mapped to a list of the PIDs (str) of the processes in each group.
+    :return: A dict of the same names mapped to a tuple of a sorted list of the ports (int) the processes in the group
+             are listening on, and whether the descriptors of all of the processes could be read.
     :rtype dict:
     """
 
-    # -- package info -- #
+    results = dict()
 
-    # get installed package info via rpm
-    results = _get_installed_package_info(module, include_installed_files, locale_encoding)
+    # map the inode of each listening socket to its port
+    listener_ports = dict()
+    for proc_net_tcp in PROC_NET_TCP_FILES:
+        try:
+            sockets = _read_proc_file(proc_net_tcp).split('\n')[1:]
+        except (IOError, OSError):
+            continue  # i.e. IPv6 is disabled
+
+        # each line is 'sl local_address rem_address st tx_queue:rx_queue tr:tm->when retrnsmt uid timeout inode ...'
+        # where the local address is 'IP:PORT' in hex and state 0A is LISTEN
+        for socket_line in sockets:
+            fields = socket_line.split()
+            if len(fields) < 10 or fields[3] != '0A':
+                continue
+
+            try:
+                listener_ports[fields[9]] = int(fields[1].rpartition(':')[2], 16)
+            except ValueError:
+                continue
+
+    for name, pids in process_groups.items():
+        ports = set()
+        all_read = True
+        for pid in pids:
+            fd_path = os.path.join(PROC_PATH, pid, 'fd')
+            try:
+                fds = os.listdir(fd_path)
+            except OSError:
+                # a process that exited after it was found has no sockets left to serve the port
+                if os.path.exists(os.path.join(PROC_PATH, pid)):
+                    all_read = False
+                continue
+
+            for fd in fds:
+                try:
+                    target = os.readlink(os.path.join(fd_path, fd))
+                except OSError:
+                    continue  # the descriptor was closed
+
+                # sockets link to 'socket:[<inode>]'
+                if target.startswith('socket:['):
+                    inode = target[len('socket:['):-1]
+                    if inode in listener_ports:
+                        ports.add(listener_ports[inode])
+
+        results[name] = (sorted(ports), all_read)
 
-    if package_manager == _PackageManagers.ZYPPER:
-        update_results = _get_sas_package_update_info_zypper(module, locale_encoding)
-    else:
-        update_results = _get_sas_package_update_info_yum(module, locale_encoding)
+    return results
 
-    for package_name, update_info in update_results.items():
-        results[package_name][_HostDetailsKeys.SASPackageKeys.UPDATE_STATUS] = update_info
 
-    # return SAS package information
-    return results, len(update_results)
+# =====
+# _sample_process_cpu_usage(list, float)
+# =====
+def _sample_process_cpu_usage(pids, interval):
+    """
+    Samples the CPU usage of the given processes by taking two snapshots of /proc the given number of seconds apart.
+    CPU usage is relative to a single CPU, like **top**, so a process busy on two CPUs uses 200%.
+
+    :param list pids: The PIDs (str) of the processes to sample.
+    :param float interval: The number of seconds between the snapshots.
+    :return: A dict of PIDs mapped to a tuple of the CPU usage (percent), context switches per second, and number of
+             threads of the process. Processes that exited during the interval are left out.
+    :rtype dict:
+    """
+
+    results = dict()
+
+    first_total, cpu_count = _get_cpu_ticks()
+    first_snapshot = dict((pid, _get_process_cpu_snapshot(pid)) for pid in pids)
+    first_time = time.time()
+
+    time.sleep(interval)
+
+    second_total, cpu_count = _get_cpu_ticks()
+    second_snapshot = dict((pid, _get_process_cpu_snapshot(pid)) for pid in pids)
+    elapsed = time.time() - first_time
+
+    if first_total is None or second_total is None or second_total <= first_total or elapsed <= 0:
+        return results
+
+    # the ticks elapsed on a single CPU during the interval
+    interval_ticks = float(second_total - first_total) / max(1, cpu_count)
+
+    for pid in pids:
+        first = first_snapshot[pid]
+        second = second_snapshot[pid]
+        if first is None or second is None:
+            continue
+
+        cpu_percent = max(0, second[0] - first[0]) / interval_ticks * 100
+        # threads started during the interval made all of their context switches within it
+        context_switches = sum(max(0, switches - first[1].get(thread_id, 0))
+                               for thread_id, switches in second[1].items()) / elapsed
+        results[pid] = (cpu_percent, context_switches, second[2])
+
+    return results
+
+
+# =====
+# _get_cpu_ticks()
+# =====
+def _get_cpu_ticks():
+    """
+    Returns the total ticks spent by all CPUs, as read from /proc/stat.
+
+    :return: A tuple of the total ticks across all CPUs, or None if they could not be read, and the number of CPUs.
+    :rtype tuple:
+    """
+
+    try:
+        proc_stat = _read_proc_file(os.path.join(PROC_PATH, 'stat'))
+    except (IOError, OSError):
+        return None, 0
+
+    total_ticks = None
+    cpu_count = 0
+    for line in proc_stat.split('\n'):
+        fields = line.split()
+        if not fields:
+            continue
+
+        # the aggregate 'cpu' line is followed by a 'cpuN' line for each CPU, guest time is already included in user
+        # time so it is not counted twice
+        if fields[0] == 'cpu':
+            total_ticks = sum([int(value) for value in fields[1:9]])
+        elif fields[0].startswith('cpu'):
+            cpu_count += 1
+
+    return total_ticks, cpu_count
+
+
+# =====
+# _get_process_cpu_snapshot(str)
+# =====
+def _get_process_cpu_snapshot(pid):
+    """
+    Returns the CPU ticks, context switches, and thread count of a process, as read from /proc/<pid>/stat and
+    /proc/<pid>/status.
+
+    The context switches in /proc/<pid>/status only count those of the process' main thread, so they are read from
+    the status of each thread in /proc/<pid>/task instead.
+
+    :param str pid: The PID of the process.
+    :return: A tuple of the user and system ticks, a dict of each thread ID mapped to its voluntary and involuntary
+             context switches, and the number of threads of the process, or None if the process is not running.
+    :rtype tuple:
+    """
+
+    process_path = os.path.join(PROC_PATH, pid)
+
+    try:
+        proc_stat = _read_proc_file(os.path.join(process_path, 'stat'))
+        proc_status = _read_proc_file(os.path.join(process_path, 'status'))
+    except (IOError, OSError):
+        return None
+
+    # the process name may contain spaces and parentheses, so fields are counted from the end of the name;
+    # utime and stime are the 14th and 15th fields
+    stat_fields = proc_stat.rpartition(')')[2].split()
+    try:
+        cpu_ticks = int(stat_fields[11]) + int(stat_fields[12])
+    except (IndexError, ValueError):
+        return None
+
+    threads = 0
+    for line in proc_status.split('\n'):
+        key, sep, value = line.partition(':')
+        if key == 'Threads':
+            threads = int(value)
+
+    try:
+        thread_ids = os.listdir(os.path.join(process_path, 'task'))
+    except OSError:
+        return None
+
+    context_switches = dict()
+    for thread_id in thread_ids:
+        try:
+            thread_status = _read_proc_file(os.path.join(process_path, 'task', thread_id, 'status'))
+        except (IOError, OSError):
+            # the thread exited after the threads were listed
+            continue
+
+        thread_context_switches = 0
+        for line in thread_status.split('\n'):
+            key, sep, value = line.partition(':')
+            if key in ('voluntary_ctxt_switches', 'nonvoluntary_ctxt_switches'):
+                thread_context_switches += int(value)
+        context_switches[thread_id] = thread_context_switches
+
+    return cpu_ticks, context_switches, threads
+
+
+# =====
+# _get_service_cgroups(str)
+# =====
+def _get_service_cgroups(pid):
+    """
+    Returns the control groups of a process, if the process runs in a systemd service unit.
+
+    :param str pid: The PID of the process.
+    :return: A dict of cgroup controller names (see *_CgroupControllers*) mapped to the process' cgroup path for
+             that controller, or None if the process does not run in a service unit.
+    :rtype dict:
+    """
+
+    try:
+        proc_cgroup = _read_proc_file(os.path.join(PROC_PATH, pid, 'cgroup'))
+    except (IOError, OSError):
+        return None
+
+    # each line is 'hierarchy-ID:controller-list:cgroup-path', the cgroup v2 hierarchy has an empty controller list
+    # and systemd's own v1 hierarchy is named 'name=systemd'
+    results = dict()
+    unit_path = None
+    for line in proc_cgroup.split('\n'):
+        fields = line.split(':', 2)
+        if len(fields) != 3:
+            continue
+
+        hierarchy, controllers, cgroup_path = fields
+        if controllers == '' or controllers == 'name=systemd':
+            if controllers == 'name=systemd' or unit_path is None:
+                unit_path = cgroup_path
+            if controllers == '' and hierarchy == '0':
+                results[_CgroupControllers.UNIFIED] = cgroup_path
+        else:
+            for controller in controllers.split(','):
+                results[controller] = cgroup_path
+
+    if unit_path is None or not unit_path.endswith('.service'):
+        return None
+
+    results[_CgroupControllers.UNIT] = unit_path
+    return results
 
 
 # =====
-# _get_installed_package_info(AnsibleModule)
+# _get_cgroup_info(dict)
 # =====
-def _get_installed_package_info(module, include_installed_files, locale_encoding):
+def _get_cgroup_info(cgroups):
+    """
+    Reads the memory and CPU accounting of a service's control group. Both cgroup v2 (memory.current and cpu.stat)
+    and cgroup v1 (memory.usage_in_bytes and cpuacct.usage) are supported.
+
+    :param dict cgroups: The control groups of the service, as returned by *_get_service_cgroups()*.
+    :return: A tuple of a dict of service attribute names mapped to their human-readable values and a dict of the
+             same names mapped to their numeric values. Attributes whose accounting is not enabled for the unit are
+             left out.
+    :rtype tuple:
+    """
+
+    attribute_keys = _HostDetailsKeys.SASServicesKeys.InstalledServiceKeys.ServiceAttributesKeys
+
+    results = {
+        attribute_keys.CGROUP: os.path.basename(cgroups[_CgroupControllers.UNIT])
+    }
+
+    memory = None
+    cpu_seconds = None
+
+    # cgroup v1 controllers take precedence, in a hybrid hierarchy the v2 hierarchy has no controllers enabled
+    if _CgroupControllers.MEMORY in cgroups:
+        memory = _read_cgroup_value(os.path.join(CGROUP_PATH, _CgroupControllers.MEMORY),
+                                    cgroups[_CgroupControllers.MEMORY], 'memory.usage_in_bytes')
+    elif _CgroupControllers.UNIFIED in cgroups:
+        memory = _read_cgroup_value(CGROUP_PATH, cgroups[_CgroupControllers.UNIFIED], 'memory.current')
+
+    if _CgroupControllers.CPUACCT in cgroups:
+        for hierarchy in ('cpuacct', 'cpu,cpuacct', 'cpuacct,cpu'):
+            cpu_nanoseconds = _read_cgroup_value(os.path.join(CGROUP_PATH, hierarchy),
+                                                 cgroups[_CgroupControllers.CPUACCT], 'cpuacct.usage')
+            if cpu_nanoseconds is not None:
+                cpu_seconds = cpu_nanoseconds / 1000000000.0
+                break
+    elif _CgroupControllers.UNIFIED in cgroups:
+        cpu_microseconds = _read_cgroup_value(CGROUP_PATH, cgroups[_CgroupControllers.UNIFIED], 'cpu.stat',
+                                              'usage_usec')
+        if cpu_microseconds is not None:
+            cpu_seconds = cpu_microseconds / 1000000.0
+
+    metrics = dict()
+
+    if memory is not None:
+        results[attribute_keys.CGROUP_MEMORY] = _bytesHumanReadable(memory)
+        metrics[attribute_keys.CGROUP_MEMORY] = memory
+
+    if cpu_seconds is not None:
+        results[attribute_keys.CGROUP_CPU_TIME] = "{0:.1f} s".format(cpu_seconds)
+        metrics[attribute_keys.CGROUP_CPU_TIME] = cpu_seconds
+
+    return results, metrics
+
+
+# =====
+# _read_cgroup_value(str, str, str, str)
+# =====
+def _read_cgroup_value(hierarchy_path, cgroup_path, file_name, key=None):
+    """
+    Reads a single integer value from a cgroup accounting file.
+
+    :param str hierarchy_path: The mount point of the cgroup hierarchy.
+    :param str cgroup_path: The path of the cgroup within the hierarchy.
+    :param str file_name: The name of the accounting file.
+    :param str key: For flat keyed files (i.e. cpu.stat), the key of the value to read.
+    :return: The value, or None if it could not be read.
+    :rtype int:
+    """
+
+    try:
+        content = _read_proc_file(os.path.join(hierarchy_path, cgroup_path.lstrip('/'), file_name))
+    except (IOError, OSError):
+        return None
+
+    try:
+        if key is None:
+            return int(content.strip())
+
+        for line in content.split('\n'):
+            fields = line.split()
+            if len(fields) == 2 and fields[0] == key:
+                return int(fields[1])
+    except ValueError:
+        pass  # not a number, i.e. 'max'
+
+    return None
+
+
+# =====
+# _get_hsperfdata_paths()
+# =====
+def _get_hsperfdata_paths():
+    """
+    Returns the path to the performance data file of each running JVM on the host. The JVM of each user writes a
+    file named by PID to /tmp/hsperfdata_<user>.
+
+    :return: A dict of PIDs (str) mapped to the path of the process' performance data file.
+    :rtype dict:
+    """
+
+    results = dict()
+    for hsperfdata_path in glob.glob(os.path.join(HSPERFDATA_GLOB, '*')):
+        pid = os.path.basename(hsperfdata_path)
+        if pid.isdigit():
+            results[pid] = hsperfdata_path
+
+    return results
+
+
+# =====
+# _read_hsperfdata(str)
+# =====
+def _read_hsperfdata(hsperfdata_path):
+    """
+    Reads the counters from the performance data file of a running JVM. The file is memory mapped and the counters
+    are decoded in place, so the JVM is neither attached to nor paused and no command is run.
+
+    The file starts with a 32 byte prologue (magic number 0xcafec0c0, byte order, version, accessible flag, used
+    and overflow bytes, modification time, offset of the first entry, and the number of entries) which is followed
+    by the entries. Each entry has a 20 byte header (entry length, name offset, vector length, data type, flags,
+    units, variability, and data offset) followed by its name and data.
+
+    :param str hsperfdata_path: The path to the performance data file.
+    :return: A dict of counter names mapped to their values (int or str), or an empty dict if the file could not be
+             read.
+    :rtype dict:
+    """
+
+    results = dict()
+
+    try:
+        with open(hsperfdata_path, 'rb') as hsperfdata_file:
+            perf_data = mmap.mmap(hsperfdata_file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (IOError, OSError, ValueError):
+        return results
+
+    try:
+        if len(perf_data) < 32 or perf_data[0:4] != b'\xca\xfe\xc0\xc0':
+            return results
+
+        # the byte order of the counters is given in the prologue, the magic number is always big endian
+        byte_order = '<' if struct.unpack_from('b', perf_data, 4)[0] == 1 else '>'
+        accessible = struct.unpack_from('b', perf_data, 7)[0]
+        entry_offset, num_entries = struct.unpack_from(byte_order + 'ii', perf_data, 24)
+
+        # the JVM has not finished initializing the counters
+        if not accessible:
+            return results
+
+        for _ in range(num_entries):
+            if entry_offset + 20 > len(perf_data):
+                break
+
+            entry_length, name_offset, vector_length, data_type, _flags, _units, _variability, data_offset = \
+                struct.unpack_from(byte_order + 'iiicbbbi', perf_data, entry_offset)
+
+            if entry_length <= 0:
+                break
+
+            name_start = entry_offset + name_offset
+            name_end = perf_data.find(b'\0', name_start, entry_offset + entry_length)
+            if name_end != -1:
+                name = perf_data[name_start:name_end].decode('ascii', 'replace')
+                data_start = entry_offset + data_offset
+
+                if data_type == b'J' and vector_length == 0:
+                    results[name] = struct.unpack_from(byte_order + 'q', perf_data, data_start)[0]
+                elif data_type == b'B' and vector_length > 0:
+                    value = perf_data[data_start:data_start + vector_length]
+                    results[name] = value.split(b'\0', 1)[0].decode('utf-8', 'replace')
+
+            entry_offset += entry_length
+    except struct.error:
+        pass  # the file was truncated, return the counters read so far
+    finally:
+        perf_data.close()
+
+    return results
+
+
+# =====
+# _get_jvm_info(str)
+# =====
+def _get_jvm_info(hsperfdata_path):
+    """
+    Returns the live heap usage by generation, garbage collection totals, and number of live threads of a running
+    JVM, as read from its performance data file.
+
+    :param str hsperfdata_path: The path to the performance data file of the JVM.
+    :return: A tuple of a dict of service attribute names mapped to their human-readable values and a dict of the
+             same names mapped to their numeric values. Attributes whose counters are not published by the JVM are
+             left out.
+    :rtype tuple:
+    """
+
+    results = dict()
+    metrics = dict()
+
+    counters = _read_hsperfdata(hsperfdata_path)
+    if not counters:
+        return results, metrics
+
+    attribute_keys = _HostDetailsKeys.SASServicesKeys.InstalledServiceKeys.ServiceAttributesKeys
+
+    heap_used = 0
+    heap_committed = 0
+    generation_keys = [(attribute_keys.JAVA_YOUNG_GEN_USED, attribute_keys.JAVA_YOUNG_GEN_COMMITTED),
+                       (attribute_keys.JAVA_OLD_GEN_USED, attribute_keys.JAVA_OLD_GEN_COMMITTED)]
+    for generation, (used_key, committed_key) in enumerate(generation_keys):
+        committed = counters.get(_PerfDataCounters.GENERATION_CAPACITY.format(generation))
+        spaces = counters.get(_PerfDataCounters.GENERATION_SPACES.format(generation))
+        if committed is None or spaces is None:
+            continue
+
+        used = sum([counters.get(_PerfDataCounters.SPACE_USED.format(generation, space), 0)
+                    for space in range(spaces)])
+
+        results[used_key] = _bytesHumanReadable(used)
+        results[committed_key] = _bytesHumanReadable(committed)
+        metrics[used_key] = used
+        metrics[committed_key] = committed
+        heap_used += used
+        heap_committed += committed
+
+    if results:
+        results[attribute_keys.JAVA_HEAP_USED] = _bytesHumanReadable(heap_used)
+        results[attribute_keys.JAVA_HEAP_COMMITTED] = _bytesHumanReadable(heap_committed)
+        metrics[attribute_keys.JAVA_HEAP_USED] = heap_used
+        metrics[attribute_keys.JAVA_HEAP_COMMITTED] = heap_committed
+
+    # add up all collectors (i.e. young and full collections)
+    gc_count = 0
+    gc_ticks = 0
+    collector = 0
+    while _PerfDataCounters.GC_INVOCATIONS.format(collector) in counters:
+        gc_count += counters[_PerfDataCounters.GC_INVOCATIONS.format(collector)]
+        gc_ticks += counters.get(_PerfDataCounters.GC_TIME.format(collector), 0)
+        collector += 1
+
+    tick_frequency = counters.get(_PerfDataCounters.TICK_FREQUENCY)
+    if collector > 0:
+        results[attribute_keys.JAVA_GC_COUNT] = str(gc_count)
+        metrics[attribute_keys.JAVA_GC_COUNT] = gc_count
+        if tick_frequency:
+            gc_seconds = float(gc_ticks) / tick_frequency
+            results[attribute_keys.JAVA_GC_TIME] = "{0:.3f} s".format(gc_seconds)
+            metrics[attribute_keys.JAVA_GC_TIME] = gc_seconds
+
+    threads = counters.get(_PerfDataCounters.THREADS)
+    if threads is not None:
+        results[attribute_keys.JAVA_THREADS] = str(threads)
+        metrics[attribute_keys.JAVA_THREADS] = threads
+
+    return results, metrics
+
+
+# =====
+# _java_memory_arg_to_bytes(str)
+# =====
+def _java_memory_arg_to_bytes(value):
+    """
+    Converts the size given to a JVM memory option (i.e. the *512m* in *-Xmx512m*) to bytes.
+
+    :param str value: The size value, optionally suffixed with k, m, g, or t (case-insensitive).
+    :return: The size in bytes or None if the value could not be parsed.
+    :rtype int:
+    """
+
+    multipliers = {'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3, 't': 1024 ** 4}
+
+    match = re.match('^([0-9]+)([kKmMgGtT]?)$', value)
+    if match is None:
+        return None
+
+    return int(match.group(1)) * multipliers.get(match.group(2).lower(), 1)
+
+
+# =====
+# _is_sas_package_installed(AnsibleModule, int)
+# =====
+def _is_sas_package_installed(module, timeout=None):
+    """
+    Returns whether any package in the SAS group is installed on the host.
+
+    :param AnsibleModule module: The AnsibleModule object representing the current module.
+    :param int timeout: The number of seconds after which the rpm query is stopped and treated as failed.
+    :return: True if at least one SAS package is installed, otherwise False.
+    :rtype bool:
+    """
+
+    if HAS_RPM_BINDINGS:
+        try:
+            match_iterator = rpm.TransactionSet().dbMatch()
+            match_iterator.pattern('group', rpm.RPMMIRE_STRCMP, 'SAS')
+            for header in match_iterator:
+                return True
+            return False
+        except rpm.error:
+            pass  # fall back to the rpm command
+
+    # delimit package names so they can be told apart from the message rpm prints when the group is empty
+    name_prefix = 'name:::'
+
+    # rpm returns 1 when no package is in the group
+    try:
+        stdout = _run_command("rpm -qg SAS --queryformat '" + name_prefix + "%{name}\n'", additional_rc=1,
+                              timeout=timeout)
+    except _CommandError as error:
+        _fail_command(module, error)
+
+    for line in stdout.splitlines():
+        if line.startswith(name_prefix):
+            return True
+
+    return False
+
+
+# =====
+# _get_rpmdb_fingerprint()
+# =====
+def _get_rpmdb_fingerprint():
+    """
+    Returns a fingerprint of the rpm database made of the name, size, and modification time of each of its files.
+    Any package being installed, updated, or removed changes the fingerprint. Files that rpm also changes while only
+    reading the database (i.e. Berkeley DB environment and SQLite shared memory files) are left out.
+
+    :return: A list of [file name, size, mtime] lists, or None if the rpm database could not be found.
+    :rtype list:
+    """
+
+    for rpmdb_path in RPMDB_PATHS:
+        try:
+            file_names = sorted(os.listdir(rpmdb_path))
+        except OSError:
+            continue
+
+        fingerprint = list()
+        for file_name in file_names:
+            if file_name.startswith('__db.') or file_name.endswith('-shm') or file_name.endswith('.lock'):
+                continue
+
+            try:
+                file_stat = os.stat(os.path.join(rpmdb_path, file_name))
+            except OSError:
+                continue
+
+            fingerprint.append([file_name, file_stat.st_size, file_stat.st_mtime])
+
+        if len(fingerprint) > 0:
+            return [[os.path.realpath(rpmdb_path)]] + fingerprint
+
+    return None
+
+
+# =====
+# _load_package_cache(str, list, bool)
+# =====
+def _load_package_cache(cache_dir, rpmdb_fingerprint, include_installed_files):
+    """
+    Returns the installed SAS package details cached by a previous run, as long as they were read from the same
+    rpm database, collected with the same options, and written in the current format.
+
+    :param str cache_dir: The directory holding cached data.
+    :param list rpmdb_fingerprint: The current fingerprint of the rpm database.
+    :param bool include_installed_files: Whether the package details need to include installed files.
+    :return: The cached package details, or None if there are no usable cached details.
+    :rtype dict:
+    """
+
+    if rpmdb_fingerprint is None:
+        return None
+
+    package_cache = _load_cache(cache_dir, SAS_PACKAGES_CACHE)
+    if not isinstance(package_cache, dict):
+        return None
+
+    if package_cache.get(_PackageCacheKeys.FORMAT) != SAS_PACKAGES_CACHE_FORMAT or \
+            package_cache.get(_PackageCacheKeys.FINGERPRINT) != rpmdb_fingerprint or \
+            package_cache.get(_PackageCacheKeys.INCL_PKG_FILES) != include_installed_files:
+        return None
+
+    return package_cache.get(_PackageCacheKeys.PACKAGES)
+
+
+# =====
+# _get_installed_package_info(AnsibleModule, bool, str, int)
+# =====
+def _get_installed_package_info(module, include_installed_files, locale_encoding, timeout=None):
     """
     Retrieves package information via rpm for all installed SAS Packages and returns the values as a dict.
 
@@ -1517,9 +3775,17 @@ def _get_installed_package_info(module, include_installed_files, locale_encoding
     :param bool include_installed_files: Toggles whether information about the package's installed files should be
                                        included.
     :param locale_encoding: A custom locale encoding that should be used to decode potentially localized text.
+    :param int timeout: The number of seconds after which any command run is stopped.
     :return: A dict of package names mapped to a dict of package attributes and their values.
     :rtype dict:
     """
+    # read the rpm database directly when possible
+    if HAS_RPM_BINDINGS:
+        try:
+            return _get_installed_package_info_rpmdb(include_installed_files, locale_encoding)
+        except rpm.error:
+            pass  # fall back to the rpm command
+
     # define results dict
     results = dict()
 
@@ -1533,100 +3799,620 @@ def _get_installed_package_info(module, include_installed_files, locale_encoding
         _HostDetailsKeys.SASPackageKeys.PackageAttributesKeys.SIZE + delim + "%{size}\n" + \
         _HostDetailsKeys.SASPackageKeys.PackageAttributesKeys.SUMMARY + delim + "%{summary}\n" + \
         _HostDetailsKeys.SASPackageKeys.PackageAttributesKeys.VERSION + delim + "%{version}-%{release}\n" + \
-        "[file" + delim + "%{filenames}\n]\n"
+        METRIC_PREFIX + _HostDetailsKeys.SASPackageKeys.PackageAttributesKeys.BUILD + delim + "%{buildtime}\n" + \
+        METRIC_PREFIX + _HostDetailsKeys.SASPackageKeys.PackageAttributesKeys.INSTALL + delim + "%{installtime}\n" + \
+        METRIC_PREFIX + _HostDetailsKeys.SASPackageKeys.PackageAttributesKeys.SIZE + delim + "%{size}\n"
+
+    # the full file list of every package is only requested when it will be returned, otherwise provided services
+    # are resolved by querying the owners of the installed service scripts
+    if include_installed_files:
+        query += "[file" + delim + "%{filenames}\n]"
+
+    query += "\n"
+
+    # stream the package info, one block per installed package separated by an empty line, so that only a single
+    # package's info is held in memory at a time
+    package_info_lines = list()
+    for line in _stream_command("rpm -qg SAS --queryformat '" + query + "'", timeout=timeout):
+        line = line.rstrip("\n")
+        if line:
+            package_info_lines.append(line)
+        elif package_info_lines:
+            _add_installed_package_info(results, package_info_lines, include_installed_files, locale_encoding)
+            package_info_lines = list()
+
+    if package_info_lines:
+        _add_installed_package_info(results, package_info_lines, include_installed_files, locale_encoding)
+
+    # without the file lists, look up which packages own the installed service scripts
+    if not include_installed_files:
+        service_owners = _get_service_script_owners(locale_encoding, timeout)
+        for service_path, package_name in service_owners:
+            if package_name in results:
+                results[package_name][_HostDetailsKeys.SASPackageKeys.PROVIDED_SERVICES].append(
+                    os.path.basename(service_path))
 
-    # run package info command
-    info_cmd_stdout = _execute_command("rpm -qg SAS --queryformat '" + query + "'", module)
+    return results
 
-    # split stdout into an array by empty line, containing package info for all installed packages
-    all_package_info = info_cmd_stdout.split("\n\n")
 
-    # iterate over the package info for all installed packages
-    for package_info in all_package_info:
+# =====
+# _get_installed_package_info_rpmdb(bool, str)
+# =====
+def _get_installed_package_info_rpmdb(include_installed_files, locale_encoding=None):
+    """
+    Retrieves package information for all installed SAS packages by reading package headers through the rpm Python
+    bindings and returns the values as a dict. The values match those formatted by the rpm command's query.
 
-        # split single package info into individual lines
-        package_info_lines = package_info.split("\n")
+    :param bool include_installed_files: Toggles whether information about the package's installed files should be
+                                       included.
+    :param locale_encoding: A custom locale encoding that should be used to decode potentially localized text.
+    :return: A dict of package names mapped to a dict of package attributes and their values.
+    :rtype dict:
+    :raises rpm.error: If the rpm database cannot be read.
+    """
 
-        # define a dictionary to map package attributes to their respective key
-        package_attrs = dict()
+    # define results dict
+    results = dict()
 
-        # get the package name (first line in each block of output)
-        try:
-            package_name_line = package_info_lines.pop(0)
-            package_name_line = _decode_str(package_name_line, locale_encoding)
-            package_name_attr = package_name_line.split(delim)
-            if len(package_name_attr) == 2 and package_name_attr[0] == \
-                    _HostDetailsKeys.SASPackageKeys.PackageAttributesKeys.NAME:
-                package_name = package_name_attr[1]
-            else:
-                package_name = None
-        except IndexError:
+    # match packages the same way as 'rpm -qg SAS'
+    transaction_set = rpm.TransactionSet()
+    match_iterator = transaction_set.dbMatch()
+    match_iterator.pattern('group', rpm.RPMMIRE_STRCMP, 'SAS')
+
+    for header in match_iterator:
+        package_name = _rpm_header_str(header['name'], locale_encoding)
+
+        package_attrs = {
+            _HostDetailsKeys.SASPackageKeys.PackageAttributesKeys.ARCH:
+                _rpm_header_str(header['arch'], locale_encoding),
+            _HostDetailsKeys.SASPackageKeys.PackageAttributesKeys.BUILD:
+                time.strftime('%c', time.localtime(header['buildtime'])),
+            _HostDetailsKeys.SASPackageKeys.PackageAttributesKeys.INSTALL:
+                time.strftime('%c', time.localtime(header['installtime'])),
+            _HostDetailsKeys.SASPackageKeys.PackageAttributesKeys.SIZE: _bytesHumanReadable(header['size']),
+            _HostDetailsKeys.SASPackageKeys.PackageAttributesKeys.SUMMARY:
+                _rpm_header_str(header['summary'], locale_encoding),
+            _HostDetailsKeys.SASPackageKeys.PackageAttributesKeys.VERSION:
+                _rpm_header_str(header['version'], locale_encoding) + '-' +
+                _rpm_header_str(header['release'], locale_encoding)
+        }
+
+        # the file list is only held for one package at a time
+        installed_files = [_rpm_header_str(f, locale_encoding) for f in header['filenames']]
+
+        # seed results values
+        results[package_name] = _get_default_package_info()
+
+        # add package attributes to results
+        results[package_name][_HostDetailsKeys.SASPackageKeys.ATTRIBUTES] = package_attrs
+        results[package_name][_HostDetailsKeys.SASPackageKeys.METRICS] = {
+            _HostDetailsKeys.SASPackageKeys.PackageAttributesKeys.BUILD: header['buildtime'],
+            _HostDetailsKeys.SASPackageKeys.PackageAttributesKeys.INSTALL: header['installtime'],
+            _HostDetailsKeys.SASPackageKeys.PackageAttributesKeys.SIZE: header['size']
+        }
+
+        # determine any provided services
+        service_paths = [f for f in installed_files if re.match("/etc/.*init.d/.*", f)]
+        results[package_name][_HostDetailsKeys.SASPackageKeys.PROVIDED_SERVICES] = \
+            [os.path.basename(service_path) for service_path in service_paths]
+
+        # include installed files, if specified
+        if include_installed_files:
+            results[package_name][_HostDetailsKeys.SASPackageKeys.INSTALLED_FILES] = installed_files
+
+    return results
+
+
+# =====
+# _rpm_header_str(object, str)
+# =====
+def _rpm_header_str(value, locale_encoding=None):
+    """
+    Returns an rpm header value as a string. Depending on the rpm version, the bindings return string values as
+    bytes under Python 3.
+
+    :param value: The header value.
+    :param locale_encoding: A custom locale encoding that should be used to decode potentially localized text.
+    :return: The header value as a string.
+    :rtype str:
+    """
+
+    if value is None:
+        return ''
+
+    if sys.version_info[0] >= 3 and isinstance(value, bytes):
+        return value.decode('utf-8', 'replace')
+
+    return _decode_str(value, locale_encoding)
+
+
+# =====
+# _get_default_package_info()
+# =====
+def _get_default_package_info():
+    """
+    Returns the details of an installed package before any attributes are added.
+
+    :return: A dict of package details with empty values.
+    :rtype dict:
+    """
+
+    return {
+        _HostDetailsKeys.SASPackageKeys.ATTRIBUTES: dict(),
+        _HostDetailsKeys.SASPackageKeys.INSTALLED_FILES: list(),
+        _HostDetailsKeys.SASPackageKeys.METRICS: dict(),
+        _HostDetailsKeys.SASPackageKeys.PROVIDED_SERVICES: list(),
+        _HostDetailsKeys.SASPackageKeys.UPDATE_STATUS: {
+            _HostDetailsKeys.SASPackageKeys.PackageUpdateStatusKeys.AVAIL: False,
+            _HostDetailsKeys.SASPackageKeys.PackageUpdateStatusKeys.FROM_REPO: '',
+            _HostDetailsKeys.SASPackageKeys.PackageUpdateStatusKeys.VERSION: ''
+        }
+    }
+
+
+# =====
+# _add_installed_package_info(dict, list, bool, str)
+# =====
+def _add_installed_package_info(results, package_info_lines, include_installed_files, locale_encoding=None):
+    """
+    Parses the rpm query output of a single installed package and adds the package's attributes to the given results.
+
+    :param dict results: The dict of package names mapped to a dict of package attributes to add the package to.
+    :param list package_info_lines: The lines of rpm query output describing the package.
+    :param bool include_installed_files: Toggles whether information about the package's installed files should be
+                                       included.
+    :param locale_encoding: A custom locale encoding that should be used to decode potentially localized text.
+    """
+    # attribute delimiter
+    delim = ':::'
+
+    # define a dictionary to map package attributes to their respective key
+    package_attrs = dict()
+    package_metrics = dict()
+
+    # get the package name (first line in each block of output)
+    try:
+        package_name_line = package_info_lines.pop(0)
+        package_name_line = _decode_str(package_name_line, locale_encoding)
+        package_name_attr = package_name_line.split(delim)
+        if len(package_name_attr) == 2 and package_name_attr[0] == \
+                _HostDetailsKeys.SASPackageKeys.PackageAttributesKeys.NAME:
+            package_name = package_name_attr[1]
+        else:
             package_name = None
+    except IndexError:
+        package_name = None
+
+    # if package name is valid, parse attributes
+    if package_name is not None:
+
+        # create list to hold installed files
+        installed_files = list()
+
+        # iterate over all lines of package info
+        for line in package_info_lines:
+
+            # split line by delimiter to get key and value
+            line = _decode_str(line, locale_encoding)
+            attr = line.split(delim)
+
+            if len(attr) == 2:
+                key = attr[0]
+                value = attr[1]
+
+                # if key is 'file' add it to files list
+                if key == 'file':
+                    installed_files.append(value)
+                elif key.startswith(METRIC_PREFIX):
+                    try:
+                        package_metrics[key[len(METRIC_PREFIX):]] = int(value)
+                    except ValueError:
+                        pass  # not a number
+                else:
+                    # get human readable byes for package size
+                    if key == _HostDetailsKeys.SASPackageKeys.PackageAttributesKeys.SIZE:
+                        value = _bytesHumanReadable(value)
+                    package_attrs[key] = value
 
-        # if package name is valid, parse attributes
-        if package_name is not None:
-
-            # create list to hold installed files
-            installed_files = list()
-
-            # iterate over all lines of package info
-            for line in package_info_lines:
-
-                # split line by delimiter to get key and value
-                line = _decode_str(line, locale_encoding)
-                attr = line.split(delim)
-
-                if len(attr) == 2:
-                    key = attr[0]
-                    value = attr[1]
-
-                    # if key is 'file' add it to files list
-                    if key == 'file':
-                        installed_files.append(value)
-                    else:
-                        # get human readable byes for package size
-                        if key == _HostDetailsKeys.SASPackageKeys.PackageAttributesKeys.SIZE:
-                            value = _bytesHumanReadable(value)
-                        package_attrs[key] = value
-
-            # seed results values
-            results[package_name] = {
-                _HostDetailsKeys.SASPackageKeys.ATTRIBUTES: dict(),
-                _HostDetailsKeys.SASPackageKeys.INSTALLED_FILES: list(),
-                _HostDetailsKeys.SASPackageKeys.PROVIDED_SERVICES: list(),
-                _HostDetailsKeys.SASPackageKeys.UPDATE_STATUS: {
-                    _HostDetailsKeys.SASPackageKeys.PackageUpdateStatusKeys.AVAIL: False,
-                    _HostDetailsKeys.SASPackageKeys.PackageUpdateStatusKeys.FROM_REPO: '',
-                    _HostDetailsKeys.SASPackageKeys.PackageUpdateStatusKeys.VERSION: ''
-                }
+        # seed results values
+        results[package_name] = _get_default_package_info()
+
+        # add package attributes to results
+        results[package_name][_HostDetailsKeys.SASPackageKeys.ATTRIBUTES] = package_attrs
+        results[package_name][_HostDetailsKeys.SASPackageKeys.METRICS] = package_metrics
+
+        # include installed files, if specified
+        if include_installed_files:
+            # determine any provided services
+            service_paths = [f for f in installed_files if re.match("/etc/.*init.d/.*", f)]
+            if len(service_paths) > 0:
+                service_names = [os.path.basename(service_path) for service_path in service_paths]
+                results[package_name][_HostDetailsKeys.SASPackageKeys.PROVIDED_SERVICES] = service_names
+
+            results[package_name][_HostDetailsKeys.SASPackageKeys.INSTALLED_FILES] = installed_files
+
+
+# =====
+# _get_service_script_owners(str, int)
+# =====
+def _get_service_script_owners(locale_encoding=None, timeout=None):
+    """
+    Returns the package owning each installed init.d service script. All scripts are resolved with a single rpm
+    query; if its output can't be matched to the scripts queried, each script is queried on its own.
+
+    :param locale_encoding: A custom locale encoding that should be used to decode potentially localized text.
+    :param int timeout: The number of seconds after which any command run is stopped.
+    :return: A list of (script path, owning package name) tuples, sorted by script path.
+    :rtype list:
+    """
 
+    # /etc/init.d may be a link to /etc/rc.d/init.d, only query each script once
+    service_paths = dict()
+    for service_path in glob.glob(SERVICE_SCRIPT_GLOB) + glob.glob(SERVICE_SCRIPT_RC_GLOB):
+        if os.path.isfile(service_path):
+            real_path = os.path.join(os.path.realpath(os.path.dirname(service_path)),
+                                     os.path.basename(service_path))
+            service_paths.setdefault(real_path, service_path)
+
+    service_paths = sorted(service_paths.values())
+    if len(service_paths) == 0:
+        return list()
+
+    # delimit owner names so they can be told apart from messages about scripts not owned by any package
+    # script names are quoted, since any file in the script directories is queried as root
+    owner_prefix = 'owner:::'
+    query_cmd = "rpm -qf --queryformat '" + owner_prefix + "%{name}\n' "
+
+    # rpm's return code is the number of scripts without an owner, so only the output is checked
+    try:
+        owners_stdout = _run_command(query_cmd + " ".join([shell_quote(service_path) for service_path in service_paths]) +
+                                     " || true", timeout=timeout)
+    except _CommandError:
+        owners_stdout = ''
+
+    owner_lines = _decode_str(owners_stdout, locale_encoding).splitlines()
+
+    # each script is reported on exactly one line unless it is owned by more than one package
+    if len(owner_lines) != len(service_paths):
+        owner_lines = list()
+        for service_path in service_paths:
+            try:
+                owner_stdout = _run_command(query_cmd + shell_quote(service_path), additional_rc=1, timeout=timeout)
+            except _CommandError:
+                owner_stdout = ''
+
+            owner_lines.append(_decode_str(owner_stdout, locale_encoding).strip().split("\n")[0])
+
+    results = list()
+    for service_path, owner_line in zip(service_paths, owner_lines):
+        if owner_line.startswith(owner_prefix):
+            results.append((service_path, owner_line[len(owner_prefix):]))
+
+    return results
+
+
+# =====
+# _get_package_verification_info(list, int)
+# =====
+def _get_package_verification_info(package_names, timeout=None):
+    """
+    Verifies the files installed by the given packages against the rpm database and returns a summary of the
+    files that were modified or deleted for each package.
+
+    The packages are split into shards of *VERIFY_SHARD_SIZE* packages, which are verified concurrently, and the
+    output of each shard is read as it is produced.
+
+    :param list package_names: The names of the packages to verify.
+    :param int timeout: The number of seconds after which the verification of a single shard is stopped and treated
+                        as failed.
+    :return: A dict of package names mapped to their verification summary. Packages in a shard that failed are
+             left out, and are reported as unverified by the module.
+    :rtype dict:
+    :raises _CommandError: If no shard could be verified.
+    """
+
+    results = dict()
+
+    shards = [package_names[index:index + VERIFY_SHARD_SIZE]
+              for index in range(0, len(package_names), VERIFY_SHARD_SIZE)]
+
+    shard_results, shard_errors = _run_concurrently(
+        lambda shard: _verify_packages(shard, timeout), [(shard,) for shard in shards])
+
+    for shard_result in shard_results:
+        if shard_result is not None:
+            results.update(shard_result)
+
+    errors = [error for error in shard_errors if error is not None]
+    if errors and not results:
+        raise errors[0]
+
+    return results
+
+
+# =====
+# _verify_packages(list, int)
+# =====
+def _verify_packages(package_names, timeout=None):
+    """
+    Runs 'rpm -V' for each of the given packages in a single shell and returns a summary of the files that were
+    modified or deleted for each package.
+
+    :param list package_names: The names of the packages to verify.
+    :param int timeout: The number of seconds after which the verification is stopped and treated as failed.
+    :return: A dict of package names mapped to their verification summary.
+    :rtype dict:
+    :raises _CommandError: If the verification fails or times out.
+    """
+
+    verification_keys = _HostDetailsKeys.SASPackageKeys.PackageVerificationKeys
+
+    # delimit the output of each package, since rpm does not say which package a mismatched file belongs to
+    package_prefix = 'package:::'
+
+    # dependencies and verify scripts are skipped, only the installed files are checked
+    # rpm's return code is non-zero for any mismatch, so only the output is checked
+    # package names come from the rpm database and are quoted so they are never interpreted by the shell
+    quoted_names = " ".join(shell_quote(package_name) for package_name in package_names)
+    command = "for package in " + quoted_names + "; do echo '" + package_prefix + "'\"$package\"; " \
+              "rpm -V --nodeps --noscripts \"$package\"; done; exit 0"
+
+    results = dict()
+    verification = None
+    for line in _stream_command(command, timeout=timeout):
+        line = line.rstrip("\n")
+
+        if line.startswith(package_prefix):
+            verification = {
+                verification_keys.FILES: list(),
+                verification_keys.MISSING: 0,
+                verification_keys.MODIFIED: 0
             }
+            results[line[len(package_prefix):]] = verification
+            continue
+
+        # mismatched files are reported as 'missing' or a string of changed attributes, an optional file type, and
+        # the path; other messages are ignored
+        match = re.match("^(missing|[.?SM5DLUGTP]{8,9})\\s+(?:[acdglr]\\s+)?(/.*)$", line)
+        if verification is None or match is None:
+            continue
+
+        if match.group(1) == 'missing':
+            verification[verification_keys.MISSING] += 1
+        else:
+            verification[verification_keys.MODIFIED] += 1
+
+        if len(verification[verification_keys.FILES]) < VERIFY_MAX_FILES:
+            verification[verification_keys.FILES].append(line)
+
+    return results
+
+
+# =====
+# _get_package_footprint_info(AnsibleModule, dict, bool, str, int)
+# =====
+def _get_package_footprint_info(module, packages, include_installed_files, locale_encoding=None, timeout=None):
+    """
+    Returns the disk space currently used by the files of each of the given packages.
+
+    A package's footprint is made up of the files it installed, as they are now, and any files created since in the
+    directories it installed that are not owned by another package, such as logs, caches, and generated
+    configuration. Like **du**, sizes are the allocated blocks of each file, symbolic links are not followed, and
+    files with more than one hard link are counted once. A path owned by several packages is counted for the first
+    of them by name.
+
+    The packages are measured concurrently.
+
+    :param AnsibleModule module: The AnsibleModule object representing the current module.
+    :param dict packages: The collected packages.
+    :param bool include_installed_files: Whether the collected packages include their installed files. If not, the
+                                         installed files are queried.
+    :param str locale_encoding: A custom locale encoding that should be used to decode potentially localized text.
+    :param int timeout: The number of seconds after which any command run is stopped.
+    :return: A dict of package names mapped to the number of bytes used by their files.
+    :rtype dict:
+    """
+
+    package_files = packages
+    if not include_installed_files:
+        package_files = _get_installed_package_info(module, True, locale_encoding, timeout)
+
+    package_names = sorted(name for name in package_files if name in packages)
+
+    path_owners = dict()
+    for package_name in package_names:
+        for path in package_files[package_name][_HostDetailsKeys.SASPackageKeys.INSTALLED_FILES]:
+            path_owners.setdefault(path, package_name)
+
+    usages, errors = _run_concurrently(
+        lambda package_name: _get_package_files_usage(
+            package_name, package_files[package_name][_HostDetailsKeys.SASPackageKeys.INSTALLED_FILES], path_owners),
+        [(package_name,) for package_name in package_names])
+
+    # hard-linked files are assigned to packages in name order so the results do not depend on thread timing
+    results = dict()
+    counted_links = set()
+    for package_name, usage, error in zip(package_names, usages, errors):
+        if error is not None:
+            raise error
+
+        disk_usage, links = usage
+        for link_id, link_size in sorted(links.items()):
+            if link_id not in counted_links:
+                counted_links.add(link_id)
+                disk_usage += link_size
+
+        results[package_name] = disk_usage
+
+    return results
+
+
+# =====
+# _get_package_files_usage(str, list, dict)
+# =====
+def _get_package_files_usage(package_name, installed_files, path_owners):
+    """
+    Measures the files of a single package, walking the directories it owns for files that were created since it
+    was installed.
+
+    :param str package_name: The name of the package.
+    :param list installed_files: The paths installed by the package.
+    :param dict path_owners: The paths installed by all packages mapped to the package they are counted for.
+    :return: A tuple of the number of bytes used by files with a single link and a dict of the files with more than
+             one hard link ('<device>:<inode>' mapped to bytes).
+    :rtype tuple:
+    """
+
+    disk_usage = 0
+    links = dict()
+    directories = list()
+
+    for path in installed_files:
+        if path_owners.get(path) != package_name:
+            continue
+
+        try:
+            file_stat = os.lstat(path)
+        except OSError:
+            # the file was removed after installation
+            continue
+
+        if stat.S_ISDIR(file_stat.st_mode):
+            directories.append(path)
+            disk_usage += file_stat.st_blocks * 512
+        elif file_stat.st_nlink > 1:
+            links["{0}:{1}".format(file_stat.st_dev, file_stat.st_ino)] = file_stat.st_blocks * 512
+        else:
+            disk_usage += file_stat.st_blocks * 512
+
+    # files and directories that no package owns belong to the package owning the directory they were created in
+    while directories:
+        directory_path = directories.pop()
+
+        try:
+            names = os.listdir(directory_path)
+        except OSError:
+            continue
+
+        for name in names:
+            path = os.path.join(directory_path, name)
+            if path in path_owners:
+                continue
+
+            try:
+                file_stat = os.lstat(path)
+            except OSError:
+                continue
+
+            if stat.S_ISDIR(file_stat.st_mode):
+                directories.append(path)
+                disk_usage += file_stat.st_blocks * 512
+            elif file_stat.st_nlink > 1:
+                links["{0}:{1}".format(file_stat.st_dev, file_stat.st_ino)] = file_stat.st_blocks * 512
+            else:
+                disk_usage += file_stat.st_blocks * 512
+
+    return disk_usage, links
+
+
+# =====
+# _get_sas_package_update_info(AnsibleModule, str, str, int)
+# =====
+def _get_sas_package_update_info(module, package_manager, locale_encoding=None, timeout=None,
+                                 update_mode=_PackageUpdateModes.ONLINE, cache_dir=None, ttl=0, refresh_cache=False):
+    """
+    Retrieves available update information for all installed SAS packages using the host's package manager and
+    returns the values as a dict. The results of the last check are reused while they are younger than the given
+    time-to-live.
+
+    :param AnsibleModule module: The AnsibleModule object representing the current module.
+    :param str package_manager: The package manager used by the host.
+    :param locale_encoding: A custom locale encoding that should be used to decode potentially localized text.
+    :param int timeout: The number of seconds after which any command run is stopped.
+    :param str update_mode: Whether the package manager may refresh repository metadata (online) or only use the
+                            metadata cached on the host (offline).
+    :param str cache_dir: The directory holding cached data, or None if cached data should not be used.
+    :param int ttl: The number of seconds for which the results of a previous check are reused.
+    :param bool refresh_cache: Whether the results of a previous check should be ignored.
+    :return: A dict of the time of the check, the mode it ran in, and the package names mapped to a dict containing
+             package update attribute names and their values.
+    :rtype dict:
+    """
+
+    # reuse the last check if it is recent enough and at least as current as the requested mode
+    if cache_dir is not None and ttl > 0 and not refresh_cache:
+        update_check = _load_cache(cache_dir, SAS_PACKAGE_UPDATES_CACHE)
+        if isinstance(update_check, dict) and \
+                (update_mode == _PackageUpdateModes.OFFLINE or
+                 update_check.get(_PackageUpdateCacheKeys.MODE) == _PackageUpdateModes.ONLINE):
+            try:
+                if 0 <= time.time() - update_check[_PackageUpdateCacheKeys.CHECKED] < ttl:
+                    update_check[_PackageUpdateCacheKeys.UPDATES] = dict(update_check[_PackageUpdateCacheKeys.UPDATES])
+                    return update_check
+            except (KeyError, TypeError, ValueError):
+                pass  # the cached check is incomplete, run a new one
+
+    offline = update_mode == _PackageUpdateModes.OFFLINE
+
+    checked = time.time()
+    if package_manager == _PackageManagers.ZYPPER:
+        updates = _get_sas_package_update_info_zypper(module, locale_encoding, timeout, offline)
+    else:
+        updates = _get_sas_package_update_info_yum(module, locale_encoding, timeout, offline)
+
+    update_check = {
+        _PackageUpdateCacheKeys.CHECKED: checked,
+        _PackageUpdateCacheKeys.MODE: update_mode,
+        _PackageUpdateCacheKeys.UPDATES: updates
+    }
+
+    if cache_dir is not None and ttl > 0 and not module.check_mode:
+        _save_cache(cache_dir, SAS_PACKAGE_UPDATES_CACHE, update_check)
+
+    return update_check
+
 
-            # add package attributes to results
-            results[package_name][_HostDetailsKeys.SASPackageKeys.ATTRIBUTES] = package_attrs
+# =====
+# _get_package_update_check_info(dict)
+# =====
+def _get_package_update_check_info(update_check):
+    """
+    Returns when and how the available package updates were determined.
 
-            # determine any provided services
-            service_paths = [f for f in installed_files if re.match("/etc/.*init.d/.*", f)]
-            if len(service_paths) > 0:
-                service_names = [os.path.basename(service_path) for service_path in service_paths]
-                results[package_name][_HostDetailsKeys.SASPackageKeys.PROVIDED_SERVICES] = service_names
+    :param dict update_check: The results returned by *_get_sas_package_update_info()*.
+    :return: A dict of package update check attribute names and their values.
+    :rtype dict:
+    """
 
-            # include installed files, if specified
-            if include_installed_files:
-                results[package_name][_HostDetailsKeys.SASPackageKeys.INSTALLED_FILES] = installed_files
+    checked = update_check.get(_PackageUpdateCacheKeys.CHECKED)
+    if checked is None:
+        return {
+            _HostDetailsKeys.PackageUpdateCheckKeys.AGE: None,
+            _HostDetailsKeys.PackageUpdateCheckKeys.EPOCH: None,
+            _HostDetailsKeys.PackageUpdateCheckKeys.MODE: '',
+            _HostDetailsKeys.PackageUpdateCheckKeys.TIMESTAMP: ''
+        }
 
-    return results
+    return {
+        _HostDetailsKeys.PackageUpdateCheckKeys.AGE: max(0, int(time.time() - checked)),
+        _HostDetailsKeys.PackageUpdateCheckKeys.EPOCH: int(checked),
+        _HostDetailsKeys.PackageUpdateCheckKeys.MODE: update_check.get(_PackageUpdateCacheKeys.MODE, ''),
+        _HostDetailsKeys.PackageUpdateCheckKeys.TIMESTAMP:
+            datetime.datetime.fromtimestamp(checked).strftime("%A, %B %d, %Y %I:%M%p")
+    }
 
 
 # =====
-# _get_sas_package_update_info_yum(AnsibleModule)
+# _get_sas_package_update_info_yum(AnsibleModule, str, int)
 # =====
-def _get_sas_package_update_info_yum(module, locale_encoding=None):
+def _get_sas_package_update_info_yum(module, locale_encoding=None, timeout=None, offline=False):
     """
     Retrieves package information via yum for all installed SAS packages and returns the values as a dict.
 
     :param AnsibleModule module: The AnsibleModule object representing the current module.
     :param locale_encoding: A custom locale encoding that should be used to decode potentially localized text.
+    :param int timeout: The number of seconds after which any command run is stopped.
+    :param bool offline: Whether only the repository metadata cached on the host should be used.
     :return: A dict of package names mapped to a dict containing package attribute names and their values.
     :rtype dict:
     """
@@ -1637,10 +4423,12 @@ def _get_sas_package_update_info_yum(module, locale_encoding=None):
     # -- package update info -- #
 
     # run package info command
-    # by default, _execute_command check for a return code of 0 for success
+    # by default, _run_command checks for a return code of 0 for success
     # if packages are found with available updates, the command will return 100
     # so 100 is provided as an additional success scenario (0 or 100)
-    info_cmd_stdout = _execute_command("yum -q check-update 'sas-*'", module, 100)
+    # -C runs entirely from the yum cache without refreshing metadata
+    cache_option = "-C " if offline else ""
+    info_cmd_stdout = _run_command("yum -q " + cache_option + "check-update 'sas-*'", 100, timeout=timeout)
 
     # split stdout into an array by line, containing update info per package on each line
     all_update_info = info_cmd_stdout.split("\n")
@@ -1676,14 +4464,16 @@ def _get_sas_package_update_info_yum(module, locale_encoding=None):
 
 
 # =====
-# _get_sas_package_update_info_zypper(AnsibleModule)
+# _get_sas_package_update_info_zypper(AnsibleModule, str, int)
 # =====
-def _get_sas_package_update_info_zypper(module, locale_encoding=None):
+def _get_sas_package_update_info_zypper(module, locale_encoding=None, timeout=None, offline=False):
     """
     Retrieves package information via zypper for all installed SAS packages and returns the values as a dict.
 
     :param AnsibleModule module: The AnsibleModule object representing the current module.
     :param locale_encoding: A custom locale encoding that should be used to decode potentially localized text.
+    :param int timeout: The number of seconds after which any command run is stopped.
+    :param bool offline: Whether only the repository metadata cached on the host should be used.
     :return: A dict of package names mapped to a dict containing package attribute names and their values.
     :rtype dict:
     """
@@ -1693,10 +4483,11 @@ def _get_sas_package_update_info_zypper(module, locale_encoding=None):
     # -- package update info -- #
 
     # run package info command
-    # by default, _execute_command check for a return code of 0 for success
+    # by default, _run_command checks for a return code of 0 for success
     # if packages are not found with available updates, the grep command will return 1
     # so 1 is provided as an additional success scenario (0 or 1)
-    info_cmd_stdout = _execute_command("zypper -n list-updates | grep 'sas-'", module, 1)
+    refresh_option = "--no-refresh " if offline else ""
+    info_cmd_stdout = _run_command("zypper -n " + refresh_option + "list-updates | grep 'sas-'", 1, timeout=timeout)
 
     # split stdout into an array by line, containing update info per package on each line
     all_update_info = info_cmd_stdout.split("\n")
@@ -1725,9 +4516,6 @@ def _get_sas_package_update_info_zypper(module, locale_encoding=None):
     return results
 
 
-# =====
-# _execute_command(str, AnsibleModule, bool)
-# =====
 # def _get_required_software_info(ansible_facts, module):
 #    """
 #    Retrieves information about software required by SAS and returns a dict of the software's attributes.
@@ -1742,9 +4530,9 @@ def _get_sas_package_update_info_zypper(module, locale_encoding=None):
 
 #    java_results = {
 #        _HostDetailsKeys.RequiredSoftwareKeys.SoftwareAttributesKeys.PATH:
-#            _execute_command('which java', module).strip(),
+#            _run_command('which java').strip(),
 #        _HostDetailsKeys.RequiredSoftwareKeys.SoftwareAttributesKeys.VERSION:
-#            _execute_command("java -version 2>&1 | head -n 1 | awk -F '\"' '{print $2}'", module).strip()
+#            _run_command("java -version 2>&1 | head -n 1 | awk -F '\"' '{print $2}'").strip()
 #    }
 
 #    results[_HostDetailsKeys.RequiredSoftwareKeys.JAVA] = java_results
@@ -1762,36 +4550,583 @@ def _get_sas_package_update_info_zypper(module, locale_encoding=None):
 
 
 # =====
-# _execute_command(str, AnsibleModule, bool)
+# Class: _CommandError(Exception)
+# =====
+class _CommandError(Exception):
+    """
+    Internal exception raised when a command run by *_run_command()* fails or times out. The message and output are
+    kept so the failure can be reported by the module from the main thread.
+
+    :ivar str command: The command that failed.
+    :ivar str message: A description of the failure.
+    :ivar str stderr:  The output returned by the command, if any.
+    """
+
+    def __init__(self, command, message, stderr=None):
+        super(_CommandError, self).__init__(message)
+        self.command = command
+        self.message = message
+        self.stderr = stderr
+
+
+# =====
+# _run_command(str, int, bool, int, int)
 # =====
-def _execute_command(command, module, additional_rc=0, shell=True):
+def _run_command(command, additional_rc=0, shell=True, timeout=None, max_output=MAX_COMMAND_OUTPUT):
     """
-    Returns the stdout of the given command.
+    Returns the stdout of the given command. A failure raises a *_CommandError* instead of ending the module, which
+    makes this function safe to call from worker threads.
+
+    Each collector runs at most *MAX_CONCURRENT_COMMANDS* commands at the same time; a command waits for a free slot
+    of its own collector before it is started (see *_get_command_slots()*).
 
     :param str command: The command to execute.
-    :param AnsibleModule module: The AnsibleModule object representing the current module.
+    :param int additional_rc: A return code, other than 0, that denotes the command was successful.
     :param bool shell: (default: True) Whether to use the shell as the program to execute.
-    :return: The stdout returned by executing the process or None if an OSError is encountered.
+    :param int timeout: The number of seconds after which the command is stopped and treated as failed.
+    :param int max_output: The number of bytes of output after which the command is stopped and treated as failed.
+    :return: The stdout returned by executing the process.
     :rtype str:
+    :raises _CommandError: If the command fails, returns an unexpected return code, times out, or produces too much
+                           output.
     """
 
-    proc = subprocess.Popen(command, shell=shell, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, bufsize=-1)
+    with _get_command_slots():
+        proc, timer, timed_out = _start_command(command, shell, timeout)
 
-    try:
-        stdout, stderr = proc.communicate()
-    except OSError:
-        proc.kill()
-        stdout, stderr = proc.communicate()
-        message = "Command {0} failed.".format(command)
-        module.fail_json(msg=message, command_stderr=stderr)
+        output = list()
+        output_size = 0
+        output_exceeded = False
+        try:
+            for chunk in iter(lambda: proc.stdout.read(65536), b''):
+                output_size += len(chunk)
+                if output_size > max_output:
+                    output_exceeded = True
+                    _stop_command(proc)
+                    break
+
+                output.append(chunk)
+
+            proc.wait()
+        except (IOError, OSError):
+            _stop_command(proc)
+            raise _CommandError(command, "Command {0} failed.".format(command), None)
+        finally:
+            _finish_command(proc, timer)
+
+    stdout = b''.join(output)
+    _record_command(1, output_size)
+
+    if timed_out.is_set():
+        raise _CommandError(command, "Command {0} timed out after {1} seconds.".format(command, timeout), stdout)
+
+    if output_exceeded:
+        raise _CommandError(command, "Command {0} produced more than {1} of output.".format(
+            command, _bytesHumanReadable(max_output)), None)
 
     if proc.returncode != 0 and proc.returncode != additional_rc:
-        message = "Command {0} failed.".format(command)
-        module.fail_json(msg=message, command_stderr=stderr)
+        raise _CommandError(command, "Command {0} failed.".format(command), None)
 
     return stdout.decode('utf-8')
 
 
+# =====
+# _stream_command(str, int, bool, int)
+# =====
+def _stream_command(command, additional_rc=0, shell=True, timeout=None):
+    """
+    Yields the stdout of the given command one line at a time, as it is produced, so that large output never has to
+    be held in memory all at once. Like *_run_command()*, a failure raises a *_CommandError*, though only once all
+    output has been consumed, and the command holds one of its collector's *MAX_CONCURRENT_COMMANDS* slots until
+    then.
+
+    :param str command: The command to execute.
+    :param int additional_rc: A return code, other than 0, that denotes the command was successful.
+    :param bool shell: (default: True) Whether to use the shell as the program to execute.
+    :param int timeout: The number of seconds after which the command is stopped and treated as failed.
+    :return: A generator of the lines of stdout returned by executing the process, including line endings.
+    :rtype generator:
+    :raises _CommandError: If the command fails, returns an unexpected return code, or times out.
+    """
+
+    with _get_command_slots():
+        proc, timer, timed_out = _start_command(command, shell, timeout)
+        _record_command(1, 0)
+
+        try:
+            for line in iter(proc.stdout.readline, b''):
+                _record_command(0, len(line))
+                yield line.decode('utf-8')
+
+            proc.wait()
+        finally:
+            # stop the command if the caller stopped reading its output early
+            _finish_command(proc, timer)
+
+    if timed_out.is_set():
+        raise _CommandError(command, "Command {0} timed out after {1} seconds.".format(command, timeout), None)
+
+    if proc.returncode != 0 and proc.returncode != additional_rc:
+        raise _CommandError(command, "Command {0} failed.".format(command), None)
+
+
+# =====
+# _get_command_slots()
+# =====
+def _get_command_slots():
+    """
+    Returns the semaphore limiting the commands run by the collector running on the current thread, or the one
+    limiting the commands run outside of any collector.
+
+    :return: The semaphore to hold while a command runs.
+    :rtype BoundedSemaphore:
+    """
+
+    return getattr(_thread_command_slots, 'slots', _default_command_slots)
+
+
+# =====
+# _start_command(str, bool, int)
+# =====
+def _start_command(command, shell, timeout):
+    """
+    Starts the given command with stderr redirected to stdout and, if a timeout is given, a timer that stops the
+    command and every process it started once the timeout expires.
+
+    :param str command: The command to execute.
+    :param bool shell: Whether to use the shell as the program to execute.
+    :param int timeout: The number of seconds after which the command is stopped, or None to never stop it.
+    :return: A tuple of the started process, the timer (or None), and an event set if the command timed out.
+    :rtype tuple:
+    """
+
+    # commands that can time out are started in their own process group so any processes they spawn are
+    # stopped with them
+    # preexec_fn is not safe to use while other threads are running, so it is only used on Python 2, which lacks
+    # start_new_session
+    session_args = dict()
+    if timeout and sys.version_info[0] >= 3:
+        session_args['start_new_session'] = True
+    elif timeout:
+        session_args['preexec_fn'] = os.setsid
+
+    with _running_commands_lock:
+        # an abandoned collector must not start new commands once the module is exiting
+        if _running_commands_stopped[0]:
+            raise _CommandError(command, "Command {0} was not started because the module is exiting.".format(command))
+
+        proc = subprocess.Popen(command, shell=shell, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, bufsize=-1,
+                                **session_args)
+        _running_commands.add(proc)
+
+    timer = None
+    timed_out = threading.Event()
+    if timeout:
+        def _kill():
+            timed_out.set()
+            _stop_command(proc)
+
+        timer = threading.Timer(timeout, _kill)
+        timer.daemon = True
+        timer.start()
+
+    return proc, timer, timed_out
+
+
+# =====
+# _stop_command(Popen)
+# =====
+def _stop_command(proc):
+    """
+    Kills the given command, along with the processes it started if it runs in its own process group.
+
+    :param Popen proc: The process of the command.
+    """
+
+    try:
+        if os.getpgid(proc.pid) == proc.pid:
+            os.killpg(proc.pid, signal.SIGKILL)
+        else:
+            proc.kill()
+    except OSError:
+        pass  # the process already exited
+
+
+# =====
+# _finish_command(Popen, Timer)
+# =====
+def _finish_command(proc, timer):
+    """
+    Cancels the timeout of the given command, stops it if it is still running, and closes its output.
+
+    :param Popen proc: The process of the command.
+    :param Timer timer: The timer returned by *_start_command()*, or None.
+    """
+
+    # the cancelled timer's thread is waited for, so it never outlives the module (Python 2 reports an error for a
+    # timer thread still waiting when the interpreter exits)
+    if timer is not None:
+        timer.cancel()
+        timer.join()
+
+    if proc.poll() is None:
+        _stop_command(proc)
+        proc.wait()
+
+    proc.stdout.close()
+
+    with _running_commands_lock:
+        _running_commands.discard(proc)
+
+
+# =====
+# _stop_running_commands()
+# =====
+def _stop_running_commands():
+    """
+    Stops every command that is still running, and any command started after this point, so commands of collectors
+    abandoned after their deadline do not outlive the module (i.e. a *yum* holding the rpm lock). Registered to run
+    when the interpreter exits, since the timers that would otherwise stop them die with it.
+    """
+
+    with _running_commands_lock:
+        _running_commands_stopped[0] = True
+        procs = list(_running_commands)
+        _running_commands.clear()
+
+    for proc in procs:
+        if proc.poll() is None:
+            _stop_command(proc)
+
+
+atexit.register(_stop_running_commands)
+
+
+# =====
+# _fail_command(AnsibleModule, _CommandError)
+# =====
+def _fail_command(module, error):
+    """
+    Ends module execution with the details of a failed command.
+
+    :param AnsibleModule module: The AnsibleModule object representing the current module.
+    :param _CommandError error: The error raised for the failed command.
+    """
+
+    module.fail_json(msg=error.message, command_stderr=error.stderr)
+
+
+# =====
+# _run_concurrently(function, list, int)
+# =====
+def _run_concurrently(function, all_args, max_workers=MAX_WORKER_THREADS):
+    """
+    Calls the given function once for each tuple of arguments on a bounded pool of threads and returns the results
+    in the same order as the arguments, regardless of the order in which the calls complete.
+
+    Exceptions raised by a call are caught and returned in place of its result, so one failing call does not stop
+    the others.
+
+    :param function: The function to call.
+    :param list all_args: A list of argument tuples, one for each call.
+    :param int max_workers: The maximum number of calls to run at the same time.
+    :return: A tuple of a list of results and a list of exceptions (None where the call succeeded).
+    :rtype tuple:
+    """
+
+    results = [None] * len(all_args)
+    errors = [None] * len(all_args)
+
+    work = queue.Queue()
+    for index, args in enumerate(all_args):
+        work.put((index, args))
+
+    # the work is accounted to, and its commands limited with those of, the collector that started it
+    timings = getattr(_thread_timings, 'timings', None)
+    command_slots = _get_command_slots()
+
+    def _worker():
+        _thread_timings.timings = timings
+        _thread_command_slots.slots = command_slots
+        cpu_start = _get_thread_cpu_time()
+
+        try:
+            while True:
+                try:
+                    index, args = work.get_nowait()
+                except queue.Empty:
+                    return
+
+                try:
+                    results[index] = function(*args)
+                except Exception as error:
+                    errors[index] = error
+        finally:
+            _add_thread_cpu_time(timings, cpu_start)
+
+    workers = [threading.Thread(target=_worker) for _ in range(min(max_workers, len(all_args)))]
+    for worker in workers:
+        worker.daemon = True
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    return results, errors
+
+
+# =====
+# _run_collectors(list)
+# =====
+def _run_collectors(collectors):
+    """
+    Runs each collector on its own thread and waits for each one until its timeout expires.
+
+    Collectors are isolated from each other: if a collector raises an error or does not complete in time, the error
+    is recorded and the default results for that collector are returned in its place. Each collector has its own
+    *MAX_CONCURRENT_COMMANDS* command slots, so time a collector spends waiting for a slot is only ever spent waiting
+    for its own commands.
+
+    :param list collectors: A list of (name, function, argument tuple, timeout) tuples, one for each collector.
+    :return: A tuple of a dict of collector names mapped to their results, a dict of collector names mapped to the
+             error message of any collector that did not complete, and a dict of collector names mapped to their
+             timings.
+    :rtype tuple:
+    """
+
+    results = dict()
+    errors = dict()
+    timings = dict()
+
+    def _collect(name, function, args):
+        _thread_timings.timings = timings[name]
+        _thread_command_slots.slots = threading.BoundedSemaphore(MAX_CONCURRENT_COMMANDS)
+        cpu_start = _get_thread_cpu_time()
+
+        try:
+            results[name] = function(*args)
+        except _CommandError as error:
+            errors[name] = error.message
+        except Exception as error:
+            errors[name] = "Collector {0} failed: {1}".format(name, error)
+        finally:
+            _add_thread_cpu_time(timings[name], cpu_start)
+            timings[name][_HostDetailsKeys.TimingsKeys.WALL_TIME] = time.time() - start_time
+
+    start_time = time.time()
+    threads = list()
+    for name, function, args, timeout in collectors:
+        timings[name] = _new_timings()
+        thread = threading.Thread(target=_collect, args=(name, function, args))
+        thread.daemon = True
+        thread.start()
+        threads.append((name, thread, timeout))
+
+    collected = dict()
+    collector_timings = dict()
+    for name, thread, timeout in threads:
+        thread.join(max(0, start_time + timeout - time.time()))
+
+        with _timings_lock:
+            collector_timings[name] = dict(timings[name])
+
+        if thread.is_alive():
+            errors[name] = "Collector {0} did not complete within {1} seconds.".format(name, timeout)
+            collector_timings[name][_HostDetailsKeys.TimingsKeys.WALL_TIME] = time.time() - start_time
+        else:
+            collector_timings[name][_HostDetailsKeys.TimingsKeys.COMPLETED] = True
+
+        if name in errors:
+            collected[name] = _get_default_collector_results(name)
+        else:
+            collected[name] = results[name]
+
+    return collected, errors, collector_timings
+
+
+# =====
+# _new_timings()
+# =====
+def _new_timings():
+    """
+    Returns the initial timings of a collector, which are updated as the collector runs.
+
+    :return: A dict of timing names mapped to their initial values.
+    :rtype dict:
+    """
+
+    return {
+        _HostDetailsKeys.TimingsKeys.COMMANDS: 0,
+        _HostDetailsKeys.TimingsKeys.COMPLETED: False,
+        _HostDetailsKeys.TimingsKeys.CPU_TIME: 0.0 if _get_thread_cpu_time() is not None else None,
+        _HostDetailsKeys.TimingsKeys.OUTPUT_BYTES: 0,
+        _HostDetailsKeys.TimingsKeys.WALL_TIME: 0.0
+    }
+
+
+# =====
+# _record_command(int, int)
+# =====
+def _record_command(commands, output_bytes):
+    """
+    Adds the given number of commands and bytes of output to the timings of the collector running on the current
+    thread, if any.
+
+    :param int commands: The number of commands started.
+    :param int output_bytes: The number of bytes of output read from the commands.
+    """
+
+    timings = getattr(_thread_timings, 'timings', None)
+    if timings is None:
+        return
+
+    with _timings_lock:
+        timings[_HostDetailsKeys.TimingsKeys.COMMANDS] += commands
+        timings[_HostDetailsKeys.TimingsKeys.OUTPUT_BYTES] += output_bytes
+
+
+# =====
+# _get_thread_cpu_time()
+# =====
+def _get_thread_cpu_time():
+    """
+    Returns the CPU time used by the current thread.
+
+    :return: The number of CPU seconds used by the current thread, or None if the Python version cannot measure it.
+    :rtype float:
+    """
+
+    # available since Python 3.7
+    if hasattr(time, 'thread_time'):
+        return time.thread_time()
+
+    return None
+
+
+# =====
+# _add_thread_cpu_time(dict, float)
+# =====
+def _add_thread_cpu_time(timings, cpu_start):
+    """
+    Adds the CPU time used by the current thread since *cpu_start* to the given collector timings.
+
+    :param dict timings: The collector timings to update, or None if the thread is not running a collector.
+    :param float cpu_start: The CPU time of the current thread when it started work for the collector.
+    """
+
+    if timings is None or cpu_start is None:
+        return
+
+    cpu_time = _get_thread_cpu_time() - cpu_start
+    with _timings_lock:
+        timings[_HostDetailsKeys.TimingsKeys.CPU_TIME] += cpu_time
+
+
+# =====
+# _get_timings_info(float, tuple, dict)
+# =====
+def _get_timings_info(start_time, start_times, collector_timings):
+    """
+    Returns the timings of the module run and of each collector, rounded for reporting.
+
+    :param float start_time: The time at which the module started.
+    :param tuple start_times: The value of *os.times()* when the module started.
+    :param dict collector_timings: The collector timings returned by *_run_collectors()*.
+    :return: A dict of the total timings and the timings of each collector.
+    :rtype dict:
+    """
+
+    timings_keys = _HostDetailsKeys.TimingsKeys
+
+    end_times = os.times()
+    total = {
+        timings_keys.CHILD_CPU_TIME: round((end_times[2] + end_times[3]) - (start_times[2] + start_times[3]), 3),
+        timings_keys.COMMANDS: 0,
+        timings_keys.CPU_TIME: round((end_times[0] + end_times[1]) - (start_times[0] + start_times[1]), 3),
+        timings_keys.OUTPUT_BYTES: 0,
+        timings_keys.WALL_TIME: round(time.time() - start_time, 3)
+    }
+
+    collectors = dict()
+    for name, timings in collector_timings.items():
+        collectors[name] = dict(timings)
+        for key in (timings_keys.CPU_TIME, timings_keys.WALL_TIME):
+            if timings[key] is not None:
+                collectors[name][key] = round(timings[key], 3)
+
+        total[timings_keys.COMMANDS] += timings[timings_keys.COMMANDS]
+        total[timings_keys.OUTPUT_BYTES] += timings[timings_keys.OUTPUT_BYTES]
+
+    return {
+        timings_keys.COLLECTORS: collectors,
+        timings_keys.TOTAL: total
+    }
+
+
+# =====
+# _get_default_collector_results(str)
+# =====
+def _get_default_collector_results(collector):
+    """
+    Returns the empty results used in place of a collector that did not complete, so the structure of the returned
+    host details is the same whether or not every collector succeeded.
+
+    :param str collector: The name of the collector.
+    :return: The default results for the collector.
+    :rtype dict:
+    """
+
+    if collector in (_Collectors.FILESYSTEMS, _Collectors.MEMORY, _Collectors.SAS_ROOT):
+        results = {
+            _HostDetailsKeys.ResourceCheckKeys.RESULTS: dict(),
+            _HostDetailsKeys.ResourceCheckKeys.RESULTS_FORMAT: '',
+            _HostDetailsKeys.ResourceCheckKeys.RESULTS_TIMESTAMP:
+                datetime.datetime.now().strftime("%A, %B %d, %Y %I:%M%p"),
+            _HostDetailsKeys.ResourceCheckKeys.RESULTS_UNIT: _ResourceUnits.MB,
+            _HostDetailsKeys.ResourceCheckKeys.RESULTS_EPOCH: int(time.time()),
+            _HostDetailsKeys.ResourceCheckKeys.METRICS: dict()
+        }
+
+        if collector == _Collectors.SAS_ROOT:
+            results[_HostDetailsKeys.ResourceCheckKeys.RESULTS] = {
+                _HostDetailsKeys.ResourceCheckKeys.SASRootResultsKeys.DIRECTORIES: dict(),
+                _HostDetailsKeys.ResourceCheckKeys.SASRootResultsKeys.FILESYSTEM: '',
+                _HostDetailsKeys.ResourceCheckKeys.SASRootResultsKeys.FILESYSTEM_TOTAL: '',
+                _HostDetailsKeys.ResourceCheckKeys.SASRootResultsKeys.MOUNT: '',
+                _HostDetailsKeys.ResourceCheckKeys.SASRootResultsKeys.PATH: '',
+                _HostDetailsKeys.ResourceCheckKeys.SASRootResultsKeys.SIZE: '',
+                _HostDetailsKeys.ResourceCheckKeys.SASRootResultsKeys.USED_RATIO: '',
+            }
+
+        return results
+
+    if collector == _Collectors.SERVICES:
+        return {
+            _HostDetailsKeys.SASServicesKeys.INSTALLED: dict(),
+            _HostDetailsKeys.SASServicesKeys.METRICS: dict(),
+            _HostDetailsKeys.SASServicesKeys.STATUS: {
+                _HostDetailsKeys.SASServicesKeys.ServicesStatusKeys.UP: 0,
+                _HostDetailsKeys.SASServicesKeys.ServicesStatusKeys.DOWN: 0,
+                _HostDetailsKeys.SASServicesKeys.ServicesStatusKeys.NOT_READY: 0,
+                _HostDetailsKeys.SASServicesKeys.ServicesStatusKeys.OTHER: 0,
+                _HostDetailsKeys.SASServicesKeys.ServicesStatusKeys.MEMORY: '',
+                _HostDetailsKeys.SASServicesKeys.ServicesStatusKeys.NOT_LISTENING: 0,
+                _HostDetailsKeys.SASServicesKeys.ServicesStatusKeys.CONTEXT_SWITCHES: '',
+                _HostDetailsKeys.SASServicesKeys.ServicesStatusKeys.CPU: '',
+                _HostDetailsKeys.SASServicesKeys.ServicesStatusKeys.THREADS: ''
+            }
+        }
+
+    if collector == _Collectors.UPDATES:
+        return {
+            _PackageUpdateCacheKeys.CHECKED: None,
+            _PackageUpdateCacheKeys.MODE: '',
+            _PackageUpdateCacheKeys.UPDATES: dict()
+        }
+
+    # packages and package verifications are dicts of package names
+    return dict()
+
+
 # =====
 # Turn bytes into a human reaable form
 # =====
@@ -1835,6 +5170,93 @@ def _bytesHumanReadable(num_bytes, unit_step=1024.0):
     return str(num_bytes) + ' ' + unit
 
 
+# =====
+# _to_epoch(datetime)
+# =====
+def _to_epoch(local_time):
+    """
+    Converts a local, naive datetime to the number of seconds since the epoch.
+
+    :param datetime local_time: The local time to convert.
+    :return: The number of whole seconds since the epoch.
+    :rtype int:
+    """
+
+    return int(time.mktime(local_time.timetuple()))
+
+
+# =====
+# _load_cache(str, str)
+# =====
+def _load_cache(cache_dir, cache_name):
+    """
+    Returns the data stored in a cache file by *_save_cache()*.
+
+    :param str cache_dir: The directory holding cached data.
+    :param str cache_name: The file name of the cache within the directory.
+    :return: The cached data, or None if the cache does not exist or cannot be read.
+    """
+
+    try:
+        with open(os.path.join(cache_dir, cache_name), 'r') as cache_file:
+            return json.load(cache_file)
+    except (IOError, OSError, ValueError):
+        return None
+
+
+# =====
+# _save_cache(str, str, object)
+# =====
+def _save_cache(cache_dir, cache_name, data):
+    """
+    Stores data in a cache file as JSON. The file is written under a temporary name and then renamed, so a run that
+    is interrupted never leaves a partially written cache behind. Failures are ignored since the cache is only an
+    optimization.
+
+    :param str cache_dir: The directory holding cached data. It is created if it does not exist.
+    :param str cache_name: The file name of the cache within the directory.
+    :param data: The JSON serializable data to store.
+    """
+
+    cache_path = os.path.join(cache_dir, cache_name)
+    temp_path = "{0}.{1}.tmp".format(cache_path, os.getpid())
+
+    try:
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir, 0o700)
+
+        with open(temp_path, 'w') as cache_file:
+            json.dump(data, cache_file)
+        os.rename(temp_path, cache_path)
+    except (IOError, OSError):
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass  # the temporary file was never created
+
+
+# =====
+# _read_proc_file(str)
+# =====
+def _read_proc_file(path):
+    """
+    Returns the content of a file in /proc (or a similar virtual filesystem) as a str.
+
+    :param str path: The path of the file to read.
+    :return: The content of the file.
+    :rtype str:
+    """
+
+    with open(path, 'rb') as proc_file:
+        content = proc_file.read()
+
+    # no need to decode in Python2
+    if sys.version_info[0] >= 3:
+        content = content.decode('utf-8', 'replace')
+
+    return content
+
+
 # =====
 # Handle decoding strings that may contain encoded characters
 # =====
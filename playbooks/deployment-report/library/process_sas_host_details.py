@@ -11,9 +11,19 @@
 #
 from ansible.module_utils.basic import AnsibleModule
 import ast
+import json
+import os
+import threading
+import time
 import traceback
 import xml.etree.ElementTree as ET
 # Python 2
+try:
+    import Queue as queue
+# Python 3
+except ImportError:
+    import queue
+# Python 2
 try:
     import urllib2 as web_request
     import urllib2 as web_error
@@ -61,6 +71,35 @@ options:
             -  The URL to look for the published hotfixes.
         require:  False
         default:  http://ftp.sas.com/techsup/download/hotfix/HF2/util01/Viya/data/
+    hotfix_mode:
+        description:
+            - Whether the hotfix files are downloaded from hotfix_url (online) or read only from the files cached in
+              hotfix_cache_dir by earlier runs (offline).
+        required:  false
+        default:   online
+        choices:   [online, offline]
+    hotfix_cache_dir:
+        description:
+            - The directory on the controller where downloaded hotfix files are cached.
+        required:  false
+        default:   ~/.cache/viya-ark/hotfixes
+    hotfix_cache_ttl:
+        description:
+            - The number of seconds a cached hotfix file is used without checking hotfix_url for a newer version.
+              After this time, the cached file is revalidated with the web site, and only downloaded again if it
+              has changed. A value of 0 revalidates the cached files on every run.
+        required:  false
+        default:   0
+    use_cache:
+        description:
+            - Whether hotfix files cached in hotfix_cache_dir should be read and written.
+        required:  false
+        default:   true
+    refresh_cache:
+        description:
+            - Whether the hotfix files cached in hotfix_cache_dir should be ignored and downloaded again.
+        required:  false
+        default:   false
 '''
 
 EXAMPLES = '''
@@ -77,6 +116,19 @@ sas_deployment_details:
     type: dict
 '''
 
+# The number of hosts and collectors listed in the collection timings summary.
+SLOWEST_TIMINGS_LIMIT = 10
+# The number of hotfix files downloaded at the same time.
+HOTFIX_DOWNLOAD_WORKERS = 4
+# The number of seconds to wait to connect to the hotfix website, and for each read from it, before giving up.
+HOTFIX_DOWNLOAD_TIMEOUT = 30
+# The name of the file in the hotfix cache directory recording when each cached hotfix file was retrieved.
+HOTFIX_CACHE_INDEX = 'hotfix_cache.json'
+# The suffix added to the name of a cached hotfix file to name its compiled copy.
+HOTFIX_COMPILED_SUFFIX = '.compiled.json'
+# The format of the compiled hotfix files.  Compiled files in any other format are compiled again.
+HOTFIX_COMPILED_FORMAT = 1
+
 #Print the full hot fix dictionary.  Generally, this will only be for debugging purposes.
 def print_Full_Report( fullReport):
     for currennt_hotfix in fullReport:
@@ -126,8 +178,83 @@ def print_Full_Report( fullReport):
 #   -1 the first string is lower than the second string
 #    0 the first and second strings match exactly.
 #    1 the first string is higher than the second string.
+#
+# Each string is only parsed once (see version_key), so comparing the
+# same versions again is a tuple comparison.
 ###############################################
 def compare_versions (version1, version2, honorTimeStamp=True):
+    versionNumbers1, timeStamp1 = version_key(version1)
+    versionNumbers2, timeStamp2 = version_key(version2)
+    # Versions that cannot be fully parsed are compared as strings, so any error is raised just like before.
+    if versionNumbers1 is None or versionNumbers2 is None:
+        return compare_version_strings(version1, version2, honorTimeStamp)
+
+    length1 = len(versionNumbers1)
+    length2 = len(versionNumbers2)
+    if length1 > length2:
+        if versionNumbers1[:length2] < versionNumbers2:
+            return -1
+        return 1
+    if versionNumbers1 != versionNumbers2[:length1]:
+        if versionNumbers1 < versionNumbers2[:length1]:
+            return -1
+        return 1
+
+    if not honorTimeStamp:
+        return 0
+    if length2 > length1:
+        return -1
+    if timeStamp1 is None or timeStamp2 is None:
+        return compare_version_strings(version1, version2, honorTimeStamp)
+    if timeStamp1 < timeStamp2:
+        return -1
+    if timeStamp1 > timeStamp2:
+        return 1
+    return 0
+
+# The parsed keys of the versions compared so far, by version string (see version_key).
+versionKeys = {}
+
+###########################################
+#  version_key
+#
+# This function parses a version string formatted like so:
+#   d.d.d[....]-dddddd.dddd
+# The parsed key is kept, so each distinct string is only parsed once.
+#
+# Here is the return value:
+#   A 2 element tuple:
+#     [0] a tuple of the numbers before the dash, or None if any of
+#         them is not a number.
+#     [1] a tuple of the first two numbers of the time-date stamp
+#         after the dash, or None if there are not two numbers there.
+###############################################
+def version_key(version):
+    key = versionKeys.get(version)
+    if key is None:
+        splitdash = version.split('-')
+        try:
+            versionNumbers = tuple([int(number) for number in splitdash[0].split('.')])
+        except ValueError:
+            versionNumbers = None
+        try:
+            splitdate = splitdash[1].split('.')
+            timeStamp = (int(splitdate[0]), int(splitdate[1]))
+        except (IndexError, ValueError):
+            timeStamp = None
+        key = (versionNumbers, timeStamp)
+        versionKeys[version] = key
+    return key
+
+###########################################
+#  compare_version_strings
+#
+# This function compares two version strings the same way as
+# compare_versions, parsing them as it goes.  It is used for the
+# versions compare_versions cannot fully parse, so that a malformed
+# version fails in the same way.
+###############################################
+def compare_version_strings(version1, version2, honorTimeStamp=True):
     return_code = 0
 
     splitdash1 = version1.split('-')
@@ -167,6 +294,480 @@ def compare_versions (version1, version2, honorTimeStamp=True):
                             return_code = -1
     return return_code
 
+###########################################
+#  load_hotfix_cache
+#
+# This function returns the index of the hotfix files cached in the
+# given directory.  The index is a dict of file name to a dict with:
+#   key="etag", the ETag header sent with the file, or None.
+#   key="last_modified", the Last-Modified header sent with the file, or None.
+#   key="retrieved", the time the file was last downloaded or
+#                    revalidated, in seconds since the epoch.
+# An empty dict is returned if nothing has been cached yet.
+###############################################
+def load_hotfix_cache(cacheDir):
+    try:
+        with open(os.path.join(cacheDir, HOTFIX_CACHE_INDEX), 'r') as cacheIndexFile:
+            return json.load(cacheIndexFile)
+    except (IOError, OSError, ValueError):
+        return {}
+
+###########################################
+#  open_hotfix_cache
+#
+# This function opens a temporary file in the hotfix cache directory
+# to write the given hotfix file into.  Once written, the file must be
+# passed to close_hotfix_cache, which renames it to its final name, so
+# an interrupted run never leaves a partially written file behind.
+#
+# Here is the return value:
+#   The open temporary file, or None if it could not be created.
+###############################################
+def open_hotfix_cache(cacheDir, fileName):
+    try:
+        if not os.path.isdir(cacheDir):
+            os.makedirs(cacheDir, 0o700)
+        return open(os.path.join(cacheDir, fileName) + "." + str(os.getpid()) + ".tmp", 'wb')
+    except (IOError, OSError):
+        return None
+
+###########################################
+#  close_hotfix_cache
+#
+# This function closes a temporary file opened by open_hotfix_cache.
+# If keep is True, the file replaces the cached copy of the hotfix
+# file.  Otherwise, it is removed.  Failures are ignored, since the
+# cache is only an optimization.
+#
+# Here is the return value:
+#   True if the cached copy was replaced, otherwise False.
+###############################################
+def close_hotfix_cache(cacheDir, fileName, cacheFile, keep):
+    try:
+        cacheFile.close()
+        if keep:
+            os.rename(cacheFile.name, os.path.join(cacheDir, fileName))
+            return True
+    except (IOError, OSError):
+        pass
+    try:
+        os.remove(cacheFile.name)
+    except OSError:
+        pass
+    return False
+
+###########################################
+#  save_hotfix_cache
+#
+# This function writes the given content into the hotfix cache
+# directory (see open_hotfix_cache).
+#
+# Here is the return value:
+#   True if the file was written, otherwise False.
+###############################################
+def save_hotfix_cache(cacheDir, fileName, content):
+    cacheFile = open_hotfix_cache(cacheDir, fileName)
+    if cacheFile is None:
+        return False
+    try:
+        cacheFile.write(content)
+    except (IOError, OSError):
+        return close_hotfix_cache(cacheDir, fileName, cacheFile, False)
+    return close_hotfix_cache(cacheDir, fileName, cacheFile, True)
+
+###########################################
+#  HotfixFileStream
+#
+# This class wraps the response of a hotfix file download, so the file
+# can be parsed while it is being downloaded.  Everything read from the
+# response is also written to the given cache file, if there is one.
+# If writing to the cache file fails, the download carries on and
+# cacheFailed is set to True.
+###############################################
+class HotfixFileStream(object):
+    def __init__(self, response, cacheFile):
+        self.response = response
+        self.cacheFile = cacheFile
+        self.cacheFailed = False
+
+    def read(self, size=-1):
+        data = self.response.read(size)
+        if self.cacheFile is not None and not self.cacheFailed:
+            try:
+                self.cacheFile.write(data)
+            except (IOError, OSError):
+                self.cacheFailed = True
+        return data
+
+###########################################
+#  parse_hotfix_file
+#
+# This function parses a hotfix file incrementally from the given file
+# name or file object.  Each top level "update" element is turned into
+# a record as soon as it has been read, and is then discarded, so the
+# memory used does not grow with the size of the element tree.
+#
+# Here is the return value:
+#   A list of update records, in the order they appear in the file.
+#   Each record is a tuple with the following attributes of the update
+#   element, or None if the attribute is not set:
+#     (id, released, sasnote, sasnoteTitle, os, package)
+###############################################
+def parse_hotfix_file(source):
+    fileUpdates = []
+    root = None
+    depth = 0
+    for event, element in ET.iterparse(source, events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = element
+            depth += 1
+            continue
+
+        depth -= 1
+        if depth == 1:
+            if element.tag == 'update':
+                fileUpdates.append((element.get('id'), element.get('released'), element.get('sasnote'),
+                                    element.get('sasnoteTitle'), element.get('os'), element.get('package')))
+            # Drop the elements read so far; only the records are kept.
+            root.clear()
+    return fileUpdates
+
+###########################################
+#  hotfix_cache_path
+#
+# This function returns the directory used to cache the hotfix files
+# published at the given base URL, inside the hotfix cache directory.
+###############################################
+def hotfix_cache_path(cacheDir, baseURL):
+    siteName = "".join([c if c.isalnum() or c in "-." else "_" for c in baseURL.split("://")[-1].strip("/")])
+    return os.path.join(os.path.expanduser(cacheDir), siteName)
+
+###########################################
+#  parse_hotfix_package
+#
+# This function splits the full package name given for a hotfix into
+# its parts.  The format of the full package name depends on the OS.
+#
+# Here is the return value:
+#   A 4 element list:
+#     [0] the package name.
+#     [1] the OS family: Windows, Suse, Yocto, Ubuntu, or RedHat.
+#     [2] the package version.
+#     [3] the package architecture, or None if there is none.
+###############################################
+def parse_hotfix_package(osName, fullPackage):
+    lastPeriodIndex = fullPackage.rfind(".")
+    # Windows does not have a dash in the version; Linux does.  So, we need to break differently,
+    # depending on the OS.
+    if osName.lower().find("windows") >= 0:
+        versionStartIndex = fullPackage.rfind("-")
+        achitectureStartIndex = -1
+        versionEndIndex = lastPeriodIndex
+        osFamily = "Windows"
+    else:
+        versionStartIndex = fullPackage.rfind("-", 0, fullPackage.rfind("-"))
+        # Linux has architecture in the package.  This will be stored in its own key.
+        achitectureStartIndex = fullPackage.rfind(".", 0, lastPeriodIndex)
+        # SLES has the string 'suse' in its package.  This will strip it out (as well as an extra .).
+        if osName.lower().find("suse") >= 0:
+            versionEndIndex = achitectureStartIndex - 5
+            osFamily = "Suse"
+        else:
+            if osName.lower().find("yocto") >= 0:
+                versionEndIndex = achitectureStartIndex - 6
+                osFamily = "Yocto"
+            else:
+                if osName.lower().find("ubuntu") >= 0:
+                    versionStartIndex = fullPackage.rfind("_", 0, fullPackage.rfind("_"))
+                    versionEndIndex = fullPackage.rfind("_")
+                    achitectureStartIndex = versionEndIndex
+                    osFamily = "Ubuntu"
+                else:
+                    if osName.lower().find("red hat enterprise linux 7") >= 0:
+                        versionStartIndex = fullPackage.rfind(":")
+                        versionEndIndex = len(fullPackage)
+                        achitectureStartIndex = -1
+                        osFamily = "RedHat"
+                    else:
+                        versionEndIndex = achitectureStartIndex
+                        osFamily = "RedHat"
+
+    architecture = None
+    if achitectureStartIndex != -1:
+        architecture = fullPackage[achitectureStartIndex + 1:lastPeriodIndex]
+    return [fullPackage[:versionStartIndex], osFamily, fullPackage[versionStartIndex + 1:versionEndIndex], architecture]
+
+###########################################
+#  compile_hotfix_file
+#
+# This function compiles the update records of a hotfix file (see
+# parse_hotfix_file) into a list of hotfixes, in the order they appear
+# in the file.  Inside of each file, the records are keyed by the hot
+# fix id.  There are three types of records, in order:
+#   1) id and release date
+#   2) id, sasnote, sasnotetitle
+#   3) id, OS, package.
+# The sasnote and package records belong to the hot fix of the release
+# date record before them.
+#
+# Here is the return value:
+#   A list of hotfixes.  Each hotfix is a 4 element list:
+#     [0] the hotfix id.
+#     [1] the release date.
+#     [2] a list of the SAS Notes of the hotfix, as [number, title].
+#     [3] a list of the packages of the hotfix, as
+#         [package, OS family, version, architecture, OS]
+#         (see parse_hotfix_package).
+###############################################
+def compile_hotfix_file(fileUpdates):
+    fileHotfixes = []
+    for currentUpdate, releaseDate, sasNote, sasNoteTitle, osName, fullPackage in fileUpdates:
+        if releaseDate is not None:
+            fileHotfixes.append([currentUpdate, releaseDate, [], []])
+            continue
+
+        if len(fileHotfixes) == 0:
+            raise ValueError("Hot fix " + str(currentUpdate) + " is listed before its release date.")
+        if sasNote is not None:
+            fileHotfixes[-1][2].append([sasNote, sasNoteTitle])
+        elif fullPackage is not None:
+            fileHotfixes[-1][3].append(parse_hotfix_package(osName, fullPackage) + [osName])
+    return fileHotfixes
+
+###########################################
+#  hotfix_cache_signature
+#
+# This function returns the size and modification time of a cached
+# hotfix file, which change whenever a new copy of the file is cached.
+# None is returned if the file cannot be accessed.
+###############################################
+def hotfix_cache_signature(cachePath):
+    try:
+        cacheStat = os.stat(cachePath)
+    except OSError:
+        return None
+    return [cacheStat.st_size, cacheStat.st_mtime]
+
+###########################################
+#  save_compiled_hotfix_file
+#
+# This function caches the compiled copy of a cached hotfix file (see
+# compile_hotfix_file), along with the signature of the cached file it
+# was compiled from.
+###############################################
+def save_compiled_hotfix_file(cacheDir, fileName, fileHotfixes):
+    signature = hotfix_cache_signature(os.path.join(cacheDir, fileName))
+    if signature is not None:
+        compiledFile = {"format": HOTFIX_COMPILED_FORMAT, "signature": signature, "hotfixes": fileHotfixes}
+        save_hotfix_cache(cacheDir, fileName + HOTFIX_COMPILED_SUFFIX, json.dumps(compiledFile).encode('utf-8'))
+
+###########################################
+#  read_cached_hotfix_file
+#
+# This function returns the compiled hotfixes of a cached hotfix file
+# (see compile_hotfix_file).  The compiled copy of the file is used if
+# it was compiled from the file as it is cached now.  Otherwise, the
+# file is parsed and compiled, and the compiled copy is cached for the
+# next run.
+###############################################
+def read_cached_hotfix_file(cacheDir, fileName):
+    try:
+        with open(os.path.join(cacheDir, fileName + HOTFIX_COMPILED_SUFFIX), 'r') as compiledCacheFile:
+            compiledFile = json.load(compiledCacheFile)
+        if compiledFile["format"] == HOTFIX_COMPILED_FORMAT and \
+           compiledFile["signature"] == hotfix_cache_signature(os.path.join(cacheDir, fileName)):
+            return compiledFile["hotfixes"]
+    except (IOError, OSError, ValueError, KeyError, TypeError):
+        pass
+
+    fileHotfixes = compile_hotfix_file(parse_hotfix_file(os.path.join(cacheDir, fileName)))
+    save_compiled_hotfix_file(cacheDir, fileName, fileHotfixes)
+    return fileHotfixes
+
+###########################################
+#  fetch_hotfix_file
+#
+# This function retrieves and compiles a single hotfix file.  The cached
+# copy of the file is used without contacting the web site when working
+# offline, or when it was retrieved less than cacheTTL seconds ago.
+# Otherwise, the file is requested with the ETag and Last-Modified
+# headers of the cached copy, so it is only downloaded again if it
+# has changed.  If the web site cannot be reached, the cached copy is
+# used instead.
+#
+# Here is the return value:
+#   A 3 element list:
+#     [0] the hotfixes of the file (see compile_hotfix_file).
+#     [1] where the file came from:
+#           "downloaded", the file was downloaded from the web site.
+#           "revalidated", the web site confirmed the cached copy is current.
+#           "cached", the cached copy was used without contacting the web site.
+#           "stale", the web site could not be reached, so the cached copy was used.
+#     [2] the new index entry for the cached copy, or None if it has not changed.
+###############################################
+def fetch_hotfix_file(baseURL, fileName, cacheDir, cachedFile, cacheTTL, offline):
+    now = time.time()
+    cachePath = None
+    if cachedFile is not None:
+        cachePath = os.path.join(cacheDir, fileName)
+        if not os.path.isfile(cachePath):
+            cachedFile = None
+
+    if offline or (cachedFile is not None and now - cachedFile["retrieved"] < cacheTTL):
+        if cachedFile is None:
+            raise IOError("No cached copy of " + fileName + " is available.")
+        return [read_cached_hotfix_file(cacheDir, fileName), "cached", None]
+
+    fileRequest = web_request.Request(baseURL + fileName)
+    if cachedFile is not None:
+        if cachedFile.get("etag"):
+            fileRequest.add_header("If-None-Match", cachedFile["etag"])
+        if cachedFile.get("last_modified"):
+            fileRequest.add_header("If-Modified-Since", cachedFile["last_modified"])
+
+    try:
+        fileResponse = web_request.urlopen(fileRequest, timeout=HOTFIX_DOWNLOAD_TIMEOUT)
+    except web_error.HTTPError as httpError:
+        # 304 (Not Modified) is raised as an error by urllib.
+        if httpError.code == 304 and cachedFile is not None:
+            cacheEntry = dict(cachedFile)
+            cacheEntry["retrieved"] = now
+            return [read_cached_hotfix_file(cacheDir, fileName), "revalidated", cacheEntry]
+        raise
+    except Exception:
+        if cachedFile is None:
+            raise
+        return [read_cached_hotfix_file(cacheDir, fileName), "stale", None]
+
+    # Parse the file while it is downloaded, writing it to a temporary cache file at the same time.  The cached copy
+    # is only replaced once the whole file has been parsed, so a damaged download never replaces a good cached copy.
+    cacheFile = None
+    if cacheDir is not None:
+        cacheFile = open_hotfix_cache(cacheDir, fileName)
+    fileStream = HotfixFileStream(fileResponse, cacheFile)
+    try:
+        try:
+            fileUpdates = parse_hotfix_file(fileStream)
+            fileHeaders = fileResponse.info()
+        finally:
+            fileResponse.close()
+    except (ET.ParseError, web_error.HTTPError):
+        if cacheFile is not None:
+            close_hotfix_cache(cacheDir, fileName, cacheFile, False)
+        raise
+    except Exception:
+        if cacheFile is not None:
+            close_hotfix_cache(cacheDir, fileName, cacheFile, False)
+        # The connection was lost during the download.
+        if cachedFile is None:
+            raise
+        return [read_cached_hotfix_file(cacheDir, fileName), "stale", None]
+
+    try:
+        fileHotfixes = compile_hotfix_file(fileUpdates)
+    except ValueError:
+        if cacheFile is not None:
+            close_hotfix_cache(cacheDir, fileName, cacheFile, False)
+        raise
+
+    cacheEntry = None
+    if cacheFile is not None and close_hotfix_cache(cacheDir, fileName, cacheFile, not fileStream.cacheFailed):
+        save_compiled_hotfix_file(cacheDir, fileName, fileHotfixes)
+        cacheEntry = {"etag": fileHeaders.get("ETag"),
+                      "last_modified": fileHeaders.get("Last-Modified"),
+                      "retrieved": now}
+    return [fileHotfixes, "downloaded", cacheEntry]
+
+###########################################
+#  fetch_hotfix_files
+#
+# This function retrieves and compiles each of the hotfix files from
+# the given base URL (see fetch_hotfix_file).  The files are retrieved
+# at the same time on a bounded pool of threads, and each one is
+# parsed while it is being retrieved.  The cacheIndex is updated
+# with the new entry of each file that was downloaded or revalidated.
+# When cacheDir is None, nothing is cached.
+#
+# Here is the return value:
+#   A dict of file name to a 3 element list:
+#     [0] the hotfixes of the file (see compile_hotfix_file), or None
+#         if it failed.
+#     [1] the exception raised while retrieving or parsing the file,
+#         or None if it succeeded.
+#     [2] where the file came from (see fetch_hotfix_file), or None
+#         if it failed.
+###############################################
+def fetch_hotfix_files(baseURL, fileNames, cacheDir=None, cacheIndex=None, cacheTTL=0, offline=False):
+    if cacheIndex is None:
+        cacheIndex = {}
+
+    fileQueue = queue.Queue()
+    for fileName in fileNames:
+        fileQueue.put(fileName)
+
+    fetchedFiles = {}
+
+    def fetch_worker():
+        while True:
+            try:
+                fileName = fileQueue.get_nowait()
+            except queue.Empty:
+                return
+
+            cachedFile = None
+            if cacheDir is not None:
+                cachedFile = cacheIndex.get(fileName)
+
+            try:
+                fileHotfixes, fileSource, cacheEntry = fetch_hotfix_file(baseURL, fileName, cacheDir, cachedFile,
+                                                                     cacheTTL, offline)
+                if cacheEntry is not None:
+                    cacheIndex[fileName] = cacheEntry
+                fetchedFiles[fileName] = [fileHotfixes, None, fileSource]
+            except Exception as fetchError:
+                fetchedFiles[fileName] = [None, fetchError, None]
+
+    workers = [threading.Thread(target=fetch_worker) for _ in range(min(HOTFIX_DOWNLOAD_WORKERS, len(fileNames)))]
+    for worker in workers:
+        worker.daemon = True
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    if cacheDir is not None:
+        save_hotfix_cache(cacheDir, HOTFIX_CACHE_INDEX, json.dumps(cacheIndex, indent=2).encode('utf-8'))
+
+    return fetchedFiles
+
+###########################################
+#  describe_hotfix_cache
+#
+# This function describes the cached hotfix files that were used
+# without confirming they are current with the web site, so the report
+# can show how old they are.
+#
+# Here is the return value:
+#   A dict of file name to a dict with:
+#     key="source", "cached" or "stale" (see fetch_hotfix_file).
+#     key="retrieved", when the file was last downloaded or revalidated.
+#     key="age", how long ago the file was last downloaded or revalidated.
+###############################################
+def describe_hotfix_cache(fetchedFiles, cacheIndex):
+    now = time.time()
+    cachedFiles = {}
+    for fileName in fetchedFiles:
+        fileSource = fetchedFiles[fileName][2]
+        if fileSource in ("cached", "stale"):
+            retrieved = cacheIndex[fileName]["retrieved"]
+            age = int(max(now - retrieved, 0))
+            cachedFiles[fileName] = {
+                "source": fileSource,
+                "retrieved": time.strftime('%A, %B %d, %Y %I:%M%p', time.localtime(retrieved)),
+                "age": str(age // 86400) + " days, " + str(age % 86400 // 3600) + " hours"
+            }
+    return cachedFiles
+
 
 # =====
 # main() (Entry point for Ansible module execution)
@@ -187,7 +788,12 @@ def main():
             report_timestamp=dict(type=str, required=False, default=''),
             registered_dict_name=dict(type=str, required=False, default="get_sas_host_details_results"),
             include_hotfix_report=dict(type=bool, required=False, default=True),
-            hotfix_url = dict(type=str, required=True)
+            hotfix_url = dict(type=str, required=True),
+            hotfix_mode=dict(type=str, required=False, default='online', choices=['online', 'offline']),
+            hotfix_cache_dir=dict(type=str, required=False, default='~/.cache/viya-ark/hotfixes'),
+            hotfix_cache_ttl=dict(type=int, required=False, default=0),
+            use_cache=dict(type=bool, required=False, default=True),
+            refresh_cache=dict(type=bool, required=False, default=False)
     ),
         supports_check_mode=True
     )
@@ -198,6 +804,11 @@ def main():
     registered_dict_name = module.params['registered_dict_name']
     include_hotfix_report = module.params['include_hotfix_report']
     hotfix_url = module.params['hotfix_url']
+    hotfix_mode = module.params['hotfix_mode']
+    hotfix_cache_dir = module.params['hotfix_cache_dir']
+    hotfix_cache_ttl = module.params['hotfix_cache_ttl']
+    use_cache = module.params['use_cache']
+    refresh_cache = module.params['refresh_cache']
 
     # Starting in Ansible 2.8.1, there is the potential for hostvars
     # to be passed as a byte string, if the dict is too large
@@ -279,6 +890,40 @@ def main():
             else:
                 pass  # this host isn't in sas_all so there's no need to try and report on it
 
+    ##################################################################################
+    # This section summarizes how long it took to collect the details of each host.
+    ##################################################################################
+    # The slowest hosts and the slowest collectors across all hosts are listed first, so the collection can be tuned
+    # where it matters most.  Hosts without timings (i.e. unreachable hosts or data from older runs) are skipped.
+    slowest_hosts = []
+    slowest_collectors = []
+    for hostname, host_results in results['sas_hosts'].items():
+        timings = host_results.get('_timings')
+        if not timings:
+            continue
+
+        host_timing = dict(timings['total'])
+        host_timing['hostname'] = hostname
+        host_timing['slowest_collector'] = ''
+
+        slowest_wall_time = -1
+        for collector, collector_timing in timings['collectors'].items():
+            if collector_timing['wall_time'] > slowest_wall_time:
+                slowest_wall_time = collector_timing['wall_time']
+                host_timing['slowest_collector'] = collector
+
+            collector_timing = dict(collector_timing)
+            collector_timing['hostname'] = hostname
+            collector_timing['collector'] = collector
+            slowest_collectors.append(collector_timing)
+
+        slowest_hosts.append(host_timing)
+
+    results['slowest_hosts'] = sorted(slowest_hosts, key=lambda timing: timing['wall_time'],
+                                      reverse=True)[:SLOWEST_TIMINGS_LIMIT]
+    results['slowest_collectors'] = sorted(slowest_collectors, key=lambda timing: timing['wall_time'],
+                                           reverse=True)[:SLOWEST_TIMINGS_LIMIT]
+
     ##################################################################################
     # This section will find all of the hotfixes available and add them to the report.
     ##################################################################################
@@ -311,10 +956,9 @@ def main():
     ###########################################################################
     #
     #  packageToHotFix
-    #  This will hold a dict of lists:
-    #  key:  package name, pointing to a 2 element list:
-    #    [0] OS
-    #    [1] The Hotfix that this package is associated with.
+    #  This will hold a dict of lists, so the hotfixes of an installed package are found with a single lookup:
+    #  key:  2 element tuple of package name and OS family, pointing to a list of:
+    #    The Hotfixes that this package is associated with on this OS family.
     #
     ###########################################################################
     #
@@ -337,6 +981,7 @@ def main():
     results["hotfix_legacy_products"] = "There is no hotfix data available for the following products due to their age:\n"
     results["no_hotfixes_available"] = False
     results["no_hotfix_products"] = "The following products are installed, but there are no associated hotfixes for them:\n"
+    results["hotfix_cached_files"] = {}
 
     results["include_hotfix_report"] = include_hotfix_report
     files_to_scan = []
@@ -544,28 +1189,54 @@ def main():
 
         # Check to see if the base site can be reached.  If not, an error will be displayed in the deployment report
         # itself.  Note:  We don't actually care about the content.  This check is just to see if the page can be
-        # reached.
+        # reached, so the page is closed without being read.  The check is made while the hotfix files are
+        # downloaded.  When working offline, the site is not contacted at all.
         results["master_website"] = baseURL
-        try:
-            landing_page = web_request.urlopen(baseURL)
-            http_output = landing_page.read()
-            results["contact_hotfix_website"] = True
-        except web_error.URLError :
+        results["hotfix_mode"] = hotfix_mode
+        offline = hotfix_mode == 'offline'
+        landingPageErrors = []
+
+        def check_landing_page():
+            try:
+                web_request.urlopen(baseURL, timeout=HOTFIX_DOWNLOAD_TIMEOUT).close()
+            except Exception as landingPageError:
+                landingPageErrors.append(landingPageError)
+
+        landingPageCheck = threading.Thread(target=check_landing_page)
+        landingPageCheck.daemon = True
+        if not offline:
+            landingPageCheck.start()
+
+        # Cached hotfix files are kept per hotfix_url, so files from different sites are never mixed.
+        cacheDir = None
+        cacheIndex = {}
+        if use_cache:
+            cacheDir = hotfix_cache_path(hotfix_cache_dir, baseURL)
+            results["hotfix_cache_dir"] = cacheDir
+            if not refresh_cache:
+                cacheIndex = load_hotfix_cache(cacheDir)
+
+        # Retrieve and parse all of the hotfix files at once.  They are still added to the report in the order of
+        # files_to_scan below, so the report is the same no matter which download finishes first.
+        fetchedFiles = fetch_hotfix_files(baseURL, files_to_scan, cacheDir, cacheIndex, hotfix_cache_ttl, offline)
+        results["hotfix_cached_files"] = describe_hotfix_cache(fetchedFiles, cacheIndex)
+
+        if offline:
             results["contact_hotfix_website"] = False
+        else:
+            landingPageCheck.join()
+            results["contact_hotfix_website"] = len(landingPageErrors) == 0
+        if not results["contact_hotfix_website"]:
             if debug:
                 print("***** Error parsing " + baseURL)
-                print(traceback.format_exc())
+                print(landingPageErrors[0])
                 print("***** No hot fix information obtained.  Skipping hot fix report.\n\n")
 
         files_to_remove = []
         if len(files_to_scan) > 0:
             for currentFile in files_to_scan:
                 fileToParse = baseURL + currentFile
-                # Retrieve each file.
-                # Inside of each file, the lines are keyed by the hot fix id.  There are three types of lines, in order:
-                # 1) id and release date
-                # 2) id, sasnote, sasnotetitle
-                # 3) id, OS, package.
+                # Add the hot fixes of each file (see compile_hotfix_file).
                 # This script loops through to build a dictionary of dictonaries with the basic structure:
                 #  ID
                 #    Release Date
@@ -575,110 +1246,58 @@ def main():
                 #    Packages
                 #      Package Name, Version, and OS
                 try:
-                    currentFileXML = web_request.urlopen(fileToParse)
-                    currentFileRoot = ET.fromstring(currentFileXML.read())
-                    updateID = ""
-                    for update_tag in currentFileRoot.findall('update'):
-                        currentUpdate = update_tag.get('id')
-                        releaseDate = update_tag.get('released')
+                    currentFileHotfixes, fetchError, fileSource = fetchedFiles[currentFile]
+                    if fetchError is not None:
+                        raise fetchError
+                    for updateID, releaseDate, sasNotes, packages in currentFileHotfixes:
                         # To get the top level Dictionary seeded with the hot fix Name and release date.
-                        if releaseDate is not None:
-                            if currentUpdate in fullReport:
-                                if debug:
-                                    print("WARNING!  Hot Fix " + currentUpdate + " already discovered.  Skipping")
-                                updateID = "DUPLICATE-SKIP"
-                            else:
-                                # The SCXXXX hot fixes are special.  The package files are only included in
-                                # Viya_<version>_<platform>_home.xml  files.  So, the entries in the
-                                # scheduled_update_<platform>_<shipevent>.xml files  can be skipped.
-                                if currentUpdate.startswith("SC") and currentFile.find("scheduled_update_") < 0:
-                                    continue
-                                updateID = currentUpdate
-                                fullReport[updateID] = {}
-                                fullReport[updateID]["release_date"] = releaseDate
-                                fullReport[updateID]["installed"] = False
-                                fullReport[updateID]["upToDate"] = False
+                        if updateID in fullReport:
+                            if debug:
+                                print("WARNING!  Hot Fix " + updateID + " already discovered.  Skipping")
+                            continue
+                        # The SCXXXX hot fixes are special.  The package files are only included in
+                        # Viya_<version>_<platform>_home.xml  files.  So, the entries in the
+                        # scheduled_update_<platform>_<shipevent>.xml files  can be skipped.
+                        if updateID.startswith("SC") and currentFile.find("scheduled_update_") < 0:
+                            continue
+                        fullReport[updateID] = {}
+                        fullReport[updateID]["release_date"] = releaseDate
+                        fullReport[updateID]["installed"] = False
+                        fullReport[updateID]["upToDate"] = False
+
                         # To get the SASNote information under the hot fix
-                        else:
-                            if updateID == "DUPLICATE-SKIP":
-                                continue
-                            sasNote = update_tag.get('sasnote')
-                            sasNoteTitle = update_tag.get('sasnoteTitle')
-                            if sasNote is not None:
-                                if "sasnote" not in fullReport[updateID]:
-                                    fullReport[updateID]["sasnote"] = {}
-                                # This string needs to be encoded because some non-ASCII characters are
-                                # in some of the titles.
-                                fullReport[updateID]["sasnote"][sasNote] = sasNoteTitle.encode('utf-8')
-                            # To get the Package information under the hot fix.
-                            else:
-                                os = update_tag.get("os")
-                                fullPackage = update_tag.get("package")
-                                if fullPackage is not None:
-                                    if "package" not in fullReport[updateID]:
-                                        fullReport[updateID]["package"] = {}
-
-                                    lastPeriodIndex = fullPackage.rfind(".")
-                                    # Format the package information.
-                                    # Windows does not have a dash in the version; Linux does.  So, we need to break differently,
-                                    # depending on the OS.
-                                    if os.lower().find("windows") >= 0:
-                                        versionStartIndex = fullPackage.rfind("-")
-                                        achitectureStartIndex = -1
-                                        versionEndIndex = lastPeriodIndex
-                                        osFamily = "Windows"
-                                    else:
-                                        versionStartIndex = fullPackage.rfind("-", 0, fullPackage.rfind("-"))
-                                        # Linux has architecture in the package.  This will be stored in its own key.
-                                        achitectureStartIndex = fullPackage.rfind(".", 0, lastPeriodIndex)
-                                        # SLES has the string 'suse' in its package.  This will strip it out (as well as an extra .).
-                                        if os.lower().find("suse") >= 0:
-                                            versionEndIndex = achitectureStartIndex - 5
-                                            osFamily = "Suse"
-                                        else:
-                                            if os.lower().find("yocto") >= 0:
-                                                versionEndIndex = achitectureStartIndex - 6
-                                                osFamily = "Yocto"
-                                            else:
-                                                if os.lower().find("ubuntu") >= 0:
-                                                    versionStartIndex = fullPackage.rfind("_", 0, fullPackage.rfind("_"))
-                                                    versionEndIndex = fullPackage.rfind("_")
-                                                    achitectureStartIndex = versionEndIndex
-                                                    osFamily = "Ubuntu"
-                                                else:
-                                                    if os.lower().find("red hat enterprise linux 7") >= 0:
-                                                        versionStartIndex = versionStartIndex = fullPackage.rfind(":")
-                                                        versionEndIndex = len(fullPackage)
-                                                        achitectureStartIndex = -1
-                                                        osFamily = "RedHat"
-                                                    else:
-                                                        versionEndIndex = achitectureStartIndex
-                                                        osFamily = "RedHat"
-                                    package = fullPackage[:versionStartIndex]
-                                    packageVersion = fullPackage[versionStartIndex + 1:versionEndIndex]
-                                    architecture = fullPackage[achitectureStartIndex + 1:lastPeriodIndex]
-
-                                    if package not in fullReport[updateID]["package"]:
-                                        fullReport[updateID]["package"][package] = {}
-                                    if "platform" not in fullReport[updateID]["package"][package]:
-                                        fullReport[updateID]["package"][package]["platform"] = {}
-                                    if osFamily not in fullReport[updateID]["package"][package]["platform"]:
-                                        fullReport[updateID]["package"][package]["platform"][osFamily] = {}
-                                    fullReport[updateID]["package"][package]["platform"][osFamily]["version"] = packageVersion
-                                    fullReport[updateID]["package"][package]["platform"][osFamily]["installed"] = False
-                                    fullReport[updateID]["package"][package]["platform"][osFamily]["upToDate"] = False
-                                    fullReport[updateID]["package"][package]["platform"][osFamily]["os"] = os
-                                    fullReport[updateID]["package"][package]["platform"][osFamily]["installedVersions"] = {}
-                                    if achitectureStartIndex != -1:
-                                        fullReport[updateID]["package"][package]["platform"][osFamily]["arch"] = architecture
-                                    # This property is used to make sure that when evaluating the installed packages,
-                                    # the upToDate=false does not get overridden by a True at the end.
-                                    fullReport[updateID]["package"][package]["platform"][osFamily]["alreadyUpdated"] = False
-
-                                    # Add to the package to hot fix dict.
-                                    if package not in packageToHotfix:
-                                        packageToHotfix[package] = []
-                                    packageToHotfix[package].append([osFamily, updateID])
+                        for sasNote, sasNoteTitle in sasNotes:
+                            if "sasnote" not in fullReport[updateID]:
+                                fullReport[updateID]["sasnote"] = {}
+                            # This string needs to be encoded because some non-ASCII characters are
+                            # in some of the titles.
+                            fullReport[updateID]["sasnote"][sasNote] = sasNoteTitle.encode('utf-8')
+
+                        # To get the Package information under the hot fix.
+                        for package, osFamily, packageVersion, architecture, os in packages:
+                            if "package" not in fullReport[updateID]:
+                                fullReport[updateID]["package"] = {}
+                            if package not in fullReport[updateID]["package"]:
+                                fullReport[updateID]["package"][package] = {}
+                            if "platform" not in fullReport[updateID]["package"][package]:
+                                fullReport[updateID]["package"][package]["platform"] = {}
+                            if osFamily not in fullReport[updateID]["package"][package]["platform"]:
+                                fullReport[updateID]["package"][package]["platform"][osFamily] = {}
+                            fullReport[updateID]["package"][package]["platform"][osFamily]["version"] = packageVersion
+                            fullReport[updateID]["package"][package]["platform"][osFamily]["installed"] = False
+                            fullReport[updateID]["package"][package]["platform"][osFamily]["upToDate"] = False
+                            fullReport[updateID]["package"][package]["platform"][osFamily]["os"] = os
+                            fullReport[updateID]["package"][package]["platform"][osFamily]["installedVersions"] = {}
+                            if architecture is not None:
+                                fullReport[updateID]["package"][package]["platform"][osFamily]["arch"] = architecture
+                            # This property is used to make sure that when evaluating the installed packages,
+                            # the upToDate=false does not get overridden by a True at the end.
+                            fullReport[updateID]["package"][package]["platform"][osFamily]["alreadyUpdated"] = False
+
+                            # Add to the package and OS family to hot fix dict.
+                            if (package, osFamily) not in packageToHotfix:
+                                packageToHotfix[(package, osFamily)] = []
+                            packageToHotfix[(package, osFamily)].append(updateID)
 
                 except ET.ParseError:
                     if debug:
@@ -709,10 +1328,10 @@ def main():
                 print("***********************************************************************************")
                 print("**** Here is the package to hot fix dict:")
                 print("***********************************************************************************")
-                for current_package in packageToHotfix:
+                for current_package, current_os in packageToHotfix:
                     print("  " + current_package)
-                    for machine_list in packageToHotfix[current_package]:
-                        print("    " + machine_list[0] + " @ " + machine_list[1] + ".")
+                    for current_hotfix in packageToHotfix[(current_package, current_os)]:
+                        print("    " + current_os + " @ " + current_hotfix + ".")
                 print("***********************************************************************************")
                 print("Report built.")
                 print("Accessing environment Data.")
@@ -722,32 +1341,30 @@ def main():
                    and results['sas_hosts'][currentMachine]['_sas_installed']:
                     currentOS = results['sas_hosts'][currentMachine]['os']['family']
                     for currentPackage in results['sas_hosts'][currentMachine]['sas_packages']:
-                        if currentPackage in packageToHotfix:
-                            for osHotfix in packageToHotfix[currentPackage]:
-                                if osHotfix[0] == currentOS:
-                                    currentHotfix = osHotfix[1]
-                                    installedVersion = \
-                                    results['sas_hosts'][currentMachine]['sas_packages'][currentPackage]['attributes']['version']
-                                    if installedVersion.endswith('.suse'):
-                                        installedVersion = installedVersion[:-5]
+                        if (currentPackage, currentOS) in packageToHotfix:
+                            for currentHotfix in packageToHotfix[(currentPackage, currentOS)]:
+                                installedVersion = \
+                                results['sas_hosts'][currentMachine]['sas_packages'][currentPackage]['attributes']['version']
+                                if installedVersion.endswith('.suse'):
+                                    installedVersion = installedVersion[:-5]
+                                else:
+                                    if installedVersion.endswith('.yocto'):
+                                        installedVersion = installedVersion[:-6]
                                     else:
-                                        if installedVersion.endswith('.yocto'):
-                                            installedVersion = installedVersion[:-6]
-                                        else:
-                                            if '_' in installedVersion:
-                                                installedVersion = installedVersion[0:installedVersion.rfind("_")]
-                                    hotfixVersion = fullReport[currentHotfix]["package"][currentPackage]["platform"][currentOS]["version"]
-                                    upToDate = compare_versions(installedVersion, hotfixVersion) >= 0
-                                    fullReport[currentHotfix]["installed"] = True
-                                    fullReport[currentHotfix]["package"][currentPackage]["platform"][currentOS]["installed"] = True
-                                    # If a previous package marked updateToDate=True, it can still be pulled back to false if another package isn't
-                                    # up to date.  If the previous package was marked upToDate=false, the hotfix cannot be marked true.
-                                    if not fullReport[currentHotfix]["package"][currentPackage]["platform"][currentOS]["alreadyUpdated"] or \
-                                        (fullReport[currentHotfix]["package"][currentPackage]["platform"][currentOS]["alreadyUpdated"] and
-                                         fullReport[currentHotfix]["package"][currentPackage]["platform"][currentOS]["upToDate"]):
-                                        fullReport[currentHotfix]["package"][currentPackage]["platform"][currentOS]["upToDate"] = upToDate
-                                        fullReport[currentHotfix]["package"][currentPackage]["platform"][currentOS]["alreadyUpdated"] = True
-                                    fullReport[currentHotfix]["package"][currentPackage]["platform"][currentOS]["installedVersions"][currentMachine] = [installedVersion, upToDate]
+                                        if '_' in installedVersion:
+                                            installedVersion = installedVersion[0:installedVersion.rfind("_")]
+                                hotfixVersion = fullReport[currentHotfix]["package"][currentPackage]["platform"][currentOS]["version"]
+                                upToDate = compare_versions(installedVersion, hotfixVersion) >= 0
+                                fullReport[currentHotfix]["installed"] = True
+                                fullReport[currentHotfix]["package"][currentPackage]["platform"][currentOS]["installed"] = True
+                                # If a previous package marked updateToDate=True, it can still be pulled back to false if another package isn't
+                                # up to date.  If the previous package was marked upToDate=false, the hotfix cannot be marked true.
+                                if not fullReport[currentHotfix]["package"][currentPackage]["platform"][currentOS]["alreadyUpdated"] or \
+                                    (fullReport[currentHotfix]["package"][currentPackage]["platform"][currentOS]["alreadyUpdated"] and
+                                     fullReport[currentHotfix]["package"][currentPackage]["platform"][currentOS]["upToDate"]):
+                                    fullReport[currentHotfix]["package"][currentPackage]["platform"][currentOS]["upToDate"] = upToDate
+                                    fullReport[currentHotfix]["package"][currentPackage]["platform"][currentOS]["alreadyUpdated"] = True
+                                fullReport[currentHotfix]["package"][currentPackage]["platform"][currentOS]["installedVersions"][currentMachine] = [installedVersion, upToDate]
 
             if debug:
                 print("Comparing evironment data to hotfix data.")
@@ -815,7 +1432,11 @@ def main():
         formatted_file_output = "Installed Products analyzed; hotfix files used in report:\n"
         current_file_number = 1
         for current_file in files_to_scan:
-            formatted_file_output = formatted_file_output + "  " + current_file_number.__str__() + ")  " + baseURL + current_file + "\n"
+            formatted_file_output = formatted_file_output + "  " + current_file_number.__str__() + ")  " + baseURL + current_file
+            if current_file in results["hotfix_cached_files"]:
+                formatted_file_output = formatted_file_output + "  (cached copy retrieved " + \
+                                        results["hotfix_cached_files"][current_file]["retrieved"] + ")"
+            formatted_file_output = formatted_file_output + "\n"
             current_file_number += 1
 
     results["hotfix_scanned_files"] = formatted_file_output